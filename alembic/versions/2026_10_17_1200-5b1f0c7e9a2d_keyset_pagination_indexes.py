@@ -0,0 +1,33 @@
+"""keyset pagination indexes
+
+Revision ID: 5b1f0c7e9a2d
+Revises: e170128c9c9e
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1f0c7e9a2d'
+down_revision: Union[str, None] = 'e170128c9c9e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_books_price_per_unit_id', 'books', ['price_per_unit', 'id'], unique=False)
+    op.create_index(
+        'ix_books_price_with_discount_id', 'books', ['price_with_discount', 'id'], unique=False
+    )
+    op.create_index('ix_books_name_id', 'books', ['name', 'id'], unique=False)
+    op.create_index('ix_books_created_at_id', 'books', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_books_created_at_id', table_name='books')
+    op.drop_index('ix_books_name_id', table_name='books')
+    op.drop_index('ix_books_price_with_discount_id', table_name='books')
+    op.drop_index('ix_books_price_per_unit_id', table_name='books')
@@ -0,0 +1,112 @@
+"""book full text search
+
+Revision ID: c3d9a4e1f7b2
+Revises: 5b1f0c7e9a2d
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3d9a4e1f7b2'
+down_revision: Union[str, None] = '5b1f0c7e9a2d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english'::regconfig, coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english'::regconfig, coalesce(search_names, '')), 'B') || "
+    "setweight(to_tsvector('english'::regconfig, coalesce(description, '')), 'C')"
+)
+
+
+def upgrade() -> None:
+    op.add_column('books', sa.Column('search_names', sa.String(), server_default='', nullable=True))
+    op.add_column('books', sa.Column(
+        'search_vector', postgresql.TSVECTOR(),
+        sa.Computed(SEARCH_VECTOR_SQL, persisted=True), nullable=True
+    ))
+    op.create_index(
+        'ix_books_search_vector', 'books', ['search_vector'], unique=False, postgresql_using='gin'
+    )
+
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION refresh_book_search_names(book_ids uuid[]) RETURNS void AS $$
+            UPDATE books SET search_names = concat_ws(
+                ' ',
+                (
+                    SELECT string_agg(a.first_name || ' ' || a.last_name, ' ') FROM authors a
+                    WHERE a.book_id = books.id
+                ),
+                (
+                    SELECT string_agg(c.name, ' ') FROM book_category_assoc bc
+                    JOIN categories c ON c.id = bc.category_id
+                    WHERE bc.book_id = books.id
+                )
+            )
+            WHERE books.id = ANY(book_ids)
+        $$ LANGUAGE sql
+        """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION refresh_book_search_names_trigger() RETURNS trigger AS $$
+        BEGIN
+            IF TG_TABLE_NAME = 'categories' THEN
+                PERFORM refresh_book_search_names(
+                    ARRAY(SELECT book_id FROM book_category_assoc WHERE category_id = NEW.id)
+                );
+            ELSIF TG_OP = 'INSERT' THEN
+                PERFORM refresh_book_search_names(ARRAY[NEW.book_id]);
+            ELSIF TG_OP = 'DELETE' THEN
+                PERFORM refresh_book_search_names(ARRAY[OLD.book_id]);
+            ELSE
+                PERFORM refresh_book_search_names(ARRAY[OLD.book_id, NEW.book_id]);
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER tr_authors_book_search_names
+        AFTER INSERT OR DELETE OR UPDATE OF first_name, last_name, book_id ON authors
+        FOR EACH ROW EXECUTE FUNCTION refresh_book_search_names_trigger()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER tr_book_category_assoc_book_search_names
+        AFTER INSERT OR DELETE OR UPDATE ON book_category_assoc
+        FOR EACH ROW EXECUTE FUNCTION refresh_book_search_names_trigger()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER tr_categories_book_search_names
+        AFTER UPDATE OF name ON categories
+        FOR EACH ROW EXECUTE FUNCTION refresh_book_search_names_trigger()
+        """
+    )
+    # names of existing authors and categories
+    op.execute("SELECT refresh_book_search_names(ARRAY(SELECT id FROM books))")
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS tr_categories_book_search_names ON categories")
+    op.execute(
+        "DROP TRIGGER IF EXISTS tr_book_category_assoc_book_search_names ON book_category_assoc"
+    )
+    op.execute("DROP TRIGGER IF EXISTS tr_authors_book_search_names ON authors")
+    op.execute("DROP FUNCTION IF EXISTS refresh_book_search_names_trigger()")
+    op.execute("DROP FUNCTION IF EXISTS refresh_book_search_names(uuid[])")
+    op.drop_index('ix_books_search_vector', table_name='books', postgresql_using='gin')
+    op.drop_column('books', 'search_vector')
+    op.drop_column('books', 'search_names')
@@ -0,0 +1,40 @@
+"""trigram name indexes
+
+Revision ID: d8e2b5c4a1f3
+Revises: c3d9a4e1f7b2
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8e2b5c4a1f3'
+down_revision: Union[str, None] = 'c3d9a4e1f7b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        'ix_books_name_trgm', 'books', ['name'], unique=False,
+        postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}
+    )
+    op.create_index(
+        'ix_authors_first_name_trgm', 'authors', ['first_name'], unique=False,
+        postgresql_using='gin', postgresql_ops={'first_name': 'gin_trgm_ops'}
+    )
+    op.create_index(
+        'ix_authors_last_name_trgm', 'authors', ['last_name'], unique=False,
+        postgresql_using='gin', postgresql_ops={'last_name': 'gin_trgm_ops'}
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_authors_last_name_trgm', table_name='authors', postgresql_using='gin')
+    op.drop_index('ix_authors_first_name_trgm', table_name='authors', postgresql_using='gin')
+    op.drop_index('ix_books_name_trgm', table_name='books', postgresql_using='gin')
+    # pg_trgm is left installed, other objects may depend on it
@@ -0,0 +1,57 @@
+"""foreign key and filter indexes
+
+Revision ID: e4a7c2d9b6f1
+Revises: d8e2b5c4a1f3
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a7c2d9b6f1'
+down_revision: Union[str, None] = 'd8e2b5c4a1f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# name, table, columns
+INDEXES = (
+    ('ix_cart_items_book_id', 'cart_items', ['book_id']),
+    ('ix_book_order_assoc_book_id', 'book_order_assoc', ['book_id']),
+    ('ix_orders_user_id', 'orders', ['user_id']),
+    ('ix_orders_payment_id', 'orders', ['payment_id']),
+    ('ix_images_book_id', 'images', ['book_id']),
+    ('ix_authors_book_id', 'authors', ['book_id']),
+    ('ix_publishers_book_id', 'publishers', ['book_id']),
+    ('ix_book_category_assoc_category_id', 'book_category_assoc', ['category_id']),
+    # price filters are served by ix_books_price_per_unit_id / ix_books_price_with_discount_id
+    ('ix_books_number_in_stock_id', 'books', ['number_in_stock', 'id']),
+)
+
+
+def upgrade() -> None:
+    # CONCURRENTLY doesn't block writes to the tables, but can't run inside a transaction
+    with op.get_context().autocommit_block():
+        # failed concurrent build leaves an invalid index behind, IF NOT EXISTS would keep it
+        invalid: list[str] = [] if op.get_context().as_sql else op.get_bind().execute(
+            sa.text(
+                "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE NOT i.indisvalid AND c.relname = ANY(:names)"
+            ),
+            {"names": [name for name, _, _ in INDEXES]}
+        ).scalars().all()
+        for name, table, columns in INDEXES:
+            if name in invalid:
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+            op.create_index(
+                name, table, columns, unique=False, postgresql_concurrently=True, if_not_exists=True
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -1,11 +1,13 @@
 from datetime import timedelta
 
-from fastapi import Depends, status, APIRouter
+from fastapi import Depends, status, APIRouter, Response, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from auth.services.permission_service import PermissionService
 from infrastructure.postgres import db_client
 from core.utils.cache import cachify
+from core.base_repos import NEXT_CURSOR_HEADER, Page
+from application.schemas.filters import PaginationS
 from application.schemas import (
     ReturnAuthorS,
     UpdateAuthorS,
@@ -19,10 +21,24 @@ router = APIRouter(prefix="/v1/authors", tags=["Authors"])
 
 @router.get("/", status_code=status.HTTP_200_OK, response_model=list[ReturnAuthorS] | None)
 async def get_all_authors(
+        response: Response,
         service: AuthorService = Depends(),
-        session: AsyncSession = Depends(db_client.get_scoped_session_dependency)
+        session: AsyncSession = Depends(db_client.get_read_session_dependency),
+        pagination: PaginationS = Depends()
+):
+    page: Page = await service.get_all_authors(session=session, pagination=pagination)
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    return page.items
+
+
+@router.get("/search", status_code=status.HTTP_200_OK, response_model=list[ReturnAuthorS])
+async def search_authors(
+        name: str = Query(min_length=2, max_length=100),
+        service: AuthorService = Depends(),
+        session: AsyncSession = Depends(db_client.get_read_session_dependency),
 ):
-    return await service.get_all_authors(session=session)
+    return await service.get_authors_by_filters(session=session, name=name)
 
 
 @router.get("/{author_id}",
@@ -30,11 +46,11 @@ async def get_all_authors(
             response_model=list[ReturnAuthorS] | None,
             dependencies=[Depends(PermissionService.get_admin_permission)]
             )
-@cachify(ReturnAuthorS, cache_time=timedelta(seconds=10))
+@cachify(ReturnAuthorS, cache_time=timedelta(minutes=10), tags=("authors:{author_id}",))
 async def get_author_by_id(
         author_id: int,
         service: AuthorService = Depends(),
-        session: AsyncSession = Depends(db_client.get_scoped_session_dependency),
+        session: AsyncSession = Depends(db_client.get_read_session_dependency),
 ):
     return await service.get_authors_by_filters(session=session, author_id=author_id)
 
@@ -1,10 +1,15 @@
 from uuid import UUID
-from fastapi import Depends, status, APIRouter
+from fastapi import Depends, status, APIRouter, Response, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from application.services import BookService
+from application.services.autocomplete import book_suggestions
 from infrastructure.postgres import db_client
+from core.base_repos import NEXT_CURSOR_HEADER
+from core.config import settings
 from application.schemas import (
     ReturnBookS,
+    SearchBookS,
+    BookSuggestionS,
     CreateBookS,
     UpdateBookS,
     UpdatePartiallyBookS,
@@ -26,25 +31,72 @@ async def get_all_books(
         pagination: Pagination = Depends(),
         filters: BookFilter = Depends(),
         service: BookService = Depends(),
-        session: AsyncSession = Depends(db_client.get_scoped_session_dependency)
 ):
-    return await service.get_all_books(
+    # pages are loaded on cache misses from the primary (see BookService.get_all_books_json)
+    books, cursor = await service.get_all_books_json(
+        filters=filters,
+        pagination=pagination
+    )  # already serialized, so it is returned as is
+    headers = {NEXT_CURSOR_HEADER: cursor} if cursor else None
+    return Response(content=books, media_type="application/json", headers=headers)
+
+
+@router.get(
+    "/search",
+    status_code=status.HTTP_200_OK,
+    response_model=list[SearchBookS]
+)
+async def search_books(
+        q: str = Query(min_length=1, max_length=200),
+        pagination: Pagination = Depends(),
+        filters: BookFilter = Depends(),
+        service: BookService = Depends(),
+        session: AsyncSession = Depends(db_client.get_read_session_dependency)
+):
+    return await service.search_books(
         session=session,
+        query=q,
         filters=filters,
         pagination=pagination
     )
 
 
+@router.get(
+    "/suggest",
+    status_code=status.HTTP_200_OK,
+    response_model=list[BookSuggestionS]
+)
+async def suggest_books(
+        q: str = Query(min_length=1, max_length=100),
+        limit: int = Query(
+            default=settings.AUTOCOMPLETE_LIMIT, ge=1, le=settings.AUTOCOMPLETE_LIMIT
+        ),
+):
+    """
+        autocomplete of the search box, served from memory of the worker without db queries.
+        No service dependency, as sync dependencies are run in the threadpool on every keystroke
+    """
+    return book_suggestions.suggest(prefix=q, limit=limit)
+
+
 @router.get(
     "/{book_id}",
     status_code=status.HTTP_200_OK,
     response_model=ReturnBookS,
 )
-@cachify(ReturnBookS, cache_time=timedelta(seconds=10))
+# book contains names of its authors and categories, so their changes evict it too.
+# Ids of the authors and categories aren't known before the book is loaded, so any of their
+# changes evicts every cached book: they are rare admin edits, while books are read per request
+@cachify(
+    ReturnBookS,
+    cache_time=timedelta(minutes=10),
+    tags=("books:{book_id}", "authors", "categories"),
+    lock=True
+)
 async def get_book_by_id(
         book_id: UUID,
         service: BookService = Depends(),
-        session: AsyncSession = Depends(db_client.get_scoped_session_dependency),
+        session: AsyncSession = Depends(db_client.get_read_session_dependency),
 ):
     return await service.get_book_by_id(session=session, id=book_id)
 
@@ -18,7 +18,7 @@ router = APIRouter(prefix="/v1/categories", tags=["Categories"])
 @router.get("/", status_code=status.HTTP_200_OK, response_model=list[ReturnCategoryS])
 async def get_all_categories(
         service: CategoryService = Depends(),
-        session: AsyncSession = Depends(db_client.get_scoped_session_dependency)
+        session: AsyncSession = Depends(db_client.get_read_session_dependency)
 ):
     return await service.get_all_categories(session=session)
 
@@ -28,11 +28,11 @@ async def get_all_categories(
             response_model=list[ReturnCategoryS] | None,
             dependencies=[Depends(PermissionService.get_admin_permission)]
             )
-@cachify(ReturnCategoryS, cache_time=timedelta(seconds=10))
+@cachify(ReturnCategoryS, cache_time=timedelta(minutes=10), tags=("categories:{category_id}",))
 async def get_category_by_id(
         category_id: int,
         service: CategoryService = Depends(),
-        session: AsyncSession = Depends(db_client.get_scoped_session_dependency),
+        session: AsyncSession = Depends(db_client.get_read_session_dependency),
 ):
     return await service.get_category_by_id(session=session, id=category_id)
 
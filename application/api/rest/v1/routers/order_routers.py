@@ -1,7 +1,7 @@
 from datetime import timedelta
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, status, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from infrastructure.postgres import db_client
@@ -10,6 +10,7 @@ from application.schemas import CreateOrderS, ReturnOrderS, ShortenedReturnOrder
 from application.schemas.filters import PaginationS
 from application.services import OrderService
 from core.utils.cache import cachify
+from core.base_repos import NEXT_CURSOR_HEADER, Page
 from auth.services.permission_service import PermissionService
 
 router = APIRouter(prefix="/v1/orders", tags=["Orders"])
@@ -20,11 +21,15 @@ router = APIRouter(prefix="/v1/orders", tags=["Orders"])
     status_code=status.HTTP_200_OK,
     response_model=list[ShortenedReturnOrderS])
 async def get_all_orders(
+        response: Response,
         service: OrderService = Depends(),
         session: AsyncSession = Depends(db_client.get_scoped_session_dependency),
         pagination: PaginationS = Depends()
 ):
-    return await service.get_all_orders(session=session, pagination=pagination)
+    page: Page = await service.get_all_orders(session=session, pagination=pagination)
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    return page.items
 
 
 @router.get("/{order_id}",
@@ -34,7 +39,8 @@ async def get_all_orders(
             )
 @cachify(
     ReturnOrderS,
-    cache_time=timedelta(seconds=10),
+    cache_time=timedelta(minutes=10),
+    tags=("orders:{order_id}",)
 )
 async def get_order_by_id(
         order_id: int,
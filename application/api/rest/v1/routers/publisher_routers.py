@@ -18,7 +18,7 @@ router = APIRouter(prefix="/v1/publishers", tags=["Publishers"])
 @router.get("/", status_code=status.HTTP_200_OK, response_model=list[ReturnPublisherS] | None)
 async def get_all_publishers(
         service: PublisherService = Depends(),
-        session: AsyncSession = Depends(db_client.get_scoped_session_dependency)
+        session: AsyncSession = Depends(db_client.get_read_session_dependency)
 ):
     return await service.get_all_publishers(session=session)
 
@@ -28,11 +28,11 @@ async def get_all_publishers(
             response_model=list[ReturnPublisherS] | None,
             dependencies=[Depends(PermissionService.get_admin_permission)]
             )
-@cachify(ReturnPublisherS, cache_time=timedelta(seconds=10))
+@cachify(ReturnPublisherS, cache_time=timedelta(minutes=10), tags=("publishers:{publisher_id}",))
 async def get_publisher_by_id(
         publisher_id: int,
         service: PublisherService = Depends(),
-        session: AsyncSession = Depends(db_client.get_scoped_session_dependency),
+        session: AsyncSession = Depends(db_client.get_read_session_dependency),
 ):
     return await service.get_publishers_by_filters(session=session, publisher_id=publisher_id)
 
@@ -1,5 +1,5 @@
 from datetime import timedelta
-from fastapi import Depends, status, APIRouter
+from fastapi import Depends, status, APIRouter, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from application.schemas.filters import PaginationS
@@ -13,6 +13,7 @@ from application.schemas import (UpdateUserS,
                                  ReturnUserS, ReturnUserWithOrdersS
                                  )
 from auth.services.permission_service import PermissionService
+from core.base_repos import NEXT_CURSOR_HEADER, Page
 from core.utils.cache import cachify
 
 
@@ -23,18 +24,22 @@ router = APIRouter(prefix="/v1/users", tags=["Users"])
             response_model=list[ReturnUserS] | None,
             )
 async def get_all_users(
+        response: Response,
         service: UserService = Depends(),
         session: AsyncSession = Depends(db_client.get_scoped_session_dependency),
         pagination: PaginationS = Depends()
 ):
-    return await service.get_all_users(session=session, pagination=pagination)
+    page: Page = await service.get_all_users(session=session, pagination=pagination)
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    return page.items
 
 
 @router.get("/{user_id}",
             status_code=status.HTTP_200_OK,
             response_model=ReturnUserS,
             dependencies=[Depends(PermissionService.get_admin_permission)])
-@cachify(ReturnUserS, cache_time=timedelta(seconds=10))
+@cachify(ReturnUserS, cache_time=timedelta(minutes=10), tags=("users:{user_id}",))
 async def get_user_by_id(
         user_id: int,
         service: UserService = Depends(),
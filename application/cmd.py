@@ -5,7 +5,7 @@ import uvicorn
 from aioredis import Redis
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.exceptions import HTTPException
 from auth.routers import auth_router
 from application.api.rest.v1 import (
@@ -15,8 +15,13 @@ from application.api.rest.v1 import (
     cart_router, checkout_router
 )
 from core.config import settings
+from core.utils.cache import cache_engine
+from application.services.autocomplete import book_suggestions
 from logger import logger
 from infrastructure.redis import redis_client
+from infrastructure.metrics import (
+    request_metrics_scope, route_template, observe_request, render_metrics
+)
 
 
 app = FastAPI()
@@ -39,6 +44,26 @@ for router in (
     app.include_router(router)
 
 
+@app.on_event("startup")
+async def start_cache_engine():
+    await cache_engine.start()
+
+
+@app.on_event("shutdown")
+async def stop_cache_engine():
+    await cache_engine.stop()
+
+
+@app.on_event("startup")
+async def start_book_suggestions():
+    await book_suggestions.start()
+
+
+@app.on_event("shutdown")
+async def stop_book_suggestions():
+    await book_suggestions.stop()
+
+
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
     start_time = time.time()
@@ -89,10 +114,31 @@ if settings.MODE != "TEST":
         return await call_next(request)
 
 
+@app.middleware("http")
+async def collect_request_metrics(request: Request, call_next):
+    """sql, redis and pool wait per request labelled by the route template (see /metrics)"""
+    start_time = time.perf_counter()
+    with request_metrics_scope(route_template(request)) as request_metrics:
+        response = await call_next(request)
+    observe_request(
+        request_metrics,
+        method=request.method,
+        status=response.status_code,
+        seconds=time.perf_counter() - start_time
+    )
+    return response
+
+
 @app.get("/")
 def home():
     return {"message": "Heeeeeey!"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """metrics of the worker process in the Prometheus text format"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     uvicorn.run("application.cmd:app", reload=True)
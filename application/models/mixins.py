@@ -32,12 +32,11 @@ class TimestampMixin:
     @declared_attr
     def created_at(cls) -> Mapped[datetime]:
         return mapped_column(
-            TIMESTAMP(timezone=True), server_default=func.now(), default=datetime.now()
-
+            TIMESTAMP(timezone=True), server_default=func.now(), default=datetime.now
         )
 
     @declared_attr
     def updated_at(cls) -> Mapped[datetime]:
         return mapped_column(
-            TIMESTAMP(timezone=True), server_default=func.now(), default=datetime.now()
+            TIMESTAMP(timezone=True), server_default=func.now(), default=datetime.now
         )
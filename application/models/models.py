@@ -15,6 +15,7 @@ from sqlalchemy import (
     Column,
     Integer, PrimaryKeyConstraint
 )
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import (
     Mapped,
     mapped_column,
@@ -25,6 +26,7 @@ from typing_extensions import Literal
 
 from application.helpers import generate_uuid
 from application.models.mixins import FirstLastNameValidationMixin, TimestampMixin
+from application.models.search import BOOK_SEARCH_VECTOR_SQL, register_search_ddl
 
 __all__ = (
     "Base",
@@ -77,7 +79,9 @@ BookCategoryAssoc = Table(
     "book_category_assoc",
     Base.metadata,
     Column('book_id', UUID, ForeignKey('books.id'), primary_key=True),
-    Column('category_id', Integer, ForeignKey('categories.id'), primary_key=True)
+    Column('category_id', Integer, ForeignKey('categories.id'), primary_key=True),
+    # primary key leads with book_id, books of a category are found by this one
+    Index("ix_book_category_assoc_category_id", "category_id"),
 )  # secondary table
 
 
@@ -103,6 +107,21 @@ class Category(Base, TimestampMixin):
 
 
 class Book(Base, TimestampMixin):
+    __table_args__ = (
+        # (sort key, id) indexes for keyset pagination of the catalogue
+        Index("ix_books_price_per_unit_id", "price_per_unit", "id"),
+        Index("ix_books_price_with_discount_id", "price_with_discount", "id"),
+        Index("ix_books_name_id", "name", "id"),
+        Index("ix_books_created_at_id", "created_at", "id"),
+        Index("ix_books_number_in_stock_id", "number_in_stock", "id"),
+        Index("ix_books_search_vector", "search_vector", postgresql_using="gin"),
+        # fuzzy (name__similar) and ILIKE matching of titles
+        Index(
+            "ix_books_name_trgm", "name",
+            postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}
+        ),
+    )
+
     id: Mapped[UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True,
         default=generate_uuid,
@@ -120,6 +139,13 @@ class Book(Base, TimestampMixin):
     number_in_stock: Mapped[int]
     rating: Mapped[float | None]
     discount: Mapped[int | None]
+    # names of authors and categories, maintained by triggers (see application/models/search.py)
+    search_names: Mapped[str | None] = mapped_column(server_default="", deferred=True)
+    search_vector: Mapped[str | None] = mapped_column(
+        TSVECTOR,
+        Computed(BOOK_SEARCH_VECTOR_SQL, persisted=True),
+        deferred=True
+    )
 
     # relationships
     images: Mapped[list["Image"]] = relationship(back_populates="book")
@@ -207,6 +233,11 @@ class PaymentDetail(Base, TimestampMixin):
 
 
 class Order(Base):
+    __table_args__ = (
+        Index("ix_orders_user_id", "user_id"),
+        Index("ix_orders_payment_id", "payment_id"),
+    )
+
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="RESTRICT"))
     order_status: Mapped[str | None] = mapped_column(default="pending", server_default="pending")
     order_date: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
@@ -256,7 +287,9 @@ class BookOrderAssoc(BaseWithoutId, TimestampMixin):
             "order_id",
             "book_id",
             name="pk_book_order_assoc"
-        )
+        ),
+        # foreign keys aren't indexed by postgres, primary key leads with order_id
+        Index("ix_book_order_assoc_book_id", "book_id"),
     )
 
     def __repr__(self):
@@ -270,6 +303,19 @@ class BookOrderAssoc(BaseWithoutId, TimestampMixin):
 
 
 class Author(Base, FirstLastNameValidationMixin):
+    __table_args__ = (
+        # fuzzy lookup of authors by name (AuthorRepository.find_by_name)
+        Index(
+            "ix_authors_first_name_trgm", "first_name",
+            postgresql_using="gin", postgresql_ops={"first_name": "gin_trgm_ops"}
+        ),
+        Index(
+            "ix_authors_last_name_trgm", "last_name",
+            postgresql_using="gin", postgresql_ops={"last_name": "gin_trgm_ops"}
+        ),
+        Index("ix_authors_book_id", "book_id"),
+    )
+
     first_name: Mapped[str]
     last_name: Mapped[str]
     book_id: Mapped[str | None] = mapped_column(ForeignKey("books.id", ondelete="SET NULL"))
@@ -289,6 +335,10 @@ class Author(Base, FirstLastNameValidationMixin):
 
 
 class Publisher(Base, FirstLastNameValidationMixin):
+    __table_args__ = (
+        Index("ix_publishers_book_id", "book_id"),
+    )
+
     first_name: Mapped[str]
     last_name: Mapped[str]
     book_id: Mapped[str | None] = mapped_column(ForeignKey("books.id", ondelete="SET NULL"))
@@ -365,7 +415,8 @@ class CartItem(BaseWithoutId, TimestampMixin):
             "session_id",
             "book_id",
             name="pk_cart_items"
-        )
+        ),
+        Index("ix_cart_items_book_id", "book_id"),
     )
 
     def __repr__(self):
@@ -377,6 +428,10 @@ class CartItem(BaseWithoutId, TimestampMixin):
 
 
 class Image(Base):
+    __table_args__ = (
+        Index("ix_images_book_id", "book_id"),
+    )
+
     book_id: Mapped[str | None] = mapped_column(ForeignKey("books.id"))
     url: Mapped[str | None]
 
@@ -384,3 +439,6 @@ class Image(Base):
 
     def __repr__(self):
         return f"Image(id={self.id}, book_id={self.book_id}, url={self.url})"
+
+
+register_search_ddl(Base.metadata)
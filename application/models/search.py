@@ -0,0 +1,88 @@
+from sqlalchemy import DDL, MetaData, event
+
+__all__ = (
+    "BOOK_SEARCH_CONFIG",
+    "BOOK_SEARCH_VECTOR_SQL",
+    "BOOK_SEARCH_NAMES_DDL",
+    "register_search_ddl",
+)
+
+# text search configuration of books.search_vector and of search queries
+BOOK_SEARCH_CONFIG = "english"
+
+# title weighs the most, then names of authors and categories, then description
+_search_config = f"'{BOOK_SEARCH_CONFIG}'::regconfig"
+BOOK_SEARCH_VECTOR_SQL = (
+    f"setweight(to_tsvector({_search_config}, coalesce(name, '')), 'A') || "
+    f"setweight(to_tsvector({_search_config}, coalesce(search_names, '')), 'B') || "
+    f"setweight(to_tsvector({_search_config}, coalesce(description, '')), 'C')"
+)
+
+# generated columns can't read other tables, so names of authors and categories are copied
+# to books.search_names by triggers and the generated search_vector picks them up
+BOOK_SEARCH_NAMES_DDL = (
+    """
+    CREATE OR REPLACE FUNCTION refresh_book_search_names(book_ids uuid[]) RETURNS void AS $$
+        UPDATE books SET search_names = concat_ws(
+            ' ',
+            (
+                SELECT string_agg(a.first_name || ' ' || a.last_name, ' ') FROM authors a
+                WHERE a.book_id = books.id
+            ),
+            (
+                SELECT string_agg(c.name, ' ') FROM book_category_assoc bc
+                JOIN categories c ON c.id = bc.category_id
+                WHERE bc.book_id = books.id
+            )
+        )
+        WHERE books.id = ANY(book_ids)
+    $$ LANGUAGE sql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION refresh_book_search_names_trigger() RETURNS trigger AS $$
+    BEGIN
+        IF TG_TABLE_NAME = 'categories' THEN
+            PERFORM refresh_book_search_names(
+                ARRAY(SELECT book_id FROM book_category_assoc WHERE category_id = NEW.id)
+            );
+        ELSIF TG_OP = 'INSERT' THEN
+            PERFORM refresh_book_search_names(ARRAY[NEW.book_id]);
+        ELSIF TG_OP = 'DELETE' THEN
+            PERFORM refresh_book_search_names(ARRAY[OLD.book_id]);
+        ELSE
+            PERFORM refresh_book_search_names(ARRAY[OLD.book_id, NEW.book_id]);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER tr_authors_book_search_names
+    AFTER INSERT OR DELETE OR UPDATE OF first_name, last_name, book_id ON authors
+    FOR EACH ROW EXECUTE FUNCTION refresh_book_search_names_trigger()
+    """,
+    """
+    CREATE TRIGGER tr_book_category_assoc_book_search_names
+    AFTER INSERT OR DELETE OR UPDATE ON book_category_assoc
+    FOR EACH ROW EXECUTE FUNCTION refresh_book_search_names_trigger()
+    """,
+    """
+    CREATE TRIGGER tr_categories_book_search_names
+    AFTER UPDATE OF name ON categories
+    FOR EACH ROW EXECUTE FUNCTION refresh_book_search_names_trigger()
+    """,
+)
+
+
+def register_search_ddl(metadata: MetaData) -> None:
+    """
+        creates pg_trgm (trigram indexes) before the tables and the triggers after them
+        (metadata.create_all in tests), migrations create them as well
+    """
+    event.listen(
+        metadata,
+        "before_create",
+        DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+    )
+    for statement in BOOK_SEARCH_NAMES_DDL:
+        event.listen(metadata, "after_create", DDL(statement).execute_if(dialect="postgresql"))
@@ -1,6 +1,58 @@
+from typing import Protocol, Union
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from application.models import Author
 from core import OrmEntityRepository
+from core.base_repos import OrmEntityRepoInterface
+
+AUTHOR_LOOKUP_LIMIT = 20
+
+
+class AuthorRepoInterface(Protocol):
+    async def find_by_name(
+            self,
+            session: AsyncSession,
+            name: str,
+            limit: int = AUTHOR_LOOKUP_LIMIT
+    ) -> list[Author]:
+        ...
+
+
+CombinedAuthorRepoInterface = Union[OrmEntityRepoInterface, AuthorRepoInterface]
 
 
 class AuthorRepository(OrmEntityRepository):
-    from application.models import Author
-    model: Author = Author
\ No newline at end of file
+    model: Author = Author
+
+    async def find_by_name(
+            self,
+            session: AsyncSession,
+            name: str,
+            limit: int = AUTHOR_LOOKUP_LIMIT
+    ) -> list[Author]:
+        """
+            authors whose first or last name is similar to a word of the name
+            (typos included), the closest first. Every word is looked up through
+            trigram indexes on first_name and last_name
+        """
+        words: list[str] = name.split()
+        if not words:
+            return []
+
+        conditions = []
+        closeness = []
+        for word in words:
+            conditions.extend((Author.first_name.op("%")(word), Author.last_name.op("%")(word)))
+            closeness.append(
+                func.greatest(
+                    func.similarity(Author.first_name, word),
+                    func.similarity(Author.last_name, word)
+                )
+            )
+
+        stmt = select(Author).where(or_(*conditions)).order_by(
+            sum(closeness[1:], closeness[0]).desc(), Author.id
+        ).limit(limit)
+        return list((await session.scalars(stmt)).all())
@@ -1,7 +1,8 @@
 from uuid import UUID
 
 from pydantic import UUID4
-from sqlalchemy import select
+from sqlalchemy import Row, cast, func, select
+from sqlalchemy.dialects.postgresql import REGCONFIG, aggregate_order_by, array_agg
 from sqlalchemy.exc import CompileError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
@@ -9,9 +10,10 @@ from typing import Union, Protocol
 
 
 from application.services.utils.filters import Pagination, BookFilter
-from core import OrmEntityRepository
-from core.base_repos import OrmEntityRepoInterface
-from application.models import Book
+from application.repositories.inventory_repo import InventoryRepository, InventoryRepoInterface
+from core.base_repos import OrmEntityRepoInterface, apply_keyset, keyset_order
+from application.models import Author, Book, BookCategoryAssoc, BookOrderAssoc, Category
+from application.models.search import BOOK_SEARCH_CONFIG
 from core.exceptions import FilterError
 from logger import logger
 
@@ -32,11 +34,39 @@ class BookRepoInterface(Protocol):
     ) -> Book:
         pass
 
+    async def search_books(
+            self,
+            session: AsyncSession,
+            query: str,
+            filters: BookFilter,
+            pagination: Pagination
+    ) -> list[Row]:
+        ...
 
-CombinedBookRepoInterface = Union[OrmEntityRepoInterface, BookRepoInterface]
+    async def get_books_listing(
+            self,
+            session: AsyncSession,
+            filters: BookFilter,
+            pagination: Pagination
+    ) -> list[Row]:
+        ...
 
+    async def get_titles_popularity(self, session: AsyncSession) -> list[Row]:
+        ...
+
+    async def get_authors_popularity(self, session: AsyncSession) -> list[Row]:
+        ...
 
-class BookRepository(OrmEntityRepository):
+
+CombinedBookRepoInterface = Union[OrmEntityRepoInterface, BookRepoInterface, InventoryRepoInterface]
+
+# columns of ReturnBookS selected by get_books_listing
+LISTING_COLUMNS = (
+    "id", "isbn", "name", "description", "price_per_unit", "number_in_stock", "rating", "discount"
+)
+
+
+class BookRepository(InventoryRepository):
     model: Book = Book
 
     async def get_all_books(
@@ -49,18 +79,22 @@ class BookRepository(OrmEntityRepository):
             selectinload(Book.categories),
             selectinload(Book.authors)
         )
+        stmt = filters.filter(stmt)
 
-        if pagination.limit > 1000:
-            stmt = select(self.model).options(
-                selectinload(Book.categories),
-                selectinload(Book.authors)
+        if pagination.cursor is not None:
+            # seek past the last book of the previous page instead of OFFSET
+            stmt = apply_keyset(
+                stmt, self.model,
+                sort_keys=filters.sort_keys(),
+                cursor=pagination.cursor,
+                limit=pagination.limit
             )
-
-            stmt = filters.filter(stmt)
+        else:
             stmt = filters.sort(stmt).offset(
-                    pagination.page * pagination.limit
-                ).limit(pagination.limit)
+                pagination.page * pagination.limit
+            ).limit(pagination.limit)
 
+        if pagination.limit > 1000:
             try:
                 result = await session.execute(stmt)
             except CompileError:
@@ -74,23 +108,125 @@ class BookRepository(OrmEntityRepository):
             logger.debug("books: ", extra={"books": books})
             return books
 
-        stmt = select(self.model).options(
+        try:
+            books = list((await session.scalars(stmt)).all())
+        except CompileError:
+            raise FilterError()
+
+        logger.debug("books: ", extra={"books": books})
+        return books
+
+    async def get_books_listing(
+            self,
+            session: AsyncSession,
+            filters: BookFilter,
+            pagination: Pagination
+    ) -> list[Row]:
+        """
+            page of the catalogue as plain rows (LISTING_COLUMNS, genre_names, authors
+            and sort keys), names of categories and authors are aggregated by postgres,
+            so the page costs one round trip and rows aren't hydrated into entities.
+            Aggregates are computed for the rows of the page only
+        """
+        sort_keys = filters.sort_keys()
+        page = filters.filter(select(Book.id))
+        if pagination.cursor is not None:
+            page = apply_keyset(
+                page, Book, sort_keys=sort_keys, cursor=pagination.cursor, limit=pagination.limit
+            )
+        else:
+            page = filters.sort(page).offset(
+                pagination.page * pagination.limit
+            ).limit(pagination.limit)
+        page = page.subquery()
+
+        genre_names = select(
+            array_agg(aggregate_order_by(Category.name, Category.id))
+        ).join_from(
+            BookCategoryAssoc, Category, BookCategoryAssoc.c.category_id == Category.id
+        ).where(BookCategoryAssoc.c.book_id == Book.id).scalar_subquery()
+        authors = select(
+            array_agg(aggregate_order_by(Author.first_name + ", " + Author.last_name, Author.id))
+        ).where(Author.book_id == Book.id).scalar_subquery()
+
+        stmt = select(
+            *(getattr(Book, name) for name in LISTING_COLUMNS),
+            genre_names.label("genre_names"),
+            authors.label("authors"),
+            # next_cursor reads sort keys from the last row
+            *(getattr(Book, name) for name, _ in sort_keys if name not in LISTING_COLUMNS),
+        ).join(page, page.c.id == Book.id)
+        if pagination.cursor is not None:
+            stmt = stmt.order_by(*keyset_order(Book, sort_keys))
+        else:
+            stmt = filters.sort(stmt)
+
+        try:
+            return list((await session.execute(stmt)).all())
+        except CompileError:
+            raise FilterError()
+
+    async def search_books(
+            self,
+            session: AsyncSession,
+            query: str,
+            filters: BookFilter,
+            pagination: Pagination
+    ) -> list[Row]:
+        """
+            (Book, rank, name_highlight, description_highlight) rows of books matching the query
+            (web search syntax: words, "quoted phrases", -excluded words, or).
+            Books are found through the GIN index on search_vector and ranked,
+            unless order_by is given.
+            Highlights are built for the rows of the page only, as ts_headline reparses the text
+        """
+        config = cast(BOOK_SEARCH_CONFIG, REGCONFIG)
+        ts_query = func.websearch_to_tsquery(config, query)
+        rank = func.ts_rank_cd(Book.search_vector, ts_query).label("rank")
+
+        sort_keys = filters.sort_keys()
+        page = filters.filter(
+            select(Book.id, rank).where(Book.search_vector.op("@@")(ts_query))
+        ).order_by(
+            *(keyset_order(Book, sort_keys) if sort_keys else (rank.desc(), Book.id))
+        ).offset(pagination.page * pagination.limit).limit(pagination.limit).subquery()
+
+        stmt = select(
+            Book,
+            page.c.rank,
+            func.ts_headline(config, Book.name, ts_query, "HighlightAll=true"),
+            func.ts_headline(
+                config, Book.description, ts_query, "MaxFragments=2, MaxWords=20, MinWords=5"
+            ),
+        ).join(page, page.c.id == Book.id).options(
             selectinload(Book.categories),
             selectinload(Book.authors)
+        ).order_by(
+            *(keyset_order(Book, sort_keys) if sort_keys else (page.c.rank.desc(), Book.id))
         )
 
-        stmt = filters.filter(stmt)
-        stmt = filters.sort(stmt).offset(
-            pagination.page * pagination.limit
-        ).limit(pagination.limit)
-
         try:
-            books = list((await session.scalars(stmt)).all())
+            return list((await session.execute(stmt)).all())
         except CompileError:
             raise FilterError()
 
-        logger.debug("books: ", extra={"books": books})
-        return books
+    async def get_titles_popularity(self, session: AsyncSession) -> list[Row]:
+        """(id, name, copies ordered) of every book, source of the autocomplete index"""
+        stmt = select(
+            Book.id, Book.name, func.coalesce(func.sum(BookOrderAssoc.count_ordered), 0)
+        ).outerjoin(BookOrderAssoc, BookOrderAssoc.book_id == Book.id).group_by(Book.id)
+        return list((await session.execute(stmt)).all())
+
+    async def get_authors_popularity(self, session: AsyncSession) -> list[Row]:
+        """(first name, last name, copies of their books ordered) of every author"""
+        stmt = select(
+            Author.first_name,
+            Author.last_name,
+            func.coalesce(func.sum(BookOrderAssoc.count_ordered), 0)
+        ).outerjoin(BookOrderAssoc, BookOrderAssoc.book_id == Author.book_id).group_by(
+            Author.first_name, Author.last_name
+        )
+        return list((await session.execute(stmt)).all())
 
     async def get_by_id(
             self,
@@ -1,5 +1,8 @@
+import time
 from uuid import UUID
-from sqlalchemy import select, delete, and_
+
+from aioredis import Redis, RedisError
+from sqlalchemy import select, delete, update, and_, func, literal_column
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload, joinedload
@@ -13,7 +16,8 @@ from typing import Protocol, Union, TypeAlias, Optional
 from core.exceptions import NotFoundError, DBError
 from infrastructure.postgres import db_client
 from logger import logger
-from datetime import datetime
+
+EXPIRED_CARTS_BATCH_SIZE = 1000
 
 
 class CartRepositoryInterface(Protocol):
@@ -50,12 +54,13 @@ class CartRepositoryInterface(Protocol):
             self,
             session: AsyncSession,
             shopping_session_id: UUID
-    ) -> None:
+    ) -> dict[UUID, int]:
         ...
 
     async def delete_expired_carts(
             self,
-    ) -> None:
+            batch_size: int = EXPIRED_CARTS_BATCH_SIZE,
+    ) -> dict:
         ...
 
 
@@ -157,21 +162,31 @@ class CartRepository(OrmEntityRepository):
             self,
             session: AsyncSession,
             shopping_session_id: UUID
-    ) -> None:
-        stmt = select(self.model).where(self.model.session_id == str(shopping_session_id))
-        obj: Union[ShoppingSession, None] = (await session.execute(stmt)).one_or_none()
-
-        if not obj:
-            raise NotFoundError(entity="Cart")
-
-        await session.delete(obj)
-        await session.commit()
+    ) -> dict[UUID, int]:
+        """
+            deletes the shopping session with its items without committing,
+            returns quantities of the deleted items by book id (books to return to stock)
+        """
+        delete_items = delete(CartItem).where(
+            CartItem.session_id == str(shopping_session_id)
+        ).returning(
+            CartItem.book_id, CartItem.quantity
+        ).execution_options(synchronize_session=False)
+        delete_session = delete(ShoppingSession).where(
+            ShoppingSession.id == str(shopping_session_id)
+        ).returning(ShoppingSession.id).execution_options(synchronize_session=False)
 
         try:
-            await session.execute(stmt)
+            items = (await session.execute(delete_items)).all()
+            deleted_id: Union[UUID, None] = (
+                await session.execute(delete_session)
+            ).scalar_one_or_none()
         except SQLAlchemyError as e:
             raise DBError(traceback=str(e))
-        await session.commit()
+
+        if deleted_id is None:
+            raise NotFoundError(entity="Cart")
+        return {book_id: quantity for book_id, quantity in items}
 
     async def create(
             self,
@@ -191,26 +206,85 @@ class CartRepository(OrmEntityRepository):
 
         return res
 
-    async def delete_expired_carts(self) -> None:
-        async with db_client.async_session() as session:
-            now = datetime.now()
-            stmt = select(CartItem).join_from(
-                CartItem, ShoppingSession, CartItem.session_id == ShoppingSession.id
-            ).where(ShoppingSession.expiration_time <= now)
-
-            try:
-                cart_items = (await session.scalars(stmt)).all()
-            except SQLAlchemyError as e:
-                logger.error("failed to retrieve expired carts", exc_info=True)
-                raise DBError(traceback=str(e))
-            session_ids = []
-            for item in cart_items:
-                session_ids.append(item.session_id)
+    async def delete_expired_carts(self, batch_size: int = EXPIRED_CARTS_BATCH_SIZE) -> dict:
+        """
+            deletes expired shopping sessions (with or without items) in batches of batch_size,
+            returns books of deleted carts to stock and evicts cached carts
+            (checkout deletes the cart in the order's transaction, so every cart left
+            is abandoned and its books are still reserved).
+            Every batch is a single statement in its own transaction, so locks are short
+            and concurrent purges skip each other's rows
+        """
+        from application.services.cart_service.utils.cart_converter import cart_snapshot_key
+
+        expired = select(ShoppingSession.id).where(
+            ShoppingSession.expiration_time <= func.now()
+        ).order_by(ShoppingSession.expiration_time).limit(batch_size).with_for_update(
+            of=ShoppingSession, skip_locked=True
+        ).cte("expired")  # walks ix_shopping_sessions
+        reserved = select(
+            CartItem.book_id, func.sum(CartItem.quantity).label("quantity")
+        ).where(
+            CartItem.session_id.in_(select(expired.c.id))
+        ).group_by(CartItem.book_id).cte("reserved")
+        released = update(Book).where(Book.id == reserved.c.book_id).values(
+            number_in_stock=Book.number_in_stock + reserved.c.quantity
+        ).returning(Book.id).cte("released")
+        deleted = delete(ShoppingSession).where(
+            ShoppingSession.id.in_(select(expired.c.id))
+        ).returning(ShoppingSession.id).cte("deleted")  # items are deleted by ON DELETE CASCADE
+        stmt = select(literal_column("'session'").label("kind"), deleted.c.id).union_all(
+            select(literal_column("'book'").label("kind"), released.c.id)
+        )
 
+        sessions_count, books_count = 0, 0
+        start = time.perf_counter()
+        while True:
+            async with db_client.async_session() as session:
+                try:
+                    rows = (await session.execute(stmt)).all()
+                    await session.commit()
+                except SQLAlchemyError as e:
+                    logger.error("failed to delete expired carts", exc_info=True)
+                    raise DBError(traceback=str(e))
+
+            session_ids: list[UUID] = [row.id for row in rows if row.kind == "session"]
+            book_ids: list[UUID] = [row.id for row in rows if row.kind == "book"]
+            sessions_count += len(session_ids)
+            books_count += len(book_ids)
+
+            await self._evict_expired_carts(
+                snapshot_keys=[cart_snapshot_key(session_id) for session_id in session_ids],
+                book_ids=book_ids
+            )
+            if len(session_ids) < batch_size:
+                break
+
+        elapsed = time.perf_counter() - start
+        report = {
+            "deleted_sessions": sessions_count,
+            "released_books": books_count,
+            "seconds": round(elapsed, 3),
+            "rows_per_second": round(sessions_count / elapsed, 1) if elapsed else 0.0,
+        }
+        logger.info("Expired carts have been deleted", extra=report)
+        return report
+
+    @staticmethod
+    async def _evict_expired_carts(snapshot_keys: list[str], book_ids: list[UUID]) -> None:
+        """removes snapshots of deleted carts and cached books whose stock has changed"""
+        from core.utils.cache import cache_engine
+        from infrastructure.redis import redis_client
+
+        redis_con: Union[Redis, None] = await redis_client.connect()
+        if redis_con is not None and snapshot_keys:
             try:
-                delete_stmt = delete(ShoppingSession).where(ShoppingSession.id.in_(session_ids))
-            except SQLAlchemyError as e:
-                logger.error("failed to delete expired carts", exc_info=True)
-                raise DBError(traceback=str(e))
-            await session.execute(delete_stmt)
-            await session.commit()
+                await redis_con.unlink(*snapshot_keys)  # one round trip per batch
+            except RedisError:
+                logger.error("failed to evict cached expired carts", exc_info=True)
+
+        if book_ids:
+            # like stock reservations, only the changed books (listing pages expire shortly)
+            await cache_engine.invalidate_tags(
+                *[f"{Book.__tablename__}:{book_id}" for book_id in book_ids]
+            )
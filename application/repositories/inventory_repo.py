@@ -0,0 +1,97 @@
+from uuid import UUID
+
+from sqlalchemy import update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from typing import Protocol, Union
+
+from application.models import Book
+from core import OrmEntityRepository
+from core.exceptions import DBError
+from core.utils.cache import invalidate_on_commit
+
+
+class InventoryRepoInterface(Protocol):
+    async def reserve_stock(
+            self,
+            session: AsyncSession,
+            book_id: UUID,
+            quantity: int
+    ) -> Union[int, None]:
+        ...
+
+    async def release_stock(
+            self,
+            session: AsyncSession,
+            book_id: UUID,
+            quantity: int
+    ) -> Union[int, None]:
+        ...
+
+
+class InventoryRepository(OrmEntityRepository):
+    """
+        Stock is changed by the database with a single conditional UPDATE,
+        so concurrent reservations can neither lose updates nor oversell.
+        Changes are committed by the caller together with the cart / order changes
+    """
+    model: Book = Book
+
+    async def reserve_stock(
+            self,
+            session: AsyncSession,
+            book_id: UUID,
+            quantity: int
+    ) -> Union[int, None]:
+        """
+            decrements number_in_stock if there are enough books,
+            returns number of books left or None if there aren't enough books (or no book)
+        """
+        stmt = update(Book).where(
+            Book.id == str(book_id),
+            Book.number_in_stock >= quantity
+        ).values(
+            number_in_stock=Book.number_in_stock - quantity
+        ).returning(Book.number_in_stock).execution_options(synchronize_session=False)
+        return await self._change_stock(session=session, stmt=stmt, book_id=book_id)
+
+    async def release_stock(
+            self,
+            session: AsyncSession,
+            book_id: UUID,
+            quantity: int
+    ) -> Union[int, None]:
+        """
+            returns reserved books to stock,
+            returns number of books in stock or None if there is no book
+        """
+        stmt = update(Book).where(
+            Book.id == str(book_id)
+        ).values(
+            number_in_stock=Book.number_in_stock + quantity
+        ).returning(Book.number_in_stock).execution_options(synchronize_session=False)
+        return await self._change_stock(session=session, stmt=stmt, book_id=book_id)
+
+    async def _change_stock(
+            self,
+            session: AsyncSession,
+            stmt,
+            book_id: UUID
+    ) -> Union[int, None]:
+        try:
+            number_in_stock: Union[int, None] = (await session.execute(stmt)).scalar_one_or_none()
+        except SQLAlchemyError as e:
+            raise DBError(traceback=str(e))
+
+        if number_in_stock is not None:
+            # only the cached book: evicting "books" would drop every listing page
+            # on each add to cart, pages show stock that is at most
+            # BOOKS_PAGE_CACHE_TIME old instead
+            invalidate_on_commit(session, f"{Book.__tablename__}:{book_id}")
+            for instance in session.identity_map.values():
+                # loaded book would show stock from before the update otherwise
+                if isinstance(instance, Book) and str(instance.id) == str(book_id):
+                    set_committed_value(instance, "number_in_stock", number_in_stock)
+        return number_in_stock
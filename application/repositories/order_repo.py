@@ -7,11 +7,12 @@ from sqlalchemy.exc import SQLAlchemyError
 
 from application.services.utils.filters import Pagination
 from core import OrmEntityRepository
-from core.base_repos import OrmEntityRepoInterface
+from core.base_repos import OrmEntityRepoInterface, apply_keyset, keyset_order
 
 from application.models import Order, Book, BookOrderAssoc, User
 from typing import Protocol, Union, TypeAlias
 from core.exceptions import NotFoundError, DBError
+from core.utils.cache import invalidate_on_commit, flush_cache_invalidation
 
 __all__ = (
     "OrderRepository",
@@ -102,7 +103,15 @@ class OrderRepository(OrmEntityRepository):
             selectinload(Order.user).load_only(
                 User.first_name, User.last_name, User.email
             )
-        ).offset(pagination.page * pagination.limit).limit(pagination.limit)
+        )
+        if pagination.cursor is not None:
+            stmt = apply_keyset(
+                stmt, Order, sort_keys=[], cursor=pagination.cursor, limit=pagination.limit
+            )
+        else:
+            stmt = stmt.order_by(*keyset_order(Order, [])).offset(
+                pagination.page * pagination.limit
+            ).limit(pagination.limit)
 
         orders: list[Order] = list(await session.scalars(stmt))
 
@@ -233,11 +242,13 @@ class OrderRepository(OrmEntityRepository):
                 BookOrderAssoc.order_id == order_id
             )
         )
+        invalidate_on_commit(session, *self.cache_tags(order_id))
         try:
             await session.execute(stmt)
             await session.commit()
         except SQLAlchemyError as e:
             raise DBError(traceback=str(e))
+        await flush_cache_invalidation(session)  # also flushes tags of the released books
 
 
 
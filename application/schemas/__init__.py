@@ -1,5 +1,7 @@
 __all__ = (
     "ReturnBookS",
+    "SearchBookS",
+    "BookSuggestionS",
     "ReturnOrderS",
     "ShortenedReturnOrderS",
     "ReturnUserS",
@@ -59,6 +61,8 @@ __all__ = (
 
 from .book_schemas import (
     ReturnBookS,
+    SearchBookS,
+    BookSuggestionS,
     CreateBookS,
     UpdateBookS,
     UpdatePartiallyBookS,
@@ -1,3 +1,4 @@
+from typing import Literal
 from uuid import UUID
 
 from application.schemas.base_schemas import BookBaseS
@@ -13,7 +14,19 @@ class ReturnBookS(BookIdS, BookBaseS):
     genre_names: list[str]
     authors: list[str]
     rating: float | None
-    discount: int
+    discount: int | None
+
+
+class SearchBookS(ReturnBookS):
+    rank: float
+    name_highlight: str  # matched words are wrapped into <b></b>
+    description_highlight: str | None
+
+
+class BookSuggestionS(BaseModel):
+    kind: Literal["book", "author"]
+    text: str
+    book_id: UUID | None  # set for books
 
 
 class CreateBookS(BookBaseS):
@@ -16,3 +16,4 @@ class BookFilterS(BaseModel):
 class PaginationS(BaseModel):
     page: int = Field(ge=0, default=0)
     limit: int = Field(ge=1, default=5)
+    cursor: str | None = None  # X-Next-Cursor of the previous page, page is ignored if set
@@ -5,8 +5,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from application.schemas.domain_model_schemas import AuthorS
 from core import EntityBaseService
-from core.base_repos import OrmEntityRepoInterface
-from application.repositories.author_repo import AuthorRepository
+from core.base_repos import Page, next_cursor
+from application.models import Author
+from application.schemas.filters import PaginationS
+from application.repositories.author_repo import AuthorRepository, CombinedAuthorRepoInterface
 from application.schemas import (
     CreateAuthorS,
     ReturnAuthorS,
@@ -23,23 +25,36 @@ class AuthorService(EntityBaseService):
     def __init__(
         self,
         author_repo: Annotated[
-            OrmEntityRepoInterface, Depends(AuthorRepository)
+            CombinedAuthorRepoInterface, Depends(AuthorRepository)
         ],
     ):
         super().__init__(auhor_repo=author_repo)
         self._author_repo = author_repo
 
     async def get_all_authors(
-        self, session: AsyncSession
-    ) -> list[ReturnAuthorS]:
-        return await super().get_all(
+        self, session: AsyncSession, pagination: PaginationS
+    ) -> Page:
+        authors: list[Author] = await super().get_all(
             repo=self._author_repo,
             session=session,
+            page=pagination.page,
+            limit=pagination.limit,
+            cursor=pagination.cursor,
+        )
+        return Page(
+            items=authors,
+            next_cursor=next_cursor(authors, Author, sort_keys=[], limit=pagination.limit)
         )
 
     async def get_authors_by_filters(
-        self, session: AsyncSession, **filters
+        self, session: AsyncSession, name: str | None = None, **filters
     ) -> list[ReturnAuthorS]:
+        """
+            with name authors are looked up by similar first / last names (typos included),
+            the closest first
+        """
+        if name is not None:
+            return await self._author_repo.find_by_name(session=session, name=name)
         return await super().get_all(
             repo=self._author_repo, session=session, **filters
         )
@@ -0,0 +1,9 @@
+__all__ = (
+    "AutocompleteIndex",
+    "Suggestion",
+    "BookSuggestions",
+    "book_suggestions",
+)
+
+from .index import AutocompleteIndex, Suggestion
+from .book_suggestions import BookSuggestions, book_suggestions
@@ -0,0 +1,149 @@
+import asyncio
+import json
+from typing import Union
+from uuid import UUID
+
+from aioredis import Redis, RedisError
+from aioredis.client import PubSub
+from sqlalchemy.exc import SQLAlchemyError
+
+from application.repositories.book_repo import BookRepository, CombinedBookRepoInterface
+from application.schemas import BookSuggestionS
+from application.services.autocomplete.index import AutocompleteIndex, Suggestion
+from core.config import settings
+from infrastructure.postgres import db_client
+from infrastructure.redis import redis_client
+from infrastructure.redis.app import RedisConnector
+from logger import logger
+
+__all__ = (
+    "BookSuggestions",
+    "book_suggestions",
+)
+
+
+class BookSuggestions:
+    """
+        Autocomplete of book titles and author names served from the memory of the worker.
+        The index is built from BookRepository on start, books created, renamed or deleted
+        on any worker are applied by every worker through redis pub/sub (see start)
+    """
+
+    def __init__(
+            self,
+            redis_connector: RedisConnector,
+            book_repo: CombinedBookRepoInterface,
+            index: AutocompleteIndex,
+            channel: str,
+    ):
+        self._redis_connector = redis_connector
+        self._book_repo = book_repo
+        self.index = index
+        self._channel = channel
+        self._pubsub: Union[PubSub, None] = None
+        self._listener: Union[asyncio.Task, None] = None
+
+    def suggest(self, prefix: str, limit: int) -> list[BookSuggestionS]:
+        """titles and author names with a word starting with the prefix, the most ordered first"""
+        return [
+            BookSuggestionS(
+                kind=suggestion.kind,
+                text=suggestion.text,
+                book_id=suggestion.ref if suggestion.kind == "book" else None
+            )
+            for suggestion in self.index.suggest(prefix, limit)
+        ]
+
+    async def rebuild(self) -> None:
+        """loads every title and author with copies ordered as popularity"""
+        try:
+            async with db_client.async_session() as session:
+                titles = await self._book_repo.get_titles_popularity(session=session)
+                authors = await self._book_repo.get_authors_popularity(session=session)
+        except (SQLAlchemyError, OSError):
+            logger.error("Failed to load autocomplete index", exc_info=True)
+            return
+
+        author_names: list[tuple[str, int]] = [
+            (f"{first_name} {last_name}", popularity)
+            for first_name, last_name, popularity in authors
+        ]
+        self.index.load([
+            *(
+                Suggestion("book", str(book_id), name, popularity)
+                for book_id, name, popularity in titles
+            ),
+            *(Suggestion("author", name, name, popularity) for name, popularity in author_names),
+        ])
+        logger.info("Autocomplete index loaded", extra={"suggestions": len(self.index)})
+
+    async def book_saved(self, book_id: Union[str, UUID], name: str) -> None:
+        await self._apply_everywhere({"event": "saved", "book_id": str(book_id), "name": name})
+
+    async def book_deleted(self, book_id: Union[str, UUID]) -> None:
+        await self._apply_everywhere({"event": "deleted", "book_id": str(book_id)})
+
+    async def _apply_everywhere(self, change: dict) -> None:
+        # applied here at once, other workers apply it from the channel (applying twice is harmless)
+        self._apply(change)
+        redis_con: Union[Redis, None] = await self._redis_connector.connect()
+        if not redis_con:
+            return
+        try:
+            await redis_con.publish(self._channel, json.dumps(change))
+        except RedisError:
+            extra = {"change": change}
+            logger.error("Failed to publish autocomplete change", extra=extra, exc_info=True)
+
+    def _apply(self, change: dict) -> None:
+        if change["event"] == "deleted":
+            self.index.remove("book", change["book_id"])
+            return
+        previous: Union[Suggestion, None] = self.index.get("book", change["book_id"])
+        self.index.add(Suggestion(
+            "book", change["book_id"], change["name"], previous.popularity if previous else 0
+        ))
+
+    async def start(self) -> None:
+        """
+            subscribes before the index is read from the db, so that changes made meanwhile
+            wait in the subscription and are applied after it
+        """
+        redis_con: Union[Redis, None] = await self._redis_connector.connect()
+        if redis_con and self._listener is None:
+            self._pubsub = redis_con.pubsub(ignore_subscribe_messages=True)
+            await self._pubsub.subscribe(self._channel)
+        await self.rebuild()
+        if self._pubsub is not None:
+            self._listener = asyncio.create_task(self._listen())
+            logger.info(f"Autocomplete subscribed to {self._channel}")
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.unsubscribe(self._channel)
+            await self._pubsub.close()
+            self._pubsub = None
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                message = await self._pubsub.get_message(timeout=1.0)
+            except RedisError:
+                logger.error("Autocomplete listener error", exc_info=True)
+                await asyncio.sleep(1)
+                await self.rebuild()  # changes might have been lost
+                continue
+
+            if message is not None:
+                self._apply(json.loads(message["data"]))
+
+
+book_suggestions = BookSuggestions(
+    redis_connector=redis_client,
+    book_repo=BookRepository(),
+    index=AutocompleteIndex(limit=settings.AUTOCOMPLETE_LIMIT),
+    channel=settings.AUTOCOMPLETE_CHANNEL,
+)
@@ -0,0 +1,151 @@
+import heapq
+import re
+from array import array
+from bisect import bisect_left, insort
+from typing import Iterable, NamedTuple, Union
+
+__all__ = (
+    "Suggestion",
+    "AutocompleteIndex",
+)
+
+WORD_START = re.compile(r"\b\w")
+MAX_WORD_OFFSET = 255  # positions pack (slot, offset) into one integer, later words aren't indexed
+# sorts after any character, so [prefix, prefix + PREFIX_END) holds its keys
+PREFIX_END = "\U0010ffff"
+WARM_PREFIX_LENGTH = 2  # tops of the shortest (the most crowded) prefixes are computed by load
+
+
+class Suggestion(NamedTuple):
+    kind: str  # "book" or "author"
+    ref: str  # id of the book, name of the author
+    text: str
+    popularity: int
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+class AutocompleteIndex:
+    """
+        Prefix index of suggestions (titles of books, names of authors) kept in the worker.
+
+        Every word start of a suggestion is a position in a sorted array of integers
+        (8 bytes per position), so "riv" matches "Golden river". Prefixes matched by fewer than
+        scan_threshold positions are ranked by popularity on the fly, top suggestions of the
+        crowded ones are computed once and then kept up to date by add / remove
+    """
+
+    def __init__(self, limit: int = 10, scan_threshold: int = 256):
+        self.limit = limit
+        self.scan_threshold = scan_threshold
+        self._suggestions: list[Union[Suggestion, None]] = []  # slot -> suggestion
+        self._slots: dict[tuple[str, str], int] = {}  # (kind, ref) -> slot
+        self._free_slots: list[int] = []
+        self._positions: array = array("q")  # slot << 8 | offset, sorted by the text from offset
+        self._top: dict[str, list[int]] = {}  # crowded prefix -> slots, the most popular first
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def load(self, suggestions: Iterable[Suggestion]) -> None:
+        """replaces every suggestion of the index"""
+        # the last suggestion with the same kind and ref wins, as with add
+        unique: dict[tuple[str, str], Suggestion] = {
+            (suggestion.kind, suggestion.ref): suggestion._replace(text=normalize(suggestion.text))
+            for suggestion in suggestions
+        }
+        self._suggestions = list(unique.values())
+        self._slots = {identity: slot for slot, identity in enumerate(unique)}
+        self._free_slots = []
+        self._top = {}
+        positions: list[int] = [
+            slot << 8 | offset
+            for slot, suggestion in enumerate(self._suggestions)
+            for offset in self._offsets(suggestion.text)
+        ]
+        positions.sort(key=self._key)
+        self._positions = array("q", positions)
+
+        for length in range(1, WARM_PREFIX_LENGTH + 1):
+            start = 0
+            while start < len(self._positions):
+                prefix = self._key(self._positions[start])[:length]
+                self.suggest(prefix)
+                start = bisect_left(self._positions, prefix + PREFIX_END, lo=start, key=self._key)
+
+    def get(self, kind: str, ref: str) -> Union[Suggestion, None]:
+        slot = self._slots.get((kind, ref))
+        return None if slot is None else self._suggestions[slot]
+
+    def add(self, suggestion: Suggestion) -> None:
+        """adds the suggestion or replaces the one with the same kind and ref"""
+        self.remove(suggestion.kind, suggestion.ref)
+        suggestion = suggestion._replace(text=normalize(suggestion.text))
+        slot = self._free_slots.pop() if self._free_slots else len(self._suggestions)
+        if slot == len(self._suggestions):
+            self._suggestions.append(suggestion)
+        else:
+            self._suggestions[slot] = suggestion
+        self._slots[(suggestion.kind, suggestion.ref)] = slot
+
+        for offset in self._offsets(suggestion.text):
+            insort(self._positions, slot << 8 | offset, key=self._key)
+            key = self._key(slot << 8 | offset)
+            for end in range(1, len(key) + 1):
+                top: Union[list[int], None] = self._top.get(key[:end])
+                if top is not None and slot not in top:
+                    top.append(slot)
+                    top.sort(key=self._popularity, reverse=True)
+                    del top[self.limit:]
+
+    def remove(self, kind: str, ref: str) -> None:
+        slot = self._slots.pop((kind, ref), None)
+        if slot is None:
+            return
+
+        for offset in self._offsets(self._suggestions[slot].text):
+            position = slot << 8 | offset
+            key = self._key(position)
+            i = bisect_left(self._positions, key, key=self._key)
+            # positions with equal keys are next to each other
+            while self._positions[i] != position:
+                i += 1
+            del self._positions[i]
+            # the next best suggestion of the prefix is unknown, so its top is computed again
+            for end in range(1, len(key) + 1):
+                top: Union[list[int], None] = self._top.get(key[:end])
+                if top is not None and slot in top:
+                    del self._top[key[:end]]
+        self._suggestions[slot] = None
+        self._free_slots.append(slot)
+
+    def suggest(self, prefix: str, limit: Union[int, None] = None) -> list[Suggestion]:
+        """the most popular suggestions having a word starting with the prefix"""
+        limit = min(limit or self.limit, self.limit)
+        prefix = normalize(prefix).casefold()
+        if not prefix:
+            return []
+
+        top: Union[list[int], None] = self._top.get(prefix)
+        if top is None:
+            start = bisect_left(self._positions, prefix, key=self._key)
+            end = bisect_left(self._positions, prefix + PREFIX_END, lo=start, key=self._key)
+            slots = {position >> 8 for position in self._positions[start:end]}
+            top = heapq.nlargest(self.limit, slots, key=self._popularity)
+            if end - start > self.scan_threshold:
+                self._top[prefix] = top
+        return [self._suggestions[slot] for slot in top[:limit]]
+
+    def _key(self, position: int) -> str:
+        return self._suggestions[position >> 8].text[position & 0xFF:].casefold()
+
+    def _popularity(self, slot: int) -> int:
+        return self._suggestions[slot].popularity
+
+    @staticmethod
+    def _offsets(text: str) -> list[int]:
+        return [
+            match.start() for match in WORD_START.finditer(text) if match.start() <= MAX_WORD_OFFSET
+        ]
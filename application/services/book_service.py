@@ -1,3 +1,4 @@
+from datetime import timedelta
 from uuid import UUID
 
 from fastapi import Depends
@@ -5,13 +6,14 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from application.models import Book
 from core import EntityBaseService
-from core.base_repos import OrmEntityRepoInterface
-from core.exceptions import EntityDoesNotExist, DomainModelConversionError
+from core.base_repos import OrmEntityRepoInterface, Page, next_cursor
+from core.exceptions import EntityDoesNotExist, DomainModelConversionError, BadRequest
 from application.schemas.book_schemas import CreateBookS
 
 from application.schemas import (
     ReturnImageS,
     ReturnBookS,
+    SearchBookS,
     UpdateBookS,
     UpdatePartiallyBookS, BookIdS,
 )
@@ -19,12 +21,20 @@ from application.schemas import (
 from application.repositories.book_repo import BookRepository
 from application.repositories.image_repo import ImageRepository
 from application.services.storage import StorageServiceInterface, InternalStorageService
+from application.services.autocomplete import book_suggestions
+from infrastructure.postgres import db_client
 from typing import Annotated
 from application.schemas.domain_model_schemas import BookS
 from pydantic import ValidationError, PydanticSchemaGenerationError
 from application.services.utils.filters import BookFilter, Pagination
+from core.utils.cache import cache_engine, canonical_hash, get_type_adapter
 from logger import logger
 
+BOOKS_PAGE_CACHE_VERSION = 3  # bump when ReturnBookS or the page format changes
+BOOKS_PAGE_CACHE_TIME = timedelta(seconds=30)  # short, as changes of stock don't evict pages
+# listing contains names of authors and categories, so their changes evict it too
+BOOKS_PAGE_CACHE_TAGS = ("books", "authors", "categories")
+
 
 class BookService(EntityBaseService):
     from application.repositories.book_repo import CombinedBookRepoInterface
@@ -76,32 +86,106 @@ class BookService(EntityBaseService):
             session: AsyncSession,
             filters: BookFilter,
             pagination: Pagination
-    ) -> list[ReturnBookS]:
-        books: list[Book] = await self._book_repo.get_all_books(
+    ) -> Page:
+        if filters.sorted_by_similarity and pagination.cursor is not None:
+            raise BadRequest(
+                "Books ordered by similarity are paginated by page, cursor isn't supported"
+            )
+
+        rows = await self._book_repo.get_books_listing(
             session=session,
             filters=filters,
             pagination=pagination
-           )
-        res: list[ReturnBookS] = []
+        )
+        # validated, so that values of the db (numerics, NULLs) are coerced
+        # to the types of the schema
+        res: list[ReturnBookS] = get_type_adapter(list[ReturnBookS]).validate_python([
+            {**row._mapping, "genre_names": row.genre_names or [], "authors": row.authors or []}
+            for row in rows
+        ])
+        return Page(
+            items=res,
+            next_cursor=None if filters.sorted_by_similarity else next_cursor(
+                rows, Book, sort_keys=filters.sort_keys(), limit=pagination.limit
+            )
+        )
 
-        for book in books:
-            genre_names = [category.name for category in book.categories]
-            authors = [", ".join(
-                [author.first_name, author.last_name]) for author in book.authors]
+    async def get_all_books_json(
+            self,
+            filters: BookFilter,
+            pagination: Pagination
+    ) -> tuple[bytes, str | None]:
+        """
+            serialized page of books with cursor of the next page, cached under
+            a hash of filters and pagination, so cache hits skip the query
+            and pydantic validation
+        """
+        key = (
+            f"cache:book_service.get_all_books:v{BOOKS_PAGE_CACHE_VERSION}:"
+            f"{canonical_hash(filters, pagination)}"
+        )
+
+        async def load() -> bytes:
+            # shared by concurrent misses (see CacheEngine.get_or_load), so it doesn't use
+            # the session of the request that started it. Primary, as a page read from a lagging
+            # replica right after invalidation would be cached for BOOKS_PAGE_CACHE_TIME
+            async with db_client.async_session() as load_session:
+                page: Page = await self.get_all_books(
+                    session=load_session,
+                    filters=filters,
+                    pagination=pagination
+                )
+            books: bytes = get_type_adapter(list[ReturnBookS]).dump_json(page.items)
+            # cursor is base64, so the first line of the cached value is the cursor
+            return (page.next_cursor or "").encode() + b"\n" + books
+
+        cached_page: bytes = await cache_engine.get_or_load(
+            key=key,
+            loader=load,
+            ttl=BOOKS_PAGE_CACHE_TIME,
+            tags=BOOKS_PAGE_CACHE_TAGS,
+            load_group="book_service.get_all_books"
+        )
+        cursor, books = cached_page.split(b"\n", 1)
+        return books, cursor.decode() or None
 
-            res.append(ReturnBookS(
+    async def search_books(
+            self,
+            session: AsyncSession,
+            query: str,
+            filters: BookFilter,
+            pagination: Pagination
+    ) -> list[SearchBookS]:
+        """books matching the query, the most relevant first, with matched words highlighted"""
+        if pagination.cursor is not None:
+            raise BadRequest("Search results are paginated by page, cursor isn't supported")
+
+        rows = await self._book_repo.search_books(
+            session=session,
+            query=query,
+            filters=filters,
+            pagination=pagination
+        )
+        return [
+            SearchBookS(
                 id=book.id,
                 isbn=book.isbn,
                 name=book.name,
-                genre_names=genre_names,
-                authors=authors,
+                genre_names=[category.name for category in book.categories],
+                authors=[
+                    ", ".join([author.first_name, author.last_name]) for author in book.authors
+                ],
                 description=book.description,
                 price_per_unit=book.price_per_unit,
                 number_in_stock=book.number_in_stock,
                 rating=book.rating,
-                discount=book.discount
-            ))
-        return res
+                discount=book.discount,
+                rank=rank,
+                name_highlight=name_highlight,
+                description_highlight=description_highlight
+            )
+            for book, rank, name_highlight, description_highlight in rows
+        ]
 
     async def create_book(
             self, session: AsyncSession, dto: CreateBookS
@@ -124,6 +208,7 @@ class BookService(EntityBaseService):
             )
 
         await super().commit(session=session)
+        await book_suggestions.book_saved(book_id=book_id, name=domain_model.name)
         return BookIdS(
             id=book_id
         )
@@ -137,13 +222,14 @@ class BookService(EntityBaseService):
             _: list[ReturnImageS] = await super().get_all(
                 repo=self._image_repo, session=session, book_id=book_id
             )
+            has_images = True
         except EntityDoesNotExist:
-            return await self._storage.delete_instance_with_images(
-                delete_images=False, instance_id=book_id, session=session
-            )
-        return await self._storage.delete_instance_with_images(
-            delete_images=True, instance_id=book_id, session=session
+            has_images = False
+
+        await self._storage.delete_instance_with_images(
+            delete_images=has_images, instance_id=book_id, session=session
         )
+        await book_suggestions.book_deleted(book_id=book_id)
 
     async def update_book(
             self,
@@ -169,6 +255,8 @@ class BookService(EntityBaseService):
                 instance_id=book_id,
                 domain_model=domain_model
             )
+        if "name" in dto:
+            await book_suggestions.book_saved(book_id=book_id, name=updated_book.name)
 
         return UpdateBookS(
             isbn=updated_book.isbn,
@@ -1,18 +1,26 @@
 __all__ = (
+    "serialize_cart",
     "deserialize_cart",
-    "serialize_and_store_cart_books",
+    "cart_snapshot_key",
     "get_cart_from_cache",
     "cart_assembler",
+    "cart_book_assembler",
     "CartService",
     "store_cart_to_cache",
+    "invalidate_cart_cache",
+    "update_cached_cart_item",
 )
 
 from .utils import (
+    serialize_cart,
     deserialize_cart,
-    serialize_and_store_cart_books,
+    cart_snapshot_key,
     cart_assembler,
+    cart_book_assembler,
     get_cart_from_cache,
-    store_cart_to_cache
+    store_cart_to_cache,
+    invalidate_cart_cache,
+    update_cached_cart_item
 
 )
 
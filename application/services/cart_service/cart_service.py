@@ -1,4 +1,3 @@
-from aioredis import Redis, RedisError
 from fastapi import Depends
 from fastapi.security import HTTPAuthorizationCredentials
 from fastapi.responses import JSONResponse
@@ -11,7 +10,13 @@ from application.schemas import AddBookToCartS, ReturnCartS, ShoppingSessionIdS,
     DeleteBookFromCartS, CartPrimaryIdentifier
 from core.base_repos.unit_of_work import AbstractUnitOfWork, SqlAlchemyUnitOfWork
 from application.services import UserService, ShoppingSessionService, BookService
-from application.services.cart_service import store_cart_to_cache, serialize_and_store_cart_books, cart_assembler
+from application.services.cart_service import (
+    store_cart_to_cache,
+    invalidate_cart_cache,
+    update_cached_cart_item,
+    cart_assembler,
+    cart_book_assembler
+)
 
 from auth.helpers import get_token_payload
 from core import EntityBaseService
@@ -23,9 +28,10 @@ from uuid import UUID as uuid_UUID  # noqa
 from core.config import settings
 from core.exceptions import NotFoundError, EntityDoesNotExist, DBError, ServerError, AlreadyExistsError, \
     AddBooksToCartError, BadRequest, DeleteBooksFromCartError
-from infrastructure.redis import redis_client
 from logger import logger
 
+CART_CACHE_TIME_SECONDS = 350
+
 
 class CartService(EntityBaseService):
 
@@ -49,10 +55,9 @@ class CartService(EntityBaseService):
         self._shopping_session_service: ShoppingSessionService = shopping_session_service
         self._user_service: UserService = user_service
         self._book_service: BookService = book_service
-        self._redis_con: Redis = redis_client.connection
         self._uow: AbstractUnitOfWork = uow
 
-    @store_cart_to_cache(cache_time_seconds=350)
+    @store_cart_to_cache(cache_time_seconds=CART_CACHE_TIME_SECONDS)
     async def get_cart_by_session_id(
             self,
             session: AsyncSession,
@@ -77,7 +82,7 @@ class CartService(EntityBaseService):
 
         return assembled_cart
 
-    @store_cart_to_cache(cache_time_seconds=350)
+    @store_cart_to_cache(cache_time_seconds=CART_CACHE_TIME_SECONDS)
     async def get_cart_by_user_id(
             self,
             session: AsyncSession,
@@ -161,12 +166,27 @@ class CartService(EntityBaseService):
             session: AsyncSession,
             cart_session_id: uuid_UUID,
     ) -> None:
-        _ = await super().delete(
-            repo=self._cart_repo,
-            session=session,
-            instance_id=cart_session_id
-        )
-        await super().commit(session=session)
+        """Deletes the cart, books in it are returned to stock in the same transaction"""
+        async with self._uow.bind(session) as uow:
+            try:
+                reserved: dict[uuid_UUID, int] = (
+                    await self._cart_repo.delete_cart_by_shopping_session_id(
+                        session=uow.session,
+                        shopping_session_id=cart_session_id
+                    )
+                )
+            except NotFoundError:
+                raise EntityDoesNotExist(entity="Cart")
+
+            # sorted, so that concurrent releases lock books in the same order
+            for book_id, quantity in sorted(reserved.items()):
+                await self._book_repo.release_stock(
+                    session=uow.session,
+                    book_id=book_id,
+                    quantity=quantity
+                )
+            await uow.commit()
+        await invalidate_cart_cache(cart_session_id)
 
     async def add_book_to_cart(
             self,
@@ -201,42 +221,29 @@ class CartService(EntityBaseService):
         )  # check if book already exists in the cart
         cart_item_exists: bool = True if cart_item is not None else False
 
-        if not cart_item_exists:
-            # if there is no book in the cart yet
-            extra = {
-                "shopping_session_id": shopping_session_id,
-                "book_id": dto.book_id
-            }
-            logger.debug("cart_item wasn't found", extra=extra)
-
-            cart_item_domain_model: CartItemS = CartItemS(
-                    **dto.model_dump(exclude_none=True),
-                    session_id=shopping_session_id
-                    )
-
-            _ = await super().create(
-                session=session,
-                repo=self._cart_repo,
-                domain_model=cart_item_domain_model
-                )  # add book to the cart, if not added, http exception will be raised
-            logger.debug("cart_item was created", extra=extra)
-
-        if not cart_item_exists:
-            cart_item: CartItem = await super().get_by_id(
+        if cart_item_exists:
+            cart_item_domain_model: CartItemS = CartItemS.model_validate(
+                obj=cart_item,
+                from_attributes=True
+            )
+            shopping_session = cart_item.shopping_session
+        else:
+            # if there is no book in the cart yet,
+            # it is added in the same transaction as the stock is reserved
+            logger.debug(
+                "cart_item wasn't found",
+                extra={"shopping_session_id": shopping_session_id, "book_id": dto.book_id}
+            )
+            cart_item_domain_model: CartItemS = CartItemS.model_construct(
+                session_id=shopping_session_id,
+                book_id=dto.book_id,
+                quantity=0
+            )  # quantity is set by put_books_in_cart
+            shopping_session = await self._shopping_session_service.get_shopping_session_by_id(
                 session=session,
-                repo=self._cart_repo,
-                id=CartPrimaryIdentifier(
-                    book_id=dto.book_id,
-                    session_id=shopping_session_id
-                )
+                id=shopping_session_id
             )
 
-        cart_item_domain_model: CartItemS = CartItemS.model_validate(
-            obj=cart_item,
-            from_attributes=True
-        )
-
-        shopping_session: ShoppingSession = cart_item.shopping_session
         shopping_session_domain_model: ShoppingSessionS = ShoppingSessionS.model_validate(
             obj=shopping_session,
             from_attributes=True
@@ -251,46 +258,52 @@ class CartService(EntityBaseService):
         except AddBooksToCartError as e:
             raise BadRequest(str(e.info))
 
-        async with self._uow as uow:
-            # increment the number of ordered books in a cart
-            # update number_in_stock for the book
+        async with self._uow.bind(session) as uow:
+            # reserve books (conditional decrement of number_in_stock)
+            # add book to the cart / increment the number of ordered books in a cart
             # update total in shopping_session
+            number_in_stock: Union[int, None] = await self._book_repo.reserve_stock(
+                session=uow.session,
+                book_id=dto.book_id,
+                quantity=dto.quantity
+            )
+            if number_in_stock is None:
+                raise BadRequest(
+                    detail="You're trying to order too many books, "
+                           "there aren't enough books left in stock"
+                )  # books were taken by concurrent requests, transaction is rolled back
+
             if cart_item_exists:
                 await uow.update(
                     orm_model=CartItem,
                     obj=cart_item_domain_model
                 )
-            await uow.update(
-                orm_model=Book,
-                obj=book_domain_model
-            )
+            else:
+                uow.add(
+                    orm_model=CartItem,
+                    obj=cart_item_domain_model
+                )
             await uow.update(
                 orm_model=ShoppingSession,
                 obj=shopping_session_domain_model
             )
             await uow.commit()
 
-        session.expire_all()
-        updated_cart: ReturnCartS = await self.get_cart_by_session_id(
-            session=session,
-            shopping_session_id=shopping_session_id
-        )
-
-        if self._redis_con is not None:
-            for cart_book in updated_cart.books:
-                if str(cart_book.book_id) == str(dto.book_id):
-                    await serialize_and_store_cart_books(
-                        book=cart_book,
-                        redis_con=self._redis_con
-                    )  # store book to redis cache
+        count_ordered: int = cart_item_domain_model.quantity
 
-            cart_uq_key = f"cart:{shopping_session_id}"  # identifier of a set in cache
+        updated_cart: Union[ReturnCartS, None] = await update_cached_cart_item(
+            shopping_session_id=shopping_session_id,
+            book=cart_book_assembler(book=book, count_ordered=count_ordered),
+            cache_time_seconds=CART_CACHE_TIME_SECONDS
+        )  # apply only the changed cart item to the cached cart
 
-            await self._redis_con.sadd(
-                cart_uq_key,
-                str(dto.book_id)
-            )  # update set of books in cache
-            logger.error("Failed to update cart in cache")
+        if updated_cart is None:
+            # cart isn't cached, so it is reloaded from the db
+            session.expire_all()
+            updated_cart = await self.get_cart_by_session_id(
+                session=session,
+                shopping_session_id=shopping_session_id
+            )
 
         return updated_cart
 
@@ -344,13 +357,14 @@ class CartService(EntityBaseService):
             raise BadRequest(detail=e.info)
 
         try:
-            async with self._uow as uow:
-                # update number_in_stock for book
+            async with self._uow.bind(session) as uow:
+                # return books to stock
                 # delete book from the cart or update # noqa
                 # update total in shopping_session
-                await uow.update(
-                    obj=book_domain_model,
-                    orm_model=Book
+                await self._book_repo.release_stock(
+                    session=uow.session,
+                    book_id=deletion_data.book_id,
+                    quantity=deletion_data.quantity
                 )
 
                 if cart_item_domain_model.quantity == 0:
@@ -376,26 +390,20 @@ class CartService(EntityBaseService):
             logger.info("Book has been deleted from a cart")
             raise ServerError()
 
-        session.expire_all()
-        updated_cart: ReturnCartS = await self.get_cart_by_session_id(
-            session=session,
-            shopping_session_id=shopping_session_id
-        )
-        if self._redis_con:
-            uq_book_name = f"book:{deletion_data.book_id}"
-            try:
-                await self._redis_con.srem(
-                    uq_book_name,
-                    str(deletion_data.book_id)
-                )  # delete book from cache
-            except RedisError:
-                extra = {
-                    "uq_book_name": uq_book_name,
-                    "books_id": deletion_data.book_id
-                }
-                logger.error(
-                    "Redis error. Something went wrong while deleting book from the cache",
-                    extra=extra,
-                    exc_info=True
-                )
+        updated_cart: Union[ReturnCartS, None] = await update_cached_cart_item(
+            shopping_session_id=shopping_session_id,
+            book=cart_book_assembler(
+                book=book,
+                count_ordered=cart_item_domain_model.quantity
+            ),
+            cache_time_seconds=CART_CACHE_TIME_SECONDS
+        )  # apply only the changed cart item to the cached cart
+
+        if updated_cart is None:
+            # cart isn't cached or has become empty, so it is reloaded from the db
+            session.expire_all()
+            updated_cart = await self.get_cart_by_session_id(
+                session=session,
+                shopping_session_id=shopping_session_id
+            )
         return updated_cart
@@ -1,35 +1,41 @@
-from application.models import CartItem
+from application.models import CartItem, Book
 from application.schemas import ReturnCartS
 from application.schemas.order_schemas import AssocBookS
 
 
+def cart_book_assembler(book: Book, count_ordered: int) -> AssocBookS:
+    """converts a book (with loaded authors and categories) into AssocBookS"""
+    authors = [
+        " ".join(
+            [author.first_name, author.last_name]
+        ) for author in book.authors]  # concatenates first_name with last_name
+    categories = [
+        category.name for category in book.categories
+    ]  # creates a list of categories
+
+    return AssocBookS(
+        book_id=book.id,
+        book_title=book.name,
+        authors=authors,
+        categories=categories,
+        rating=book.rating,
+        discount=book.discount,
+        count_ordered=count_ordered,
+        price_per_unit=book.price_per_unit
+    )
+
+
 def cart_assembler(cart_items: list[CartItem]) -> ReturnCartS:
     """Walks through cart_items, retrieves books and adds them to ReturnCartS"""
 
-    books: list[AssocBookS] = []
-    for cart_item in cart_items:  # creates AssocBookS and adds it to books list
-        authors = [
-            " ".join(
-                [author.first_name, author.last_name]
-            ) for author in cart_item.book.authors]  # concatenates first_name with last_name
-        categories = [
-            category.name for category in cart_item.book.categories
-        ]  # creates a list of categories
-
-        books.append(
-            AssocBookS(
-                book_id=cart_item.book.id,
-                book_title=cart_item.book.name,
-                authors=authors,
-                categories=categories,
-                rating=cart_item.book.rating,
-                discount=cart_item.book.discount,
-                count_ordered=cart_item.quantity,
-                price_per_unit=cart_item.book.price_per_unit
-            )
-        )
+    books: list[AssocBookS] = [
+        cart_book_assembler(
+            book=cart_item.book,
+            count_ordered=cart_item.quantity
+        ) for cart_item in cart_items
+    ]  # creates AssocBookS for each cart_item
 
     return ReturnCartS(
         books=books,
         cart_id=cart_items[0].session_id
-    )
\ No newline at end of file
+    )
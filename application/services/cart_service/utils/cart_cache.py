@@ -1,28 +1,27 @@
 from functools import wraps
-from typing import Callable
+from typing import Callable, Union
 from uuid import UUID
 
-from aioredis import Redis
+from aioredis import Redis, RedisError
+from aioredis.client import Pipeline
+from aioredis.exceptions import WatchError
 from application.schemas import ReturnCartS
 from application.schemas.order_schemas import AssocBookS
-from .cart_converter import serialize_and_store_cart_books
+from .cart_converter import serialize_cart, deserialize_cart, cart_snapshot_key
 
 from core.exceptions import NoCookieError
+from infrastructure.metrics import record_cache_lookup
 from infrastructure.redis import redis_client
 from logger import logger
 
 
 def get_cart_from_cache(func: Callable):
-    from application.services.cart_service.utils import deserialize_cart
 
     @wraps(func)
     async def wrapper(
             *args, **kwargs,
     ):
-        """
-            iterates over set of book_ids in redis-set, for each book_id
-            retrieves its metadata from redis-hash and constructs ReturnCartS
-        """
+        """reads snapshot of the cart from redis with a single GET and constructs ReturnCartS"""
         redis_con: Redis = redis_client.connection
         if not redis_con:
             logger.error(
@@ -35,35 +34,29 @@ def get_cart_from_cache(func: Callable):
         if not shopping_session_id:
             raise NoCookieError("No shopping_session_id in the cookie")
 
-        cart_set_name = f"cart:{shopping_session_id}"  # name of a set where book_ids are stored
-
-        cart_exists = await redis_con.exists(cart_set_name)
+        try:
+            snapshot: Union[str, None] = await redis_con.get(
+                cart_snapshot_key(shopping_session_id)
+            )
+        except RedisError:
+            logger.error("Failed to read cart from cache", exc_info=True)
+            return await func(*args, **kwargs)
 
-        if not cart_exists:
-            logger.debug("Cart doesn't exist, call function directly")
+        if not snapshot:
+            logger.debug("Cart doesn't exist in cache, call function directly")
+            record_cache_lookup(cache="cart", result="miss")
             return await func(*args, **kwargs)
 
-        logger.debug("Cart exists, read data from redis")
+        cart: Union[ReturnCartS, None] = deserialize_cart(snapshot)
 
-        books_id: list[str] = await redis_con.smembers(
-            name=cart_set_name
-        )  # get list of book_ids stored in the cart from redis set
-
-        deserialized_cart_books: list[AssocBookS] = []
-        for book_id in books_id:
-            book_metadata_hash = f"book:{book_id}"
-            book_metadata_keys = await redis_con.hkeys(name=book_metadata_hash)
-            book_metadata_values = await redis_con.hvals(name=book_metadata_hash)
-            deserialized_book: AssocBookS = deserialize_cart(
-                book_metadata_keys=book_metadata_keys,
-                book_metadata_values=book_metadata_values
-            )
-            deserialized_cart_books.append(deserialized_book)
+        if cart is None:
+            logger.debug("Cart snapshot has outdated format, call function directly")
+            record_cache_lookup(cache="cart", result="miss")
+            return await func(*args, **kwargs)
 
-        return ReturnCartS(
-            cart_id=shopping_session_id,
-            books=deserialized_cart_books
-        )
+        logger.debug("Cart exists, read data from redis")
+        record_cache_lookup(cache="cart", result="redis_hit")
+        return cart
     return wrapper
 
 
@@ -79,33 +72,86 @@ def store_cart_to_cache(cache_time_seconds: int):
                 )
                 return assembled_cart
 
-            shopping_session_id: UUID = assembled_cart.cart_id
-
-            books_ids = set()  # set of book_ids will be stored in redis
-            for book in assembled_cart.books:
-                await serialize_and_store_cart_books(
-                    book=book,
-                    redis_con=redis_con
-                )
-                books_ids.add(str(book.book_id))
-                book_hash_name = f"book:{book.book_id}"
-                await redis_con.expire(
-                    name=book_hash_name,
-                    time=cache_time_seconds,
-                )  # set expire timeout for book_hash
-
-            for book_id in books_ids:
-                cart_set_name = f"cart:{shopping_session_id}"
-                await redis_con.sadd(
-                    cart_set_name,
-                    book_id
-                )
-                await redis_con.expire(
-                    name=f"cart:{assembled_cart.cart_id}",
-                    time=cache_time_seconds
-                )  # set expire timeout for redis-set of books
+            try:
+                await redis_con.set(
+                    name=cart_snapshot_key(assembled_cart.cart_id),
+                    value=serialize_cart(assembled_cart),
+                    ex=cache_time_seconds
+                )  # the whole cart is written with one SET
+            except RedisError:
+                extra = {"cart_id": assembled_cart.cart_id}
+                logger.error("Failed to store cart in cache", extra=extra, exc_info=True)
+                return assembled_cart
 
             logger.info("Successfully stored data in cache")
             return assembled_cart
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
+
+
+async def invalidate_cart_cache(shopping_session_id: UUID | str) -> None:
+    """removes snapshot of the cart from redis"""
+    redis_con: Redis = redis_client.connection
+    if not redis_con:
+        return
+    try:
+        await redis_con.delete(cart_snapshot_key(shopping_session_id))
+    except RedisError:
+        extra = {"shopping_session_id": shopping_session_id}
+        logger.error("Failed to invalidate cart in cache", extra=extra, exc_info=True)
+
+
+async def update_cached_cart_item(
+        shopping_session_id: UUID | str,
+        book: AssocBookS,
+        cache_time_seconds: int,
+) -> Union[ReturnCartS, None]:
+    """
+        applies a changed cart item to the cached snapshot of the cart
+        (book.count_ordered == 0 removes the book from the cart).
+        Returns updated cart or None if there is no cart in cache or the snapshot
+        has been changed concurrently (it is evicted then and reloaded from db)
+    """
+    redis_con: Redis = redis_client.connection
+    if not redis_con:
+        return None
+
+    snapshot_key = cart_snapshot_key(shopping_session_id)
+
+    async def apply_change(pipe: Pipeline) -> Union[ReturnCartS, None]:
+        snapshot: Union[str, None] = await pipe.get(snapshot_key)
+        cart: Union[ReturnCartS, None] = deserialize_cart(snapshot) if snapshot else None
+
+        if cart is not None:
+            book_ids = [cart_book.book_id for cart_book in cart.books]
+            if book.book_id in book_ids:
+                # keep position of the book in the cart
+                cart.books[book_ids.index(book.book_id)] = book
+            else:
+                cart.books.append(book)  # book is added to the cart for the first time
+            cart.books = [cart_book for cart_book in cart.books if cart_book.count_ordered > 0]
+
+        pipe.multi()
+        if cart is None or not cart.books:
+            pipe.delete(snapshot_key)  # empty or missing cart will be reloaded from db
+            return None
+        pipe.set(name=snapshot_key, value=serialize_cart(cart), ex=cache_time_seconds)
+        return cart
+
+    try:
+        async with redis_con.pipeline(transaction=True) as pipe:
+            # snapshot is watched, so concurrent changes of the cart aren't lost
+            await pipe.watch(snapshot_key)
+            cart: Union[ReturnCartS, None] = await apply_change(pipe)
+            await pipe.execute()
+            return cart
+    except WatchError:
+        extra = {"shopping_session_id": shopping_session_id}
+        logger.debug("Cart has been changed concurrently, snapshot is evicted", extra=extra)
+        await invalidate_cart_cache(shopping_session_id)
+        return None
+    except RedisError:
+        extra = {"shopping_session_id": shopping_session_id, "book_id": book.book_id}
+        logger.error("Failed to update cart item in cache", extra=extra, exc_info=True)
+        await invalidate_cart_cache(shopping_session_id)
+        return None
@@ -1,53 +1,68 @@
-import json
 from typing import Union
+from uuid import UUID
 
-from aioredis import Redis, DataError
+import orjson
 
+from application.schemas import ReturnCartS
 from application.schemas.order_schemas import AssocBookS
-from asyncpg.pgproto.pgproto import UUID as pgproto_UUID
-
-
-async def serialize_and_store_cart_books(book: AssocBookS, redis_con: Redis):
-    """serializes book metadata and stores it to redis"""
-    book_to_dict: dict = book.model_dump(exclude_none=True)
-    for key, value in book_to_dict.items():
-        # create hash for books metadata
-        try:
-            await redis_con.hset(
-                name=f"book:{book.book_id}",
-                key=key,
-                value=value
-            )
-        except DataError:
-            # if any field is unserializable, we convert it to
-            # its string representation
-            value_to_str = str(value) if type(value) == pgproto_UUID else json.dumps(value)
-
-            await redis_con.hset(
-                name=f"book:{book.book_id}",
-                key=key,
-                value=value_to_str
-            )
-
-
-def deserialize_cart(
-        book_metadata_keys: list[str],
-        book_metadata_values: list[str]
-) -> AssocBookS:
-    book_metadata = dict(zip(book_metadata_keys, book_metadata_values))
-
-    authors = book_metadata["authors"]
-    categories = book_metadata["categories"]
-
-    authors_deserialized: list[str] = json.loads(authors)  # deserializes  list
-    categories_deserialized: list[str] = json.loads(categories)  # deserializes  list
-
-    del book_metadata["authors"]  # deletes serialized list of authors
-    del book_metadata["categories"]  # deletes serialized list of categories
-
-    return AssocBookS(
-        **book_metadata,
-        authors=authors_deserialized,
-        categories=categories_deserialized
-        )
 
+# bump the version whenever the layout of a snapshot changes,
+# so that snapshots written in the old format are never read back
+CART_SNAPSHOT_VERSION = 1
+
+# books are stored as positional arrays in this order (no repeated field names)
+CART_BOOK_FIELDS = (
+    "book_id",
+    "book_title",
+    "authors",
+    "categories",
+    "rating",
+    "discount",
+    "count_ordered",
+    "price_per_unit",
+)
+
+
+def cart_snapshot_key(shopping_session_id: UUID | str) -> str:
+    """name of a redis key where the snapshot of the cart is stored"""
+    return f"cart:v{CART_SNAPSHOT_VERSION}:{shopping_session_id}"
+
+
+def serialize_cart(cart: ReturnCartS) -> bytes:
+    """packs the whole cart into one compact json blob"""
+    return orjson.dumps({
+        "v": CART_SNAPSHOT_VERSION,
+        "cart_id": str(cart.cart_id),
+        "books": [
+            [
+                str(book.book_id),
+                book.book_title,
+                book.authors,
+                book.categories,
+                book.rating,
+                book.discount,
+                book.count_ordered,
+                book.price_per_unit,
+            ] for book in cart.books
+        ]
+    })
+
+
+def deserialize_cart(snapshot: Union[str, bytes]) -> Union[ReturnCartS, None]:
+    """unpacks a cart snapshot, returns None if the snapshot has another version"""
+    cart: dict = orjson.loads(snapshot)
+
+    if cart.get("v") != CART_SNAPSHOT_VERSION:
+        return None
+
+    books: list[AssocBookS] = []
+    for book in cart["books"]:
+        book_metadata = dict(zip(CART_BOOK_FIELDS, book))
+        book_metadata["book_id"] = UUID(book_metadata["book_id"])
+        # data was validated before it was cached, so validation is skipped
+        books.append(AssocBookS.model_construct(**book_metadata))
+
+    return ReturnCartS.model_construct(
+        cart_id=UUID(cart["cart_id"]),
+        books=books
+    )
@@ -14,7 +14,7 @@ from application.repositories.shopping_session_repo import CombinedShoppingSessi
 from application.schemas.domain_model_schemas import OrderS, BookOrderAssocS, PaymentDetailS, BookS
 from application.services.order_service.utils import order_assembler
 from application.services.utils.filters import Pagination
-from core.base_repos import AbstractUnitOfWork, SqlAlchemyUnitOfWork
+from core.base_repos import AbstractUnitOfWork, SqlAlchemyUnitOfWork, Page, next_cursor
 from core.exceptions import (
     EntityDoesNotExist,
     DomainModelConversionError, NotFoundError,
@@ -47,6 +47,7 @@ from core.entity_base_service import EntityBaseService
 from application.services import (
     BookService, UserService, CartService, ShoppingSessionService
 )
+from application.services.cart_service import invalidate_cart_cache
 
 OrderId: TypeAlias = str
 books_data: TypeAlias = str
@@ -128,12 +129,13 @@ class OrderService(EntityBaseService):
 
     async def get_all_orders(
             self, session: AsyncSession, pagination: PaginationS
-    ) -> list[ShortenedReturnOrderS]:
+    ) -> Page:
         orders: list[Order] = await self._order_repo.get_all_orders(
             session=session,
             pagination=Pagination(
                 limit=pagination.limit,
                 page=pagination.page,
+                cursor=pagination.cursor,
             )
         )
 
@@ -153,7 +155,10 @@ class OrderService(EntityBaseService):
                     order_date=order.order_date
                 )
             )
-        return res
+        return Page(
+            items=res,
+            next_cursor=next_cursor(orders, Order, sort_keys=[], limit=pagination.limit)
+        )
 
     async def get_order_by_id(
             self, session: AsyncSession, order_id: int
@@ -361,43 +366,30 @@ class OrderService(EntityBaseService):
 
         order_item_exists: bool = True if order_item is not None else False
 
-        if not order_item_exists:
-            # if there is no book in the order yet
-            extra = {
-                "order_id": order_id,
-                "book_id": dto.book_id
-            }
-
-            logger.debug("cart_item wasn't found", extra=extra)
-            order_item_domain_model: BookOrderAssocS = BookOrderAssocS(
-                **dto.model_dump(exclude_none=True),
-                order_id=order_id
+        if order_item_exists:
+            order: Order = order_item.order
+        else:
+            # if there is no book in the order yet,
+            # it is added in the same transaction as the stock is reserved
+            logger.debug(
+                "order_item wasn't found",
+                extra={"order_id": order_id, "book_id": dto.book_id}
             )
-
-            _ = await super().create(
-                session=session,
-                repo=self._book_order_assoc_repo,
-                domain_model=order_item_domain_model
-            )  # add book to the cart, if not added, http exception will be raised
-            logger.debug("order_item was created", extra=extra)
-
-        if not order_item_exists:
-            session.expire_all()
-            order_item: BookOrderAssoc = await self._book_order_assoc_repo.get_by_id(
+            orders: list[Order] = await self._order_repo.get_all(
                 session=session,
-                id=BookOrderPrimaryIdentifier(
-                    book_id=dto.book_id,
-                    order_id=order_id
-                )
+                limit=1,
+                id=order_id
             )
+            if not orders:
+                raise EntityDoesNotExist(entity="Order")
+            order: Order = orders[0]
 
-        order_item_domain_model = BookOrderAssocS(
+        order_item_domain_model: BookOrderAssocS = BookOrderAssocS.model_construct(
             book_id=dto.book_id,
             order_id=order_id,
-            count_ordered=order_item.count_ordered
-        )
+            count_ordered=order_item.count_ordered if order_item_exists else 0
+        )  # count_ordered is set by put_books_in_order
 
-        order: Order = order_item.order
         order_domain_model: OrderS = OrderS.model_validate(
             obj=order,
             from_attributes=True
@@ -412,20 +404,31 @@ class OrderService(EntityBaseService):
         except AddBookToOrderError as e:
             raise BadRequest(str(e.info))
 
-        async with self._uow as uow:
-            # increment the number of ordered books in the order
-            # update number_in_stock for the book
+        async with self._uow.bind(session) as uow:
+            # reserve books (conditional decrement of number_in_stock)
+            # add book to the order / increment the number of ordered books in the order
             # update total in order
+            number_in_stock: Union[int, None] = await self._book_repo.reserve_stock(
+                session=uow.session,
+                book_id=dto.book_id,
+                quantity=dto.count_ordered
+            )
+            if number_in_stock is None:
+                raise BadRequest(
+                    detail="You're trying to order too many books, "
+                           "there aren't enough books left in stock"
+                )  # books were taken by concurrent requests, transaction is rolled back
+
             if order_item_exists:
                 await uow.update(
                     orm_model=BookOrderAssoc,
                     obj=order_item_domain_model
                 )
-
-            await uow.update(
-                orm_model=Book,
-                obj=book_domain_model
-            )
+            else:
+                uow.add(
+                    orm_model=BookOrderAssoc,
+                    obj=order_item_domain_model
+                )
 
             await uow.update(
                 orm_model=Order,
@@ -433,7 +436,7 @@ class OrderService(EntityBaseService):
             )
             await uow.commit()
 
-        session.expire_all()
+        # unit of work ran on this session, so loaded order rows are up to date
         updated_order: ReturnOrderS = await self.get_order_by_id(
             session=session,
             order_id=order_id
@@ -447,16 +450,24 @@ class OrderService(EntityBaseService):
             book_id: UUID,
             order_id: int,
     ) -> ReturnOrderS:
-        try:
-            _: list[BookOrderAssoc] = await super().get_by_id(
-                session=session,
-                repo=self._order_repo,
-                id=order_id
+        order_item: Union[BookOrderAssoc, None] = await self._book_order_assoc_repo.get_by_id(
+            session=session,
+            id=BookOrderPrimaryIdentifier(
+                order_id=order_id,
+                book_id=book_id
             )
-        except EntityDoesNotExist:
+        )
+        if order_item is None:
             raise EntityDoesNotExist("Book (in the order)")
 
         try:
+            # ordered books are returned to stock
+            # in the same transaction as the book is deleted from the order
+            await self._book_repo.release_stock(
+                session=session,
+                book_id=book_id,
+                quantity=order_item.count_ordered
+            )
             await self._order_repo.delete_book_from_order_by_id(
                 session=session,
                 book_id=book_id,
@@ -510,7 +521,7 @@ class OrderService(EntityBaseService):
                     id=shopping_session_id
                 )
                 try:
-                    async with self._uow as uow:
+                    async with self._uow.bind(session) as uow:
                         payment_update_obj = PaymentDetailS(
                             id=payment_id,
                             status="success",
@@ -568,9 +579,16 @@ class OrderService(EntityBaseService):
                         session=session,
                         domain_models=order_domain_models
                     )  # copy books from cart to order
+                    # the cart is deleted in the same transaction,
+                    # its books are sold, so they stay out of stock
+                    await self._cart_repo.delete_cart_by_shopping_session_id(
+                        session=session,
+                        shopping_session_id=shopping_session_id
+                    )
                     await super().commit(session=session)
                     logger.info("order has been created and filled successfully")
-                except (ServerError, DBError):
+                except (ServerError, DBError, NotFoundError):
+                    await session.rollback()  # order stays unfilled, the cart is kept
                     order_domain_model = OrderS(
                         order_status="failed"
                     )
@@ -588,15 +606,7 @@ class OrderService(EntityBaseService):
                     logger.error("failed to copy books from cart to order", exc_info=True, extra=extra)
                     raise PaymentFailedError(detail="Failed to create order. Refund is coming soon.")
 
-                try:
-                    await self._shopping_session_service.delete(
-                        session=session,
-                        repo=self._shopping_session_repo,
-                        instance_id=shopping_session_id
-                    )  # delete cart with its items
-                except DBError:
-                    extra = {"shopping_session_id": shopping_session_id}
-                    logger.error("failed to delete cart", extra=extra)
+                await invalidate_cart_cache(shopping_session_id)
 
             else:
                 logger.debug("payment status is 'failed'")
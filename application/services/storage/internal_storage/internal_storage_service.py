@@ -95,7 +95,7 @@ class InternalStorageService(EntityBaseService):
         if delete_images:
             logger.debug("Deleting book with images")
             # if an instance has images, and we have to delete everything
-            _ = super().delete(
+            await super().delete(
                     session=session,
                     repo=self._book_repo,
                     instance_id=instance_id
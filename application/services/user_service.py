@@ -25,6 +25,7 @@ from core.exceptions import EntityDoesNotExist, NotFoundError, ServerError, \
     InvalidModelCredentials
 from logger import logger
 from core.entity_base_service import EntityBaseService
+from core.base_repos import Page, next_cursor
 
 
 class UserService(EntityBaseService):
@@ -42,17 +43,21 @@ class UserService(EntityBaseService):
 
     async def get_all_users(
         self, session: AsyncSession, pagination: PaginationS
-    ) -> list[ReturnUserS] | ReturnUserS:
+    ) -> Page:
         try:
             users = await super().get_all(
                 repo=self._user_repo,
                 session=session,
                 page=pagination.page,
                 limit=pagination.limit,
+                cursor=pagination.cursor,
             )
         except NotFoundError:
             raise EntityDoesNotExist(entity="User")
-        return users
+        return Page(
+            items=users,
+            next_cursor=next_cursor(users, User, sort_keys=[], limit=pagination.limit)
+        )
 
     async def get_user_by_id(
         self,
@@ -1,17 +1,22 @@
-from collections import defaultdict
 from typing import Any
 
 from pydantic import BaseModel
-from sqlalchemy import Select, desc
+from sqlalchemy import Select, ColumnElement
 
 __all__ = ("BaseFilter", )
 
 from sqlalchemy.exc import CompileError, StatementError
 
-from core.exceptions import OrderingFilterError, FilterError
+from core.base_repos.keyset import SortKey, keyset_order
+from core.exceptions import FilterError
 from logger import logger
 
 
+def trigram_similar(column, value: str) -> ColumnElement:
+    """pg_trgm similarity operator (column % value), served by gin_trgm_ops indexes"""
+    return column.op("%")(value)
+
+
 class BaseFilter(BaseModel):
     """
         Filters are extracted from query parameters in pydantic schemas
@@ -54,7 +59,11 @@ class BaseFilter(BaseModel):
                     # to use it in the query
 
                     model_field = getattr(self.Meta.Model, field_name)
-                    stmt = stmt.filter(getattr(model_field, orm_operator)(filter_value))
+                    condition = (
+                        orm_operator(model_field, filter_value) if callable(orm_operator)
+                        else getattr(model_field, orm_operator)(filter_value)
+                    )
+                    stmt = stmt.filter(condition)
                 except (CompileError, StatementError):
                     extra = {
                         "field_name": field_name,
@@ -65,26 +74,22 @@ class BaseFilter(BaseModel):
                     raise FilterError
         return stmt
 
-    def sort(self, stmt: Select) -> Select:
-        """constructs sql statement, applying sorting to it"""
+    def sort_keys(self) -> list[SortKey]:
+        """
+            parses order_by, example:
+            "-price_per_unit,name" --> [(price_per_unit, True), (name, False)]
+        """
         if not self.order_by:
-            return stmt
-
-        fields: list = self.order_by.split(",")
-        directions: dict[str, list[str]] = defaultdict(list)
-        for field in fields:
-            if "-" in field:
-                directions["desc"].append(field.lstrip("-"))
-            else:
-                directions["asc"].append(field)
-        try:
-            stmt = stmt.order_by(
-                        *[desc(value) for value in directions["desc"]],  # apply order_by for "descending" fields
-                        *[value for value in directions["asc"]])
-            return stmt
-        except StatementError:
-            logger.debug("incorrect order_by filter format", exc_info=True)
-            raise OrderingFilterError
+            return []
+        fields: list[str] = [field.strip() for field in self.order_by.split(",") if field.strip()]
+        return [(field.lstrip("-"), field.startswith("-")) for field in fields]
+
+    def sort(self, stmt: Select) -> Select:
+        """
+            constructs sql statement, applying sorting to it
+            (fields keep the order given in order_by, id breaks ties)
+        """
+        return stmt.order_by(*keyset_order(self.Meta.Model, self.sort_keys()))
 
     class Meta:
         # this attribute should be set from a filter subclass
@@ -99,5 +104,6 @@ class BaseFilter(BaseModel):
         lte = lambda value: ("__le__", value) # noqa
         ilike = lambda value: ("ilike", f"{value}%") # noqa
         eq = lambda value: ("__eq__", value) # noqa
+        similar = lambda value: (trigram_similar, value) # noqa
 
 
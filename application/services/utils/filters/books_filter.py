@@ -1,5 +1,6 @@
 from fastapi import Depends
 from pydantic import UUID4
+from sqlalchemy import Select, func
 from application.models import Book
 from application.services.utils.filters.base_filter import BaseFilter
 from application.services.utils.filters.categories_filter import CategoryFilter
@@ -10,6 +11,8 @@ class BookFilter(BaseFilter):
     isbn__eq: str | None = None
     name__eq: str | None = None
     name__ilike: str | None = None
+    # misspelled titles, ordered by similarity unless order_by is given
+    name__similar: str | None = None
     number_in_stock__eq: int | None = None
     category: CategoryFilter = Depends()
     price_per_unit__gt: float | None = None
@@ -21,5 +24,16 @@ class BookFilter(BaseFilter):
 
     order_by: str | None = None
 
+    @property
+    def sorted_by_similarity(self) -> bool:
+        """similarity isn't a column, so such pages can't be continued by a cursor"""
+        return bool(self.name__similar) and not self.order_by
+
+    def sort(self, stmt: Select) -> Select:
+        if self.sorted_by_similarity:
+            # the closest titles first
+            return stmt.order_by(func.similarity(Book.name, self.name__similar).desc(), Book.id)
+        return super().sort(stmt)
+
     class Meta(BaseFilter.Meta):
         Model = Book
\ No newline at end of file
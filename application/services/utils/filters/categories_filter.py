@@ -1,4 +1,6 @@
-from application.models import Category
+from sqlalchemy import Select
+
+from application.models import Book, Category
 from application.services.utils.filters.base_filter import BaseFilter
 from pydantic import Field
 
@@ -6,5 +8,15 @@ from pydantic import Field
 class CategoryFilter(BaseFilter):
     name__eq: str | None = Field(default=None, alias="category_name__eq")
 
+    def filter(self, stmt: Select) -> Select:
+        """
+            books having the category: EXISTS over book_category_assoc
+            (ix_book_category_assoc_category_id),
+            filtering on categories alone would join every category to every book
+        """
+        if self.name__eq is None:
+            return stmt
+        return stmt.filter(Book.categories.any(Category.name == self.name__eq))
+
     class Meta(BaseFilter.Meta):
-        Model = Category
\ No newline at end of file
+        Model = Category
@@ -3,4 +3,5 @@ from pydantic import BaseModel, Field
 
 class Pagination(BaseModel):
     limit: int = Field(default=10, ge=1)
-    page: int = Field(default=0, ge=0)
\ No newline at end of file
+    page: int = Field(default=0, ge=0)
+    cursor: str | None = None  # X-Next-Cursor of the previous page, page is ignored if set
\ No newline at end of file
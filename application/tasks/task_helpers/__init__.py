@@ -1,5 +1,8 @@
 __all__ = (
-    "parse_logs_journal",
+    "parse_log_line",
+    "ship_logs_journal",
+    "LogsBatch",
 )
 
-from .logs_parser import parse_logs_journal
\ No newline at end of file
+from .logs_parser import parse_log_line
+from .logs_shipper import ship_logs_journal, LogsBatch
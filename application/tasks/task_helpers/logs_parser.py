@@ -1,23 +1,21 @@
 import json
 from time import strptime, mktime
-from core.config import settings
+from typing import Union
 
+from logger import logger
 
-def parse_logs_journal() -> bytes:
-    # extracts logs from the journal and converts into bytes
 
-    with open(settings.LOGS_JOURNAL_NAME, "r") as f:
-        logs = []
-        for line in f:
-            line.rstrip()
-            res = json.loads(line)  # convert to dict
-            # convert from string representation of time to unix time
-            time_struct = strptime(res.pop("timestamp"), "%Y-%m-%dT%H:%M:%S.%fZ")
-            unix_time = int(mktime(time_struct))
-            res["unix_time"] = unix_time
-            logs.append(res)
-        if not logs:
-            return b''
-        json_data = json.dumps(logs)
-        encoded_json = json_data.encode("utf-8")
-    return encoded_json
+def parse_log_line(line: bytes) -> Union[dict, None]:
+    """converts a line of the journal into a log record, None if the line is malformed"""
+    try:
+        res = json.loads(line)  # convert to dict
+        # convert from string representation of time to unix time
+        time_struct = strptime(res.pop("timestamp"), "%Y-%m-%dT%H:%M:%S.%fZ")
+    except (ValueError, KeyError, TypeError, AttributeError):
+        logger.warning(
+            "Malformed line in the logs journal is skipped",
+            extra={"line": line[:200].decode("utf-8", "replace")}
+        )
+        return None
+    res["unix_time"] = int(mktime(time_struct))
+    return res
@@ -0,0 +1,176 @@
+import fcntl
+import gzip
+import json
+import os
+from typing import Callable, Iterator, NamedTuple, Union
+
+from core.config import settings
+from logger import logger
+from .logs_parser import parse_log_line
+
+BATCH_MAX_BYTES = 512 * 1024  # of raw journal lines in one message
+BATCH_MAX_LINES = 5_000
+
+
+class JournalCheckpoint(NamedTuple):
+    """position in the journal up to which lines have been shipped"""
+    inode: int
+    offset: int
+
+
+class LogsBatch(NamedTuple):
+    records: list[dict]
+    start: JournalCheckpoint
+    end: JournalCheckpoint
+
+    @property
+    def message_id(self) -> str:
+        """stable id of the batch, consumers drop redelivered batches by it"""
+        return f"{self.start.inode}:{self.start.offset}"
+
+    def encode(self) -> bytes:
+        return gzip.compress(json.dumps(self.records).encode("utf-8"))
+
+
+def checkpoint_path(journal_path: str) -> str:
+    return f"{journal_path}.checkpoint"
+
+
+def read_checkpoint(path: str) -> Union[JournalCheckpoint, None]:
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+        return JournalCheckpoint(inode=int(data["inode"]), offset=int(data["offset"]))
+    except FileNotFoundError:
+        return None
+    except (ValueError, KeyError, TypeError):
+        extra = {"path": path}
+        logger.warning(
+            "Logs checkpoint is corrupted, journal is shipped from the start", extra=extra
+        )
+        return None
+
+
+def write_checkpoint(path: str, checkpoint: JournalCheckpoint) -> None:
+    """atomically replaces the checkpoint, so that a crash never leaves a partial one"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint._asdict(), f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def iter_batches(
+        journal_path: str,
+        checkpoint: Union[JournalCheckpoint, None],
+        max_bytes: int = BATCH_MAX_BYTES,
+        max_lines: int = BATCH_MAX_LINES,
+) -> Iterator[LogsBatch]:
+    """
+        streams complete lines written after the checkpoint in bounded batches.
+        Journal is read from the start if it has been rotated (other inode) or truncated
+    """
+    with open(journal_path, "rb") as f:
+        stat = os.fstat(f.fileno())
+        offset = 0
+        if (
+                checkpoint is not None
+                and checkpoint.inode == stat.st_ino
+                and checkpoint.offset <= stat.st_size
+        ):
+            offset = checkpoint.offset
+        f.seek(offset)
+
+        records: list[dict] = []
+        batch_start, batch_bytes = offset, 0
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # line is being written, it is shipped by the next run
+            offset += len(line)
+            batch_bytes += len(line)
+            record = parse_log_line(line)
+            if record is not None:
+                records.append(record)
+
+            if batch_bytes >= max_bytes or len(records) >= max_lines:
+                yield LogsBatch(
+                    records,
+                    JournalCheckpoint(stat.st_ino, batch_start),
+                    JournalCheckpoint(stat.st_ino, offset)
+                )
+                records, batch_start, batch_bytes = [], offset, 0
+
+        if batch_bytes:
+            yield LogsBatch(
+                records,
+                JournalCheckpoint(stat.st_ino, batch_start),
+                JournalCheckpoint(stat.st_ino, offset)
+            )
+
+
+def journal_files(journal_path: str, backup_count: int) -> list[str]:
+    """rotated journals (oldest first) followed by the journal"""
+    backups = [f"{journal_path}.{n}" for n in range(backup_count, 0, -1)]
+    return [path for path in backups if os.path.exists(path)] + [journal_path]
+
+
+def rotate_journal(journal_path: str, backup_count: int) -> None:
+    """
+        journal -> journal.1 -> ... -> journal.<backup_count>, the oldest is removed.
+        Writers reopen the journal when its inode changes (see WatchedFileHandler in logger),
+        lines they write to the renamed file are shipped by the next run
+    """
+    for n in range(backup_count, 1, -1):
+        if os.path.exists(f"{journal_path}.{n - 1}"):
+            os.replace(f"{journal_path}.{n - 1}", f"{journal_path}.{n}")
+    os.replace(journal_path, f"{journal_path}.1")
+
+
+def ship_logs_journal(
+        publish: Callable[[LogsBatch], bool],
+        journal_path: str = settings.LOGS_JOURNAL_NAME,
+        max_bytes: int = settings.LOGS_JOURNAL_MAX_BYTES,
+        backup_count: int = settings.LOGS_JOURNAL_BACKUP_COUNT,
+) -> int:
+    """
+        publishes lines of the journal that haven't been shipped yet,
+        returns number of shipped records.
+        Checkpoint is moved only after the batch has been published, so every line is sent once
+        (a crash between publish and checkpoint resends the batch with the same message_id).
+        Rest of the rotated journal is shipped first, the journal is rotated once it is
+        shipped and has grown over max_bytes
+    """
+    path = checkpoint_path(journal_path)
+    shipped = 0
+    with open(f"{path}.lock", "w") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)  # only one shipper per journal
+        except BlockingIOError:
+            logger.info("Logs journal is being shipped by another process")
+            return 0
+
+        checkpoint: Union[JournalCheckpoint, None] = read_checkpoint(path)
+        files: list[str] = journal_files(journal_path, backup_count)
+        inodes: list[int] = [os.stat(file).st_ino if os.path.exists(file) else -1 for file in files]
+        # journal the checkpoint points to, lines of older journals have been shipped
+        start: int = len(files) - 1
+        if checkpoint and checkpoint.inode in inodes:
+            start = inodes.index(checkpoint.inode)
+
+        try:
+            for file in files[start:]:
+                for batch in iter_batches(file, checkpoint):
+                    if batch.records and not publish(batch):
+                        logger.error("Failed to ship logs, batch is retried by the next run")
+                        return shipped
+                    checkpoint = batch.end
+                    write_checkpoint(path, checkpoint)
+                    shipped += len(batch.records)
+        except FileNotFoundError:
+            logger.info("No logs journal to ship", extra={"path": journal_path})
+            return shipped
+
+        if os.path.getsize(journal_path) >= max_bytes:
+            rotate_journal(journal_path, backup_count)
+    return shipped
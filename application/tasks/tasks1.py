@@ -1,25 +1,30 @@
-import asyncio
 import io
 import os
 import shutil
 
 from PIL import Image
+from pika import BasicProperties
 from fastapi import HTTPException, status
 from core.image_conf import ImageConfig
 from email.message import EmailMessage
 from application.tasks.email_config.email_config import email_settings
-from application.tasks.task_helpers import email_generator, parse_logs_journal
+from application.tasks.task_helpers import email_generator, ship_logs_journal, LogsBatch
 from pathlib import Path
 
 from infrastructure.celery.app import celery
+from infrastructure.celery.async_runner import async_runner
 from logger import logger
 from infrastructure.mail import MailClient
 from infrastructure.rabbitmq import rabbit_publisher
+from celery.signals import worker_process_shutdown
 from celery.utils.log import get_task_logger
 from application.repositories.cart_repo import CartRepository
 
 task_logger = get_task_logger(__name__)
 
+# shorter than the schedule interval, so that the next run isn't skipped
+EXPIRED_CARTS_PURGE_LOCK_SECONDS = 50
+
 
 def create_image_folder(concrete_image_folder_name: str) -> str:
     image_folder_path: str = os.path.join(
@@ -113,20 +118,37 @@ def delete_all_images(concrete_image_folder: int):
 
 @celery.task
 def save_log():
-    """parses logs file, encodes data and sends to the queue"""
-    logs_bytes: bytes = parse_logs_journal() # noqa
-    if logs_bytes == b'':
-        logger.info("no logs to save")
-        return
-    rabbit_publisher.send_message_basic_publish(
-            message=logs_bytes,
-            routing_key="logs_q"
+    """sends lines added to the logs journal since the last run to the queue"""
+
+    def publish(batch: LogsBatch) -> bool:
+        return rabbit_publisher.send_message_basic_publish(
+            message=batch.encode(),
+            routing_key="logs_q",
+            properties=BasicProperties(
+                content_type="application/json",
+                content_encoding="gzip",
+                message_id=batch.message_id,
+                delivery_mode=2  # persistent
+            )
         )
 
+    shipped: int = ship_logs_journal(publish=publish)
+    if shipped == 0:
+        logger.info("no logs to save")
+    return shipped
+
 
 @celery.task
 def remove_expired_carts():
     """clears database from expired carts"""
     cart_repo = CartRepository()
-    loop = asyncio.get_event_loop()
-    return loop.run_until_complete(cart_repo.delete_expired_carts())
+    return async_runner.run_exclusive(
+        job_name="remove_expired_carts",
+        job=cart_repo.delete_expired_carts,
+        lock_timeout_seconds=EXPIRED_CARTS_PURGE_LOCK_SECONDS
+    )
+
+
+@worker_process_shutdown.connect
+def shutdown_async_runner(**kwargs):
+    async_runner.shutdown()
@@ -2,9 +2,16 @@ __all__ = (
     "OrmEntityRepository",
     "OrmEntityRepoInterface",
     "AbstractUnitOfWork",
-    "SqlAlchemyUnitOfWork"
+    "SqlAlchemyUnitOfWork",
+    "SortKey",
+    "Page",
+    "NEXT_CURSOR_HEADER",
+    "keyset_order",
+    "apply_keyset",
+    "next_cursor",
 )
 
 from .base import OrmEntityRepoInterface
+from .keyset import SortKey, Page, NEXT_CURSOR_HEADER, keyset_order, apply_keyset, next_cursor
 from .orm_entity_repo import OrmEntityRepository
 from .unit_of_work import AbstractUnitOfWork, SqlAlchemyUnitOfWork
\ No newline at end of file
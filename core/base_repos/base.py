@@ -24,6 +24,7 @@ class OrmEntityRepoInterface(Protocol):
             session: AsyncSession,
             page: int = 0,
             limit: int = 5,
+            cursor: str | None = None,
             **filters,
     ):
         ...
@@ -0,0 +1,158 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from typing import Any, NamedTuple, Union
+from uuid import UUID
+
+from sqlalchemy import Select, and_, or_, tuple_
+from sqlalchemy.orm import ColumnProperty, InstrumentedAttribute
+
+from core.exceptions import BadRequest, OrderingFilterError
+
+__all__ = (
+    "SortKey",
+    "Page",
+    "NEXT_CURSOR_HEADER",
+    "keyset_order",
+    "apply_keyset",
+    "next_cursor",
+)
+
+SortKey = tuple[str, bool]  # (column name, descending)
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class Page(NamedTuple):
+    """page of a listing with an opaque cursor of the next page (None on the last page)"""
+    items: list
+    next_cursor: Union[str, None]
+
+
+def _with_tie_breaker(model, sort_keys: list[SortKey]) -> list[SortKey]:
+    """id is appended to sort keys, so that rows with equal sort keys have stable order"""
+    if getattr(model, "id", None) is None or any(name == "id" for name, _ in sort_keys):
+        return list(sort_keys)
+    descending: bool = sort_keys[-1][1] if sort_keys else False
+    return [*sort_keys, ("id", descending)]
+
+
+def _column(model, name: str) -> InstrumentedAttribute:
+    column = getattr(model, name, None)
+    if not isinstance(getattr(column, "property", None), ColumnProperty):
+        raise OrderingFilterError()
+    return column
+
+
+def _nullable(column: InstrumentedAttribute) -> bool:
+    return any(table_column.nullable for table_column in column.property.columns)
+
+
+def keyset_order(model, sort_keys: list[SortKey]) -> list:
+    """ORDER BY clauses for sort keys followed by id, NULLs are last in both directions"""
+    clauses: list = []
+    for name, descending in _with_tie_breaker(model, sort_keys):
+        column = _column(model, name)
+        clause = column.desc() if descending else column.asc()
+        clauses.append(clause.nulls_last() if _nullable(column) else clause)
+    return clauses
+
+
+def apply_keyset(
+        stmt: Select,
+        model,
+        sort_keys: list[SortKey],
+        cursor: Union[str, None],
+        limit: int,
+) -> Select:
+    """
+        orders stmt by sort keys (+ id) and seeks past the row the cursor points to,
+        so that any page costs as much as the first one (no OFFSET scan)
+    """
+    keys: list[SortKey] = _with_tie_breaker(model, sort_keys)
+    stmt = stmt.order_by(*keyset_order(model, sort_keys)).limit(limit)
+    if cursor is None:
+        return stmt
+
+    columns: list = [_column(model, name) for name, _ in keys]
+    values: list = _decode_cursor(cursor, keys, columns)
+
+    directions: set[bool] = {descending for _, descending in keys}
+    if len(directions) == 1 and not any(_nullable(column) for column in columns):
+        # row comparison matches a composite index on (sort keys, id)
+        row, cursor_row = (
+            (columns[0], values[0]) if len(columns) == 1
+            else (tuple_(*columns), tuple_(*values))
+        )
+        return stmt.where(row < cursor_row if directions.pop() else row > cursor_row)
+
+    # mixed directions or nullable keys: (a > x) or (a = x and b < y) or ...
+    conditions = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        if value is None:
+            continue  # NULLs are last, so no row is after NULL in this column
+        after = column < value if keys[i][1] else column > value
+        if _nullable(column):
+            after = or_(after, column.is_(None))
+        conditions.append(and_(
+            *[
+                prev_column.is_(None) if prev_value is None else prev_column == prev_value
+                for prev_column, prev_value in zip(columns[:i], values[:i])
+            ],
+            after
+        ))
+    return stmt.where(or_(*conditions))
+
+
+def next_cursor(rows: list, model, sort_keys: list[SortKey], limit: int) -> Union[str, None]:
+    """cursor pointing to the last row, None if there are no more rows"""
+    if len(rows) < limit:
+        return None
+    keys: list[SortKey] = _with_tie_breaker(model, sort_keys)
+    return _encode_cursor(keys, [getattr(rows[-1], name) for name, _ in keys])
+
+
+def _cursor_fields(keys: list[SortKey]) -> list[str]:
+    return [f"-{name}" if descending else name for name, descending in keys]
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+def _from_json(column: InstrumentedAttribute, value: Any) -> Any:
+    if value is None:
+        return None
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if python_type in (datetime, date):
+        return python_type.fromisoformat(value)
+    if python_type is UUID:
+        return UUID(value)
+    return value
+
+
+def _encode_cursor(keys: list[SortKey], values: list) -> str:
+    payload: bytes = json.dumps(
+        {"k": _cursor_fields(keys), "v": [_to_json(value) for value in values]},
+        separators=(",", ":")
+    ).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, keys: list[SortKey], columns: list) -> list:
+    try:
+        padded: str = cursor + "=" * (-len(cursor) % 4)
+        payload: dict = json.loads(base64.urlsafe_b64decode(padded))
+        if payload["k"] != _cursor_fields(keys) or len(payload["v"]) != len(columns):
+            raise BadRequest(detail="cursor doesn't match order_by of the request")
+        return [_from_json(column, value) for column, value in zip(columns, payload["v"])]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise BadRequest(detail="invalid cursor")
@@ -1,6 +1,7 @@
 from uuid import UUID
 
-from sqlalchemy import select, update
+from sqlalchemy import select, update, delete, inspect
+from sqlalchemy.orm import MANYTOONE
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from core.exceptions.storage_exceptions import (
@@ -9,6 +10,7 @@ from core.exceptions.storage_exceptions import (
 )
 from sqlalchemy.exc import NoSuchTableError, NoReferenceError
 from typing import TypeVar, TypeAlias, Optional, Union
+from core.base_repos.keyset import apply_keyset, keyset_order
 from application.schemas.domain_model_schemas import \
     (
     AuthorS, BookS, BookOrderAssocS,
@@ -33,6 +35,16 @@ __all__ = (
 class OrmEntityRepository:
     model = None
 
+    def cache_tags(self, instance_id: Id = None) -> tuple[str, ...]:
+        """
+            tags of cached entries that depend on the entity (see cachify):
+            "<table>" for collections, "<table>:<id>" for a single entity
+        """
+        table_name: str = self.model.__tablename__
+        if instance_id is None:
+            return (table_name, )
+        return table_name, f"{table_name}:{instance_id}"
+
     async def create(
             self,
             session: AsyncSession,
@@ -65,6 +77,9 @@ class OrmEntityRepository:
             raise DBError(
                 traceback=str(e)
             )
+        from core.utils.cache import cache_engine
+        await cache_engine.invalidate_tags(*self.cache_tags())
+
         try:
             # in case primary identifier is not called id or is composite
             added_entity_id = to_add.id
@@ -78,9 +93,15 @@ class OrmEntityRepository:
             session: AsyncSession,
             page: int = 0,
             limit: int = 5,
+            cursor: str | None = None,
             **filters,
     ) -> list:
-        stmt = select(self.model).filter_by(**filters).offset(page * limit).limit(limit)
+        """page is ignored when cursor (see keyset.next_cursor) is given"""
+        stmt = select(self.model).filter_by(**filters)
+        if cursor is not None:
+            stmt = apply_keyset(stmt, self.model, sort_keys=[], cursor=cursor, limit=limit)
+        else:
+            stmt = stmt.order_by(*keyset_order(self.model, [])).offset(page * limit).limit(limit)
         try:
             domain_models: list | [] = (await session.scalars(stmt)).all()
         except NoSuchTableError as e:
@@ -99,11 +120,6 @@ class OrmEntityRepository:
             instance_id: int | UUID,
             session: AsyncSession,
     ) -> model:
-        res = await self.get_all(session=session, id=instance_id)  # check existence of the entity
-
-        if not res:
-            raise NotFoundError(entity=self.model.__name__)
-
         try:
             to_update: dict = domain_model.model_dump(exclude_unset=True, exclude_none=True)
         except Exception as e:
@@ -111,39 +127,74 @@ class OrmEntityRepository:
                 traceback=str(e)
             )
 
+        if not to_update:
+            # nothing to update, so the entity is returned as it is
+            res = await self.get_all(session=session, id=instance_id)
+            if not res:
+                raise NotFoundError(entity=self.model.__name__)
+            return res[0]
+
         try:
-            stmt = update(self.model).where(self.model.id == instance_id).values(**to_update)
-            await session.execute(stmt)
+            # single round trip: missing entity is detected by absence of the returned row
+            stmt = update(self.model).where(
+                self.model.id == instance_id
+            ).values(**to_update).returning(self.model).execution_options(
+                populate_existing=True
+            )
+            updated_entity = (await session.scalars(stmt)).one_or_none()
+            if updated_entity is None:
+                raise NotFoundError(entity=self.model.__name__)
             await session.commit()
         except (IntegrityError, NoReferenceError, TypeError) as e:
             raise DBError(
                 traceback=str(e)
             )
-        session.expire_all()
-        updated_entity: list = await self.get_all(session=session, id=instance_id)
-        if not updated_entity:
-            raise DBError(
-                traceback="Entity wasn't found after update operation"
-            )
-        return updated_entity[0]
+        from core.utils.cache import cache_engine
+        await cache_engine.invalidate_tags(*self.cache_tags(instance_id))
+
+        return updated_entity
 
     async def delete(
             self,
             session: AsyncSession,
             instance_id: int | str | UUID,
     ) -> None:
-        instance = await self.get_all(session=session, id=instance_id)
-
-        if not instance:
-            raise NotFoundError(entity=self.model.__name__)
-
-        instance = instance[0]
-        await session.delete(instance)
+        if self._has_orm_cascades():
+            # relationships are handled by the ORM, so the entity has to be loaded
+            instance = await self.get_all(session=session, id=instance_id)
+
+            if not instance:
+                raise NotFoundError(entity=self.model.__name__)
+
+            await session.delete(instance[0])
+        else:
+            stmt = delete(self.model).where(
+                self.model.id == instance_id
+            ).returning(self.model.id)
+            deleted_id = (await session.execute(stmt)).scalar_one_or_none()
+
+            if deleted_id is None:
+                raise NotFoundError(entity=self.model.__name__)
+
+        from core.utils.cache import invalidate_on_commit
+        invalidate_on_commit(session, *self.cache_tags(instance_id))
+
+    def _has_orm_cascades(self) -> bool:
+        """
+            bulk DELETE skips cascades performed by the ORM (secondary tables,
+            one-to-many children), so it is used only for models without them
+        """
+        return any(
+            relationship.secondary is not None or relationship.direction is not MANYTOONE
+            for relationship in inspect(self.model).relationships
+        )
 
     async def commit(self, session: AsyncSession):
         from logger import logger
+        from core.utils.cache import flush_cache_invalidation
         try:
             await session.commit()
         except SQLAlchemyError as e:
             logger.error("Error while committing session", exc_info=True)
             raise DBError(traceback=str(e))
+        await flush_cache_invalidation(session)
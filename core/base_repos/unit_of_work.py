@@ -1,6 +1,12 @@
+from collections import defaultdict
 from typing import Protocol
 
-from core.exceptions import DBError
+from fastapi import HTTPException
+from sqlalchemy import update, inspect as sa_inspect
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncSessionTransaction
+from sqlalchemy.orm.attributes import set_committed_value
+
+from core.exceptions import DBError, ConcurrentUpdateError
 from sqlalchemy.exc import SQLAlchemyError
 
 __all__ = (
@@ -11,21 +17,31 @@ __all__ = (
 from logger import logger
 
 
+UOW_DEPTH_KEY = "unit_of_work_depth"  # number of active units of work on a session
+
+
 class AbstractUnitOfWork(Protocol):
 
     def __init__(self):
         ...
 
+    def bind(self, session: AsyncSession) -> "AbstractUnitOfWork":
+        ...
+
     async def __aenter__(self):
         ...
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         ...
 
+    @property
+    def session(self) -> AsyncSession:
+        ...
+
     async def add(self, obj, orm_model):
         ...
 
-    async def update(self, obj, orm_model):
+    async def update(self, obj, orm_model, expected: dict | None = None):
         ...
 
     async def delete(self, obj, orm_model):
@@ -39,25 +55,68 @@ class AbstractUnitOfWork(Protocol):
 
 
 class SqlAlchemyUnitOfWork:
-    """Allows to perform operations transactionally"""
+    """
+        Allows to perform operations transactionally.
+
+        Runs on the session it is bound to (the request's session, see bind),
+        so it doesn't take a second connection from the pool. Unbound unit of work
+        opens its own session on enter. Unit of work entered while another one
+        is active on the same session runs in a savepoint
+    """
 
     def __init__(self):
-        from infrastructure.postgres import db_client
-        self._session = db_client.async_session()
+        self._session: AsyncSession | None = None
+        self._owns_session: bool = False
+        self._savepoint: AsyncSessionTransaction | None = None
+        self._committed: bool = False
+        # (orm_model, primary key) -> (values, expected)
+        self._pending_updates: dict[tuple, tuple[dict, dict]] = {}
+
+    def bind(self, session: AsyncSession) -> "SqlAlchemyUnitOfWork":
+        """returns unit of work that runs on the given session"""
+        uow = SqlAlchemyUnitOfWork()
+        uow._session = session
+        return uow
 
     async def __aenter__(self):
+        if self._session is None:
+            from infrastructure.postgres import db_client
+            self._session = db_client.async_session()
+            self._owns_session = True
+
+        depth: int = self._session.info.get(UOW_DEPTH_KEY, 0)
+        if depth > 0:
+            self._savepoint = await self._session.begin_nested()
+        self._session.info[UOW_DEPTH_KEY] = depth + 1
+        self._committed = False
         return self
 
+    @property
+    def session(self) -> AsyncSession:
+        """for statements that can't be expressed with add / update / delete"""
+        return self._session
+
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if exc_type is not None:
-            extra = {"exc_type": exc_type, "exc_val": exc_val, "exc_tb": exc_tb}
-            logger.error("An error occurred in UnitOfWork", extra=extra)
-            await self._session.rollback()
-            exc_value = " ".join([str(exc_type), str(exc_val), str(exc_tb)])
-            raise DBError(traceback=exc_value)
+        try:
+            if exc_type is not None or not self._committed:
+                await self.rollback()
 
-        self._session.expire_all()
-        await self._session.aclose()
+            if exc_type is not None and issubclass(exc_type, HTTPException):
+                # business rule was violated (e.g. not enough books in stock)
+                return False
+
+            if exc_type is not None:
+                extra = {"exc_type": exc_type, "exc_val": exc_val, "exc_tb": exc_tb}
+                logger.error("An error occurred in UnitOfWork", extra=extra)
+                exc_value = " ".join([str(exc_type), str(exc_val), str(exc_tb)])
+                raise DBError(traceback=exc_value)
+        finally:
+            self._session.info[UOW_DEPTH_KEY] -= 1
+            self._savepoint = None
+            if self._owns_session:
+                await self._session.aclose()
+                self._session = None
+                self._owns_session = False
 
     def add(self, obj, orm_model):
         data = obj.model_dump(
@@ -67,13 +126,37 @@ class SqlAlchemyUnitOfWork:
         to_add = orm_model(**data)
         self._session.add(to_add)
 
-    async def update(self, obj, orm_model):
+    async def update(self, obj, orm_model, expected: dict | None = None):
+        """
+            changed fields of obj are written on commit with UPDATE ... WHERE <primary key>,
+            updates of a table are sent in one executemany.
+            expected: column values the row must still have (optimistic check),
+            ConcurrentUpdateError is raised on commit if the row has been changed
+        """
         data = obj.model_dump(
             exclude_unset=True,
             exclude_none=True
         )
-        to_update = orm_model(**data)
-        await self._session.merge(to_update)
+        mapper = sa_inspect(orm_model)
+        primary_key: list[str] = [
+            mapper.get_property_by_column(column).key for column in mapper.primary_key
+        ]
+        self._invalidate_on_commit(orm_model, data.get("id"))
+
+        if any(data.get(key) is None for key in primary_key):
+            # row can't be addressed without primary key, so it is looked up by merge
+            await self._session.merge(orm_model(**data))
+            return
+
+        identity: tuple = tuple(data[key] for key in primary_key)
+        values: dict = self._changed_values(mapper, identity, data)
+        if not values:
+            return
+
+        pending_values, pending_expected = self._pending_updates.setdefault(
+            (orm_model, identity), ({}, expected or {})
+        )
+        pending_values.update(values)
 
     async def delete(
             self,
@@ -83,13 +166,98 @@ class SqlAlchemyUnitOfWork:
         if merged_obj not in self._session:
             await self._session.add(merged_obj)
         await self._session.delete(merged_obj)
+        self._invalidate_on_commit(type(orm_obj), getattr(orm_obj, "id", None))
 
     async def commit(self):
         try:
+            await self._flush_updates()
+            if self._savepoint is not None:
+                await self._savepoint.commit()  # changes are committed by the outer unit of work
+                self._committed = True
+                return
             await self._session.commit()
         except SQLAlchemyError as e:
             logger.error("Failed to commit the session", exc_info=True)
             raise DBError(traceback=str(e))
+        self._committed = True
+        from core.utils.cache import flush_cache_invalidation
+        await flush_cache_invalidation(self._session)
+
+    def _changed_values(self, mapper, identity: tuple, data: dict) -> dict:
+        """
+            values of obj that differ from the row loaded into the session
+            (all values if not loaded)
+        """
+        columns: set[str] = {
+            prop.key for prop in mapper.column_attrs
+            if all(column.computed is None for column in prop.columns)
+        }  # computed columns are written by the db
+        primary_key: set[str] = {
+            mapper.get_property_by_column(column).key for column in mapper.primary_key
+        }
+        values: dict = {
+            key: value for key, value in data.items()
+            if key in columns and key not in primary_key
+        }
+
+        loaded = self._session.identity_map.get(mapper.identity_key_from_primary_key(identity))
+        if loaded is None:
+            return values
+        loaded_values: dict = sa_inspect(loaded).dict
+        return {
+            key: value for key, value in values.items()
+            if key not in loaded_values or loaded_values[key] != value
+        }
+
+    async def _flush_updates(self) -> None:
+        """sends collected updates: one executemany per table and set of columns"""
+        if not self._pending_updates:
+            return
+        await self._session.flush()  # inserts / deletes go first
+
+        batches: dict[tuple, list[dict]] = defaultdict(list)
+        for (orm_model, identity), (values, expected) in self._pending_updates.items():
+            mapper = sa_inspect(orm_model)
+            primary_key: dict = {
+                mapper.get_property_by_column(column).key: value
+                for column, value in zip(mapper.primary_key, identity)
+            }
+            if expected:
+                stmt = update(orm_model).where(
+                    *[getattr(orm_model, key) == value for key, value in primary_key.items()],
+                    *[getattr(orm_model, key) == value for key, value in expected.items()]
+                ).values(**values).execution_options(synchronize_session=False)
+                result = await self._session.execute(stmt)
+                if result.rowcount != 1:
+                    raise ConcurrentUpdateError(entity=orm_model.__name__)
+            else:
+                batches[(orm_model, tuple(sorted(values)))].append({**primary_key, **values})
+
+        for (orm_model, _), parameters in batches.items():
+            await self._session.execute(update(orm_model), parameters)  # bulk UPDATE by primary key
+
+        for (orm_model, identity), (values, _) in self._pending_updates.items():
+            identity_key = sa_inspect(orm_model).identity_key_from_primary_key(identity)
+            loaded = self._session.identity_map.get(identity_key)
+            if loaded is None:
+                continue
+            for key, value in values.items():
+                set_committed_value(loaded, key, value)  # keep loaded rows in sync with the db
+        self._pending_updates.clear()
+
+    def _invalidate_on_commit(self, orm_model, instance_id) -> None:
+        """cached entries of changed entities are evicted after commit (see cachify)"""
+        from core.utils.cache import invalidate_on_commit
+        table_name: str = orm_model.__tablename__
+        tags = [table_name]
+        if instance_id is not None:
+            tags.append(f"{table_name}:{instance_id}")
+        invalidate_on_commit(self._session, *tags)
 
     async def rollback(self):
+        self._pending_updates.clear()
+        if self._savepoint is not None:
+            if self._savepoint.is_active:
+                await self._savepoint.rollback()
+            return
         await self._session.rollback()
@@ -15,6 +15,12 @@ class Settings(BaseSettings):
 
     LOG_LEVEL: str
     LOGS_JOURNAL_NAME: str
+    LOGS_JOURNAL_MAX_BYTES: int = 50 * 1024 * 1024  # journal is rotated by the log shipper
+    LOGS_JOURNAL_BACKUP_COUNT: int = 3
+    LOG_QUEUE_SIZE: int = 10_000  # records waiting for the writer thread, more are dropped
+    # share of DEBUG / INFO records kept per module: "orm_entity_repo=0.1,..."
+    LOG_SAMPLING: str = ""
+    LOG_SAMPLING_DEFAULT_RATE: float = 1.0
 
     DB_USER: str
     DB_PASSWORD: str
@@ -34,9 +40,31 @@ class Settings(BaseSettings):
     LOCAL_POSTGRES_PORT: int
     LOCAL_POSTGRES_DB: str
 
+    # per worker, workers * (pool size + max overflow) must fit max_connections
+    DB_POOL_SIZE: int = 5
+    DB_POOL_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: int = 30  # wait for a free connection before failing
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100
+
+    DB_REPLICA_URLS: str = ""  # comma separated postgresql+asyncpg urls of read replicas
+    DB_REPLICA_MAX_LAG_SECONDS: float = 1.0  # reads go to the primary while a replica lags more
+    DB_REPLICA_CHECK_INTERVAL_SECONDS: float = 5.0
+
     REDIS_HOST: str
     REDIS_PORT: int
 
+    CACHE_LOCAL_MAX_ENTRIES: int = 10_000  # in-process cache tier (per worker)
+    CACHE_LOCAL_MAX_BYTES: int = 64 * 1024 * 1024
+    CACHE_LOCAL_TTL_SECONDS: int = 60
+    CACHE_INVALIDATION_CHANNEL: str = "cache:invalidation"
+    CACHE_TAG_TTL_SECONDS: int = 24 * 60 * 60  # must exceed ttl of any cached entry
+    CACHE_LOCK_TIMEOUT_SECONDS: int = 5  # cross-worker single-flight of cache misses
+
+    AUTOCOMPLETE_LIMIT: int = 10  # most suggestions returned by /v1/books/suggest
+    AUTOCOMPLETE_CHANNEL: str = "autocomplete:books"
+
     RABBIT_USER: str
     RABBIT_PASSWORD: str
     RABBIT_HOST: str
@@ -60,6 +88,10 @@ class Settings(BaseSettings):
 
     model_config = SettingsConfigDict(env_file=".env")
 
+    @property
+    def get_db_replica_urls(self) -> list[str]:
+        return [url.strip() for url in self.DB_REPLICA_URLS.split(",") if url.strip()]
+
     @property
     def get_db_url(cls): # noqa
         if cls.MODE == "DEV":
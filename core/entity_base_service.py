@@ -49,6 +49,7 @@ from application.schemas.domain_model_schemas import \
 )
 from logger import logger
 from core.utils import perform_logging
+from core.utils.cache import flush_cache_invalidation
 # from core.base_repos import OrmEntityRepoInterface
 
 CreateDataT = TypeVar(
@@ -205,3 +206,4 @@ class EntityBaseService(
         except SQLAlchemyError:
             logger.info("failed to commit transaction", exc_info=True)
             raise ServerError()
+        await flush_cache_invalidation(session)  # tags of deleted entities
@@ -24,7 +24,8 @@ __all__ = (
     "DecrementNumberInStockError",
     "BadRequest",
     "PaymentFailedError",
-    "RefundFailedError"
+    "RefundFailedError",
+    "ConcurrentUpdateError"
 )
 
 from .storage_exceptions import (
@@ -40,7 +41,8 @@ from .http_exceptions import (
     DomainModelConversionError,
     OrderingFilterError,
     NoCookieError,
-    BadRequest
+    BadRequest,
+    ConcurrentUpdateError
 )
 
 from .payment_exceptions import (
@@ -13,7 +13,8 @@ __all__ = (
     "BadRequest",
     "OrderingFilterError",
     "DomainModelConversionError",
-    "NoCookieError"
+    "NoCookieError",
+    "ConcurrentUpdateError"
 )
 
 
@@ -106,6 +107,14 @@ class BadRequest(HTTPException):
         )
 
 
+class ConcurrentUpdateError(HTTPException):
+    def __init__(self, entity="Entity"):
+        super().__init__(
+            detail=f"{entity} has been changed by another request, try again",
+            status_code=status.HTTP_409_CONFLICT
+        )
+
+
 class DomainModelConversionError(TypeError):
 
     def __str__(self):
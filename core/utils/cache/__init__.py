@@ -0,0 +1,16 @@
+__all__ = (
+    "cachify",
+    "get_type_adapter",
+    "cache_engine",
+    "CacheEngine",
+    "LocalCache",
+    "invalidate_on_commit",
+    "flush_cache_invalidation",
+    "canonical_hash",
+)
+
+from .local_cache import LocalCache
+from .engine import CacheEngine, cache_engine
+from .keys import canonical_hash
+from .invalidation import invalidate_on_commit, flush_cache_invalidation
+from .decorator import cachify, get_type_adapter
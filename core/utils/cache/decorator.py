@@ -0,0 +1,107 @@
+import inspect
+import json
+from datetime import timedelta
+from functools import wraps, lru_cache
+
+from fastapi import params
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Callable, Any
+
+__all__ = (
+    "cachify",
+    "get_type_adapter",
+)
+
+from core.exceptions import ServerError
+from core.utils.cache.engine import cache_engine
+from logger import logger
+
+
+@lru_cache(maxsize=None)
+def get_type_adapter(schema: Any) -> TypeAdapter:
+    """TypeAdapter is expensive to build, so it is built once per schema"""
+    return TypeAdapter(schema)
+
+
+def cachify(
+        instance_return_schema,
+        cache_time: timedelta | int,
+        tags: tuple[str, ...] = (),
+        namespace: str | None = None,
+        version: int = 1,
+        lock: bool = False,
+        early_refresh_beta: float = 1.0,
+) -> Callable:
+    """
+        Endpoint cache decorator function (in-process tier + redis).
+
+        key: cache:{namespace}:v{version}:{param=value&...}, where params are
+        endpoint parameters that aren't dependencies (path / query params).
+        namespace defaults to <router module>.<endpoint name>, bump version
+        when instance_return_schema changes.
+
+        tags: templates filled with the same params, e.g. "books:{book_id}".
+        Repositories invalidate tags on write (see OrmEntityRepository.cache_tags)
+
+        Concurrent misses of a key call the endpoint once per worker
+        (once across workers with lock=True), entries are refreshed
+        before expiry by a single request (see CacheEngine.get_or_load).
+        The call is shared by the requests, so AsyncSession dependencies
+        are replaced with a session of the primary opened for the call
+    """
+
+    def decorator(func: Callable):
+        key_namespace: str = namespace or ".".join(
+            [func.__module__.rsplit(".", 1)[-1], func.__name__]
+        )  # example: book_routers.get_book_by_id
+        key_params: list[str] = [
+            name for name, parameter in inspect.signature(func).parameters.items()
+            if not isinstance(parameter.default, params.Depends)
+        ]  # service and session are dependencies, so they are not part of the key
+        session_params: list[str] = [
+            name for name, parameter in inspect.signature(func).parameters.items()
+            if isinstance(parameter.default, params.Depends)
+            and parameter.annotation is AsyncSession
+        ]
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs) -> list[instance_return_schema]:
+            key_values: dict = {name: kwargs.get(name) for name in key_params}
+            key = f"cache:{key_namespace}:v{version}:" + "&".join(
+                f"{name}={value}" for name, value in key_values.items()
+            )
+
+            async def load() -> bytes:
+                from infrastructure.postgres import db_client
+                # session of the request that started the load is closed when that request ends.
+                # Primary, as a lagging replica would store data older than the invalidation
+                # for cache_time
+                async with db_client.async_session() as session:
+                    retrieved_instance = await func(
+                        *args, **{**kwargs, **{name: session for name in session_params}}
+                    )
+                adapter: TypeAdapter = get_type_adapter(instance_return_schema)
+                try:
+                    # validate retrieved model to match given pydantic schema
+                    return adapter.dump_json(
+                        adapter.validate_python(retrieved_instance, from_attributes=True)
+                    )
+                except ValidationError:
+                    logger.error(f"Failed to cache result of {func.__name__}", exc_info=True)
+                    raise ServerError()
+
+            instance: bytes = await cache_engine.get_or_load(
+                key=key,
+                loader=load,
+                ttl=cache_time,
+                tags=[tag.format(**key_values) for tag in tags],
+                load_group=key_namespace,
+                lock=lock,
+                early_refresh_beta=early_refresh_beta
+            )
+            return json.loads(instance)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,502 @@
+import asyncio
+import json
+import math
+import random
+import time
+from collections import Counter
+from datetime import timedelta
+from typing import Union, Iterable, Callable, Awaitable, NamedTuple
+
+from aioredis import Redis, RedisError
+from aioredis.exceptions import LockError
+from aioredis.lock import Lock
+from aioredis.client import PubSub
+
+from core.config import settings
+from core.utils.cache.local_cache import LocalCache
+from infrastructure.metrics import record_cache_lookup
+from infrastructure.redis import redis_client
+from infrastructure.redis.app import RedisConnector
+from logger import logger
+
+__all__ = (
+    "CacheEngine",
+    "cache_engine",
+)
+
+# deletes every key attached to the given tags, bumps generations of the tags
+# and notifies other workers, so that invalidation of any number of tags costs one round trip.
+# KEYS: tag sets followed by generations of the same tags, ARGV: channel, ttl of generations
+INVALIDATE_TAGS_SCRIPT = """
+local tags_count = #KEYS / 2
+local keys = {}
+for i = 1, tags_count do
+    for _, key in ipairs(redis.call("SMEMBERS", KEYS[i])) do
+        table.insert(keys, key)
+    end
+    redis.call("DEL", KEYS[i])
+    redis.call("INCR", KEYS[tags_count + i])
+    redis.call("EXPIRE", KEYS[tags_count + i], ARGV[2])
+end
+for i = 1, #keys, 500 do
+    redis.call("DEL", unpack(keys, i, math.min(i + 499, #keys)))
+end
+if #keys > 0 then
+    redis.call("PUBLISH", ARGV[1], cjson.encode(keys))
+end
+return keys
+"""
+
+# stores the value and attaches it to the tags unless any of the tags has been invalidated
+# since the value started loading (its generation differs from the one read before the load).
+# KEYS: key, tag sets, generations of the tags, ARGV: value, ttl, ttl of tags, expected generations
+STORE_IF_FRESH_SCRIPT = """
+local tags_count = (#KEYS - 1) / 2
+for i = 1, tags_count do
+    if (redis.call("GET", KEYS[1 + tags_count + i]) or "0") ~= ARGV[3 + i] then
+        return 0
+    end
+end
+redis.call("SET", KEYS[1], ARGV[1], "EX", ARGV[2])
+for i = 1, tags_count do
+    redis.call("SADD", KEYS[1 + i], KEYS[1])
+    redis.call("EXPIRE", KEYS[1 + i], ARGV[3])
+end
+return 1
+"""
+
+
+def tag_key(tag: str) -> str:
+    """name of a redis set that holds keys attached to the tag"""
+    return f"cache:tag:{tag}"
+
+
+def tag_generation_key(tag: str) -> str:
+    """counter of invalidations of the tag"""
+    return f"cache:tag_generation:{tag}"
+
+
+class TagGenerations(NamedTuple):
+    """
+        state of the tags read before a value is loaded: generations of the tags in redis
+        (None if redis is unavailable) and the number of local evictions of the worker
+    """
+    redis: Union[list[str], None]
+    local: int
+
+
+LOCK_POLL_SECONDS = 0.05
+LOOKUP_STATS = {"local_hit": "local_hits", "redis_hit": "redis_hits", "miss": "misses"}
+LOAD_TIME_SMOOTHING = 0.2  # weight of the latest load time in the moving average
+
+
+class CacheEngine:
+    """
+        Two-tier cache: bounded in-process LRU tier in front of redis.
+        Entries evicted on one worker are evicted on every worker
+        through redis pub/sub (see start / delete / invalidate_tags)
+    """
+
+    def __init__(
+            self,
+            redis_connector: RedisConnector,
+            local_cache: LocalCache,
+            local_ttl_seconds: int,
+            invalidation_channel: str,
+            tag_ttl_seconds: int,
+            lock_timeout_seconds: int,
+    ):
+        self._redis_connector = redis_connector
+        self._local = local_cache
+        self._local_ttl_seconds = local_ttl_seconds
+        self._invalidation_channel = invalidation_channel
+        self._tag_ttl_seconds = tag_ttl_seconds
+        self._lock_timeout_seconds = lock_timeout_seconds
+        self._pubsub: Union[PubSub, None] = None
+        self._listener: Union[asyncio.Task, None] = None
+        self._inflight: dict[str, asyncio.Future] = {}  # key -> loader shared by concurrent misses
+        self._load_seconds: dict[str, float] = {}  # load group -> moving average of load time
+        self._local_evictions = 0  # values read before an eviction aren't put into the local tier
+        # local_hits, redis_hits, misses, coalesced, early_refreshes, lock_waits, stale_loads
+        self.stats: Counter = Counter()
+
+    async def get(self, key: str) -> Union[bytes, None]:
+        value, _ = await self._get_entry(key, load_group="")
+        return value
+
+    async def get_or_load(
+            self,
+            key: str,
+            loader: Callable[[], Awaitable[bytes]],
+            ttl: Union[timedelta, int],
+            tags: Iterable[str] = (),
+            load_group: str = "",
+            lock: bool = False,
+            early_refresh_beta: float = 1.0,
+    ) -> bytes:
+        """
+            returns cached value or stores and returns the one produced by loader.
+
+            Concurrent misses of the key in the worker share one loader call,
+            with lock=True misses on other workers wait for it as well.
+            Entry that is close to expiry is recomputed early by a single request
+            (XFetch, chance grows as expiry approaches and with load time of
+            load_group), while other requests keep getting the cached value
+        """
+        value, ttl_left = await self._get_entry(key, load_group=load_group)
+        if value is not None:
+            if key in self._inflight or not self._should_refresh_early(
+                    load_group, ttl_left, early_refresh_beta
+            ):
+                return value
+            self.stats["early_refreshes"] += 1
+
+        return await self._single_flight(
+            key,
+            lambda: self._load(key, loader, ttl, tags, load_group, lock, stale_value=value)
+        )
+
+    async def _get_entry(
+            self,
+            key: str,
+            load_group: Union[str, None] = None
+    ) -> tuple[Union[bytes, None], Union[float, None]]:
+        """
+            value with seconds it has left in redis (None for values from the local tier).
+            Lookup is counted per load_group in /metrics
+            unless load_group is None (polls of _wait_for)
+        """
+        value: Union[bytes, None] = self._local.get(key)
+        if value is not None:
+            self._count_lookup("local_hit", load_group)
+            return value, None
+
+        redis_con: Union[Redis, None] = await self._redis_connector.connect()
+        if not redis_con:
+            self._count_lookup("miss", load_group)
+            return None, None
+
+        local_evictions: int = self._local_evictions
+        try:
+            async with redis_con.pipeline(transaction=False) as pipe:
+                redis_value, ttl_ms = await pipe.get(key).pttl(key).execute()
+        except RedisError:
+            logger.error("Failed to read value from cache", extra={"key": key}, exc_info=True)
+            self._count_lookup("miss", load_group)
+            return None, None
+
+        if redis_value is None:
+            self._count_lookup("miss", load_group)
+            return None, None
+
+        value = redis_value.encode() if isinstance(redis_value, str) else redis_value
+        if ttl_ms > 0 and local_evictions == self._local_evictions:
+            # local entry never outlives the one stored in redis
+            self._local.set(key, value, ttl=min(ttl_ms / 1000, self._local_ttl_seconds))
+        self._count_lookup("redis_hit", load_group)
+        return value, (ttl_ms / 1000 if ttl_ms > 0 else None)
+
+    def _count_lookup(self, result: str, load_group: Union[str, None]) -> None:
+        self.stats[LOOKUP_STATS[result]] += 1
+        if load_group is not None:
+            record_cache_lookup(cache=load_group or "default", result=result)
+
+    def _should_refresh_early(
+            self,
+            load_group: str,
+            ttl_left: Union[float, None],
+            beta: float
+    ) -> bool:
+        if ttl_left is None or beta <= 0:
+            return False
+        load_seconds = self._load_seconds.get(load_group, 0.0)
+        return load_seconds * beta * -math.log(1.0 - random.random()) >= ttl_left
+
+    async def _single_flight(
+            self,
+            key: str,
+            load: Callable[[], Awaitable[bytes]]
+    ) -> bytes:
+        task: Union[asyncio.Future, None] = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(load())
+            self._inflight[key] = task
+
+            def forget(done_task: asyncio.Future) -> None:
+                if self._inflight.get(key) is done_task:
+                    del self._inflight[key]
+
+            task.add_done_callback(forget)
+        else:
+            self.stats["coalesced"] += 1
+        # shielded, so that cancelled request doesn't cancel the load for other requests
+        return await asyncio.shield(task)
+
+    async def _load(
+            self,
+            key: str,
+            loader: Callable[[], Awaitable[bytes]],
+            ttl: Union[timedelta, int],
+            tags: Iterable[str],
+            load_group: str,
+            lock: bool,
+            stale_value: Union[bytes, None],
+    ) -> bytes:
+        redis_lock: Union[Lock, None] = None
+        if lock:
+            acquired, redis_lock = await self._acquire_lock(key)
+            if not acquired:  # another worker loads the value
+                if stale_value is not None:
+                    return stale_value
+                value: Union[bytes, None] = await self._wait_for(key)
+                if value is not None:
+                    return value
+
+        try:
+            tags = list(tags)
+            # read before the loader, so that a value loaded before a concurrent write is committed
+            # and invalidated isn't stored after the invalidation (and served for the whole ttl)
+            generations: TagGenerations = await self._tag_generations(tags)
+            started_at = time.monotonic()
+            value = await loader()
+            load_seconds = time.monotonic() - started_at
+            previous = self._load_seconds.get(load_group, load_seconds)
+            self._load_seconds[load_group] = (
+                    previous + LOAD_TIME_SMOOTHING * (load_seconds - previous)
+            )
+            await self.set(key=key, value=value, ttl=ttl, tags=tags, generations=generations)
+            return value
+        finally:
+            if redis_lock is not None:
+                await self._release_lock(redis_lock)
+
+    async def _acquire_lock(self, key: str) -> tuple[bool, Union[Lock, None]]:
+        """
+            (False, None) if the lock is held by another worker,
+            (True, None) if redis is unavailable and value is loaded without the lock
+        """
+        redis_con: Union[Redis, None] = await self._redis_connector.connect()
+        if not redis_con:
+            return True, None
+
+        redis_lock: Lock = redis_con.lock(
+            name=f"{key}:lock", timeout=self._lock_timeout_seconds
+        )
+        try:
+            if await redis_lock.acquire(blocking=False):
+                return True, redis_lock
+        except RedisError:
+            logger.error("Failed to acquire cache lock", extra={"key": key}, exc_info=True)
+            return True, None
+        return False, None
+
+    async def _release_lock(self, redis_lock: Lock) -> None:
+        try:
+            await redis_lock.release()
+        except LockError:
+            pass  # lock has expired while the value was loaded
+        except RedisError:
+            extra = {"lock": redis_lock.name}
+            logger.error("Failed to release cache lock", extra=extra, exc_info=True)
+
+    async def _wait_for(self, key: str) -> Union[bytes, None]:
+        """
+            polls the key until the lock holder stores the value (at most lock timeout),
+            None if the lock is released without the value (it was stale or the load failed)
+        """
+        self.stats["lock_waits"] += 1
+        deadline = time.monotonic() + self._lock_timeout_seconds
+        while time.monotonic() < deadline:
+            await asyncio.sleep(LOCK_POLL_SECONDS)
+            value, _ = await self._get_entry(key)
+            if value is not None:
+                return value
+            if not await self._is_locked(key):
+                return None
+        return None
+
+    async def _is_locked(self, key: str) -> bool:
+        redis_con: Union[Redis, None] = await self._redis_connector.connect()
+        if not redis_con:
+            return False
+        try:
+            return bool(await redis_con.exists(f"{key}:lock"))
+        except RedisError:
+            return False
+
+    async def _tag_generations(self, tags: list[str]) -> TagGenerations:
+        redis_con: Union[Redis, None] = await self._redis_connector.connect()
+        if not redis_con:
+            return TagGenerations(redis=None, local=self._local_evictions)
+        if not tags:
+            return TagGenerations(redis=[], local=self._local_evictions)
+        try:
+            generations: list = await redis_con.mget([tag_generation_key(tag) for tag in tags])
+        except RedisError:
+            extra = {"tags": tags}
+            logger.error("Failed to read generations of cache tags", extra=extra, exc_info=True)
+            return TagGenerations(redis=None, local=self._local_evictions)
+        return TagGenerations(
+            redis=[
+                str(generation) if generation is not None else "0"
+                for generation in generations
+            ],
+            local=self._local_evictions
+        )
+
+    async def set(
+            self,
+            key: str,
+            value: bytes,
+            ttl: Union[timedelta, int],
+            tags: Iterable[str] = (),
+            generations: Union[TagGenerations, None] = None,
+    ) -> None:
+        """
+            stores value, attaching the key to tags (see invalidate_tags).
+            With generations (read before the value was loaded) the value isn't stored
+            if any of the tags has been invalidated since
+        """
+        tags = list(tags)
+        ttl_seconds = int(ttl.total_seconds()) if isinstance(ttl, timedelta) else ttl
+        if generations is None:
+            generations = TagGenerations(redis=None, local=self._local_evictions)
+            stored: bool = await self._set_in_redis(key, value, ttl_seconds, tags)
+        elif generations.redis is None:
+            # redis was unavailable, so invalidations were only local (see invalidate_tags)
+            stored = generations.local == self._local_evictions
+        else:
+            stored = await self._set_in_redis(key, value, ttl_seconds, tags, generations.redis)
+
+        if not stored:
+            self.stats["stale_loads"] += 1
+            extra = {"key": key}
+            logger.debug("Cache tags were invalidated while the value was loaded", extra=extra)
+            return
+        if generations.local == self._local_evictions:
+            self._local.set(key, value, ttl=min(ttl_seconds, self._local_ttl_seconds))
+
+    async def _set_in_redis(
+            self,
+            key: str,
+            value: bytes,
+            ttl_seconds: int,
+            tags: list[str],
+            generations: Union[list[str], None] = None
+    ) -> bool:
+        """False if a tag has been invalidated since generations were read"""
+        redis_con: Union[Redis, None] = await self._redis_connector.connect()
+        if not redis_con:
+            return True
+        try:
+            if generations is not None and tags:
+                store = redis_con.register_script(STORE_IF_FRESH_SCRIPT)
+                return bool(await store(
+                    keys=[key, *map(tag_key, tags), *map(tag_generation_key, tags)],
+                    args=[value, ttl_seconds, self._tag_ttl_seconds, *generations]
+                ))
+            async with redis_con.pipeline(transaction=False) as pipe:
+                pipe.set(name=key, value=value, ex=ttl_seconds)
+                for tag in tags:
+                    pipe.sadd(tag_key(tag), key)
+                    pipe.expire(tag_key(tag), self._tag_ttl_seconds)
+                await pipe.execute()
+        except RedisError:
+            logger.error("Failed to store value in cache", extra={"key": key}, exc_info=True)
+        return True
+
+    async def invalidate_tags(self, *tags: str) -> None:
+        """evicts every key attached to any of the tags (on every worker)"""
+        if not tags:
+            return
+
+        self._local_evictions += 1
+        redis_con: Union[Redis, None] = await self._redis_connector.connect()
+        if not redis_con:
+            self._local.clear()  # keys of the tags are known only to redis
+            return
+        unique_tags: list[str] = list(set(tags))
+        try:
+            invalidate = redis_con.register_script(INVALIDATE_TAGS_SCRIPT)
+            keys: list[str] = await invalidate(
+                keys=[*map(tag_key, unique_tags), *map(tag_generation_key, unique_tags)],
+                args=[self._invalidation_channel, self._tag_ttl_seconds]
+            )
+        except RedisError:
+            logger.error("Failed to invalidate cache tags", extra={"tags": tags}, exc_info=True)
+            return
+
+        for key in keys:
+            self._local.delete(key)
+        logger.debug("Cache tags invalidated", extra={"tags": tags, "keys_count": len(keys)})
+
+    async def delete(self, *keys: str) -> None:
+        """evicts keys from redis and from the local tier of every worker"""
+        if not keys:
+            return
+        self._local_evictions += 1
+        for key in keys:
+            self._local.delete(key)
+
+        redis_con: Union[Redis, None] = await self._redis_connector.connect()
+        if not redis_con:
+            return
+        try:
+            async with redis_con.pipeline(transaction=False) as pipe:
+                await pipe.delete(*keys).publish(
+                    self._invalidation_channel, json.dumps(keys)
+                ).execute()
+        except RedisError:
+            logger.error("Failed to invalidate cache", extra={"keys": keys}, exc_info=True)
+
+    def local_stats(self) -> dict:
+        return {"entries": len(self._local), "size_bytes": self._local.size_bytes}
+
+    async def start(self) -> None:
+        """subscribes to invalidation messages published by other workers"""
+        redis_con: Union[Redis, None] = await self._redis_connector.connect()
+        if not redis_con or self._listener is not None:
+            return
+        self._pubsub = redis_con.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(self._invalidation_channel)
+        self._listener = asyncio.create_task(self._listen())
+        logger.info(f"Cache engine subscribed to {self._invalidation_channel}")
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.unsubscribe(self._invalidation_channel)
+            await self._pubsub.close()
+            self._pubsub = None
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                message = await self._pubsub.get_message(timeout=1.0)
+            except RedisError:
+                logger.error("Cache invalidation listener error", exc_info=True)
+                self._local_evictions += 1
+                self._local.clear()  # messages might have been lost
+                await asyncio.sleep(1)
+                continue
+
+            if message is None:
+                continue
+            self._local_evictions += 1
+            for key in json.loads(message["data"]):
+                self._local.delete(key)
+
+
+cache_engine = CacheEngine(
+    redis_connector=redis_client,
+    local_cache=LocalCache(
+        max_entries=settings.CACHE_LOCAL_MAX_ENTRIES,
+        max_bytes=settings.CACHE_LOCAL_MAX_BYTES
+    ),
+    local_ttl_seconds=settings.CACHE_LOCAL_TTL_SECONDS,
+    invalidation_channel=settings.CACHE_INVALIDATION_CHANNEL,
+    tag_ttl_seconds=settings.CACHE_TAG_TTL_SECONDS,
+    lock_timeout_seconds=settings.CACHE_LOCK_TIMEOUT_SECONDS
+)
@@ -0,0 +1,25 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.utils.cache.engine import cache_engine
+
+__all__ = (
+    "invalidate_on_commit",
+    "flush_cache_invalidation",
+)
+
+PENDING_TAGS_KEY = "pending_cache_tags"
+
+
+def invalidate_on_commit(session: AsyncSession, *tags: str) -> None:
+    """
+        remembers tags to invalidate once the session is committed.
+        Requests that read the rows before the commit don't store them afterwards,
+        as generations of the tags change (see CacheEngine.set)
+    """
+    session.info.setdefault(PENDING_TAGS_KEY, set()).update(tags)
+
+
+async def flush_cache_invalidation(session: AsyncSession) -> None:
+    """invalidates tags collected by invalidate_on_commit (call after commit)"""
+    tags: set[str] = session.info.pop(PENDING_TAGS_KEY, set())
+    await cache_engine.invalidate_tags(*tags)
@@ -0,0 +1,30 @@
+import hashlib
+import json
+from typing import Any
+
+from pydantic import BaseModel
+
+__all__ = (
+    "canonical_hash",
+)
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items() if item is not None}
+    if isinstance(value, list):
+        return [_normalize(item) for item in value]
+    return value  # as it is passed to the query, so that different queries never share a key
+
+
+def canonical_hash(*models: BaseModel) -> str:
+    """
+        hash of query parameter schemas (filters, pagination) that doesn't depend
+        on the order of parameters and unset (None) fields
+    """
+    canonical: list = [
+        [type(model).__name__, _normalize(model.model_dump(mode="json"))]
+        for model in models
+    ]
+    encoded: bytes = json.dumps(canonical, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
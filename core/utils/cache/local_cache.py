@@ -0,0 +1,65 @@
+import time
+from collections import OrderedDict
+from typing import Union
+
+__all__ = (
+    "LocalCache",
+)
+
+
+class LocalCache:
+    """
+        Bounded in-process LRU cache with per-entry TTL.
+        Size of every entry (key + value) is accounted, so that the cache
+        never holds more than max_bytes or max_entries
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def get(self, key: str) -> Union[bytes, None]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._pop(key)
+            return None
+
+        self._entries.move_to_end(key)  # mark as recently used
+        return value
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        entry_size = len(key) + len(value)
+        if ttl <= 0 or entry_size > self.max_bytes:
+            return
+
+        self._pop(key)
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self.size_bytes += entry_size
+
+        while len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes:
+            least_recently_used_key = next(iter(self._entries))
+            self._pop(least_recently_used_key)
+
+    def delete(self, key: str) -> None:
+        self._pop(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size_bytes = 0
+
+    def _pop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= len(key) + len(entry[1])
@@ -33,6 +33,7 @@ class CeleryClient:
             )
 
 # how to start celery: celery -A infrastructure.celery.app:celery worker -l DEBUG --pool=solo
+# async jobs of concurrent tasks share the runner loop with: --pool=threads (see async_runner)
 
 
 client = CeleryClient(
@@ -50,10 +51,9 @@ celery.conf.beat_schedule = {  # tasks that are run recurrently
         "schedule": crontab(minute="*/1"),  # run every minute
         "args": (),
     },
-    "remove-expired-carts-every-ten-minutes": {
+    "remove-expired-carts-every-minute": {
         "task": "application.tasks.tasks1.remove_expired_carts",
-        # "schedule": crontab(minute="*/10"),  # run every 10 minutes,
-        "schedule": crontab(minute="*/1"),  # run every 10 minutes,
+        "schedule": crontab(minute="*/1"),  # run every minute, at most once across beat instances
         "args": (),
     }
 }
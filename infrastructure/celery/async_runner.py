@@ -0,0 +1,115 @@
+import asyncio
+import os
+import threading
+from typing import Any, Awaitable, Callable, Union
+
+from aioredis import Redis, RedisError
+from aioredis.lock import Lock
+
+from logger import logger
+
+__all__ = (
+    "AsyncTaskRunner",
+    "async_runner",
+)
+
+
+class AsyncTaskRunner:
+    """
+        Runs async jobs of sync celery tasks on one event loop per worker process.
+
+        The loop lives in a background thread for the life of the process, so the
+        db engine pool and the redis connection are created once and reused by every
+        run, and jobs submitted by concurrent tasks (--pool=threads) run concurrently
+    """
+
+    def __init__(self):
+        self._loop: Union[asyncio.AbstractEventLoop, None] = None
+        self._pid: Union[int, None] = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            # loop isn't inherited by forked workers
+            if self._loop is None or self._pid != os.getpid():
+                self._loop = asyncio.new_event_loop()
+                self._pid = os.getpid()
+                threading.Thread(
+                    target=self._loop.run_forever,
+                    name="async-task-runner",
+                    daemon=True
+                ).start()
+        return self._loop
+
+    def run(self, job: Callable[[], Awaitable], timeout_seconds: Union[float, None] = None) -> Any:
+        """runs the job on the runner loop and waits for its result"""
+        return asyncio.run_coroutine_threadsafe(
+            asyncio.wait_for(job(), timeout=timeout_seconds), self.loop
+        ).result()
+
+    def run_exclusive(
+            self,
+            job_name: str,
+            job: Callable[[], Awaitable],
+            lock_timeout_seconds: int
+    ) -> Any:
+        """
+            runs the job at most once per lock_timeout_seconds across all workers
+            (duplicate runs scheduled by several beat instances are skipped, None is returned).
+            The job is cancelled after lock_timeout_seconds, so runs never overlap
+        """
+        return self.run(
+            lambda: self._run_locked(job_name, job, lock_timeout_seconds)
+        )
+
+    async def _run_locked(
+            self,
+            job_name: str,
+            job: Callable[[], Awaitable],
+            lock_timeout_seconds: int
+    ) -> Any:
+        from infrastructure.redis import redis_client
+
+        redis_con: Union[Redis, None] = await redis_client.connect()
+        if redis_con is None:
+            extra = {"job": job_name}
+            logger.warning("Redis is unavailable, job runs without the lock", extra=extra)
+            return await asyncio.wait_for(job(), timeout=lock_timeout_seconds)
+
+        job_lock: Lock = redis_con.lock(
+            name=f"maintenance:{job_name}:lock", timeout=lock_timeout_seconds
+        )
+        try:
+            if not await job_lock.acquire(blocking=False):
+                logger.info("Job has already been run by another worker", extra={"job": job_name})
+                return None
+        except RedisError:
+            logger.error("Failed to acquire job lock", extra={"job": job_name}, exc_info=True)
+            return None
+
+        try:
+            # the lock isn't released on success, so that the job isn't repeated until it expires
+            return await asyncio.wait_for(job(), timeout=lock_timeout_seconds)
+        except BaseException:
+            try:
+                await job_lock.release()  # failed job can be retried by the next run
+            except RedisError:
+                logger.error("Failed to release job lock", extra={"job": job_name}, exc_info=True)
+            raise
+
+    def shutdown(self) -> None:
+        """
+            closes connections of the db pools (primary and replicas)
+            and stops the loop (on worker process shutdown)
+        """
+        if self._loop is None or self._pid != os.getpid():
+            return
+        from infrastructure.postgres import db_client
+
+        asyncio.run_coroutine_threadsafe(db_client.dispose(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+
+
+async_runner = AsyncTaskRunner()
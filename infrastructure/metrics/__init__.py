@@ -0,0 +1,24 @@
+__all__ = (
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "MetricsRegistry",
+    "metrics_registry",
+    "RequestMetrics",
+    "request_metrics_scope",
+    "record_pool_wait",
+    "record_cache_lookup",
+    "instrument_engine",
+    "instrument_redis",
+    "route_template",
+    "observe_request",
+    "render_metrics",
+)
+
+from .registry import Counter, Gauge, Histogram, MetricsRegistry, metrics_registry
+from .instrumentation import (
+    RequestMetrics, request_metrics_scope, record_pool_wait,
+    record_cache_lookup, instrument_engine, instrument_redis
+)
+from .http import route_template, observe_request
+from .runtime import render_metrics
@@ -0,0 +1,67 @@
+from starlette.requests import Request
+from starlette.routing import Match
+
+from .instrumentation import RequestMetrics
+from .registry import COUNT_BUCKETS, metrics_registry
+
+__all__ = (
+    "route_template",
+    "observe_request",
+)
+
+UNMATCHED_ROUTE = "<unmatched>"  # scans of unknown paths don't create a label per path
+
+http_requests = metrics_registry.counter(
+    "http_requests_total",
+    "Requests by route template, method and status",
+    ("route", "method", "status")
+)
+http_request_seconds = metrics_registry.histogram(
+    "http_request_duration_seconds", "Duration of requests", ("route", "method")
+)
+http_request_sql_statements = metrics_registry.histogram(
+    "http_request_sql_statements", "Sql statements executed per request", ("route", "method"),
+    buckets=COUNT_BUCKETS
+)
+http_request_sql_seconds = metrics_registry.histogram(
+    "http_request_sql_seconds", "Time spent in sql statements per request", ("route", "method")
+)
+http_request_redis_commands = metrics_registry.histogram(
+    "http_request_redis_commands", "Redis round trips per request", ("route", "method"),
+    buckets=COUNT_BUCKETS
+)
+http_request_redis_seconds = metrics_registry.histogram(
+    "http_request_redis_seconds", "Time spent in redis round trips per request", ("route", "method")
+)
+http_request_pool_wait_seconds = metrics_registry.histogram(
+    "http_request_pool_wait_seconds",
+    "Time spent waiting for db connections per request",
+    ("route", "method")
+)
+
+
+def route_template(request: Request) -> str:
+    """path the request is routed to as declared (/v1/books/{book_id}), not the requested one"""
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return getattr(route, "path", UNMATCHED_ROUTE)
+    return UNMATCHED_ROUTE
+
+
+def observe_request(
+        request_metrics: RequestMetrics,
+        method: str,
+        status: int,
+        seconds: float
+) -> None:
+    route = request_metrics.route
+    http_requests.inc(route=route, method=method, status=status)
+    http_request_seconds.observe(seconds, route=route, method=method)
+    http_request_sql_statements.observe(request_metrics.sql_statements, route=route, method=method)
+    http_request_sql_seconds.observe(request_metrics.sql_seconds, route=route, method=method)
+    http_request_redis_commands.observe(request_metrics.redis_commands, route=route, method=method)
+    http_request_redis_seconds.observe(request_metrics.redis_seconds, route=route, method=method)
+    http_request_pool_wait_seconds.observe(
+        request_metrics.pool_wait_seconds, route=route, method=method
+    )
@@ -0,0 +1,162 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Union
+
+from aioredis import Redis
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .registry import metrics_registry
+
+__all__ = (
+    "RequestMetrics",
+    "request_metrics_scope",
+    "record_pool_wait",
+    "record_cache_lookup",
+    "instrument_engine",
+    "instrument_redis",
+)
+
+# statements and commands run outside of requests (startup, tasks)
+BACKGROUND_ROUTE = "<background>"
+
+sql_statement_seconds = metrics_registry.histogram(
+    "db_statement_duration_seconds", "Duration of sql statements", ("route",)
+)
+redis_command_seconds = metrics_registry.histogram(
+    "redis_command_duration_seconds", "Duration of redis commands and pipelines", ("route",)
+)
+pool_wait_seconds = metrics_registry.histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a db connection", ("route",)
+)
+cache_lookups = metrics_registry.counter(
+    "cache_lookups_total",
+    "Cache lookups by cache and result (local_hit, redis_hit, miss)",
+    ("cache", "result")
+)
+
+
+class RequestMetrics:
+    """sql, redis and pool wait totals of one request"""
+
+    __slots__ = (
+        "route", "sql_statements", "sql_seconds",
+        "redis_commands", "redis_seconds", "pool_wait_seconds",
+    )
+
+    def __init__(self, route: str):
+        self.route = route
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+        self.redis_commands = 0
+        self.redis_seconds = 0.0
+        self.pool_wait_seconds = 0.0
+
+
+# set by the metrics middleware, the object is shared (not copied) by tasks the request spawns
+_request_metrics: ContextVar[Union[RequestMetrics, None]] = ContextVar(
+    "request_metrics", default=None
+)
+
+
+@contextmanager
+def request_metrics_scope(route: str) -> Iterator[RequestMetrics]:
+    request_metrics = RequestMetrics(route)
+    token = _request_metrics.set(request_metrics)
+    try:
+        yield request_metrics
+    finally:
+        _request_metrics.reset(token)
+
+
+def _current_route() -> str:
+    request_metrics: Union[RequestMetrics, None] = _request_metrics.get()
+    return request_metrics.route if request_metrics is not None else BACKGROUND_ROUTE
+
+
+def record_sql(seconds: float) -> None:
+    request_metrics: Union[RequestMetrics, None] = _request_metrics.get()
+    if request_metrics is not None:
+        request_metrics.sql_statements += 1
+        request_metrics.sql_seconds += seconds
+    sql_statement_seconds.observe(seconds, route=_current_route())
+
+
+def record_redis(seconds: float) -> None:
+    request_metrics: Union[RequestMetrics, None] = _request_metrics.get()
+    if request_metrics is not None:
+        request_metrics.redis_commands += 1
+        request_metrics.redis_seconds += seconds
+    redis_command_seconds.observe(seconds, route=_current_route())
+
+
+def record_pool_wait(seconds: float) -> None:
+    request_metrics: Union[RequestMetrics, None] = _request_metrics.get()
+    if request_metrics is not None:
+        request_metrics.pool_wait_seconds += seconds
+    pool_wait_seconds.observe(seconds, route=_current_route())
+
+
+def record_cache_lookup(cache: str, result: str) -> None:
+    cache_lookups.inc(cache=cache, result=result)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started_at: list[float] = conn.info.get("query_started_at")
+    if started_at:
+        record_sql(time.perf_counter() - started_at.pop())
+
+
+def _handle_error(exception_context) -> None:
+    conn = exception_context.connection
+    started_at: list[float] = conn.info.get("query_started_at") if conn is not None else None
+    if started_at:
+        record_sql(time.perf_counter() - started_at.pop())
+
+
+def instrument_engine(engine: Engine) -> None:
+    """times every statement of the engine (sync_engine of the AsyncEngine)"""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def instrument_redis(redis_con: Redis) -> Redis:
+    """
+        times commands of the client, a pipeline (and a transaction) is timed as one
+        round trip. Commands of pub/sub connections aren't timed
+    """
+    execute_command = redis_con.execute_command
+    pipeline = redis_con.pipeline
+
+    async def timed_execute_command(*args, **options):
+        started_at = time.perf_counter()
+        try:
+            return await execute_command(*args, **options)
+        finally:
+            record_redis(time.perf_counter() - started_at)
+
+    def timed_pipeline(*args, **kwargs):
+        pipe = pipeline(*args, **kwargs)
+        execute = pipe.execute
+
+        async def timed_execute(*execute_args, **execute_kwargs):
+            started_at = time.perf_counter()
+            try:
+                return await execute(*execute_args, **execute_kwargs)
+            finally:
+                record_redis(time.perf_counter() - started_at)
+
+        pipe.execute = timed_execute
+        return pipe
+
+    redis_con.execute_command = timed_execute_command
+    redis_con.pipeline = timed_pipeline
+    return redis_con
@@ -0,0 +1,75 @@
+from .instrumentation import cache_lookups
+from .registry import metrics_registry
+
+__all__ = (
+    "render_metrics",
+)
+
+cache_hit_ratio = metrics_registry.gauge(
+    "cache_hit_ratio", "Share of cache lookups served from the local tier or redis", ("cache",)
+)
+cache_engine_events = metrics_registry.counter(
+    "cache_engine_events_total",
+    "Events of the cache engine (hits, misses, coalesced loads, ...)",
+    ("event",)
+)
+cache_local_tier = metrics_registry.gauge(
+    "cache_local_tier", "Entries and bytes held by the in-process cache tier", ("measure",)
+)
+db_pool_connections = metrics_registry.gauge(
+    "db_pool_connections", "Connections of the db pool by state", ("engine", "state")
+)
+db_pool_checkouts = metrics_registry.counter(
+    "db_pool_checkouts_total", "Connection checkouts of the primary pool", ("result",)
+)
+db_replica_lag_seconds = metrics_registry.gauge(
+    "db_replica_lag_seconds", "Replication lag of the replica at its last check", ("replica",)
+)
+db_replica_healthy = metrics_registry.gauge(
+    "db_replica_healthy", "1 if reads are routed to the replica", ("replica",)
+)
+logging_records = metrics_registry.counter(
+    "logging_records_total", "Log records by outcome (queued, dropped, sampled_out)", ("outcome",)
+)
+logging_queue_size = metrics_registry.gauge(
+    "logging_queue_size", "Records waiting to be written by the log writer thread"
+)
+
+
+def collect_runtime_metrics() -> None:
+    """copies stats kept by the cache engine, db pool and logger into the registry"""
+    from core.utils.cache import cache_engine
+    from infrastructure.postgres import db_client
+    from logger import get_logging_stats
+
+    lookups: dict[str, dict[str, float]] = {}
+    for (cache, result), value in cache_lookups.items():
+        lookups.setdefault(cache, {})[result] = value
+    for cache, results in lookups.items():
+        total = sum(results.values())
+        cache_hit_ratio.set((total - results.get("miss", 0)) / total if total else 0, cache=cache)
+
+    for event, value in cache_engine.stats.items():
+        cache_engine_events.set(value, event=event)
+    for measure, value in cache_engine.local_stats().items():
+        cache_local_tier.set(value, measure=measure)
+
+    pool_stats: dict = db_client.pool_stats()
+    for state in ("in_use", "idle", "overflow"):
+        db_pool_connections.set(pool_stats[state], engine="primary", state=state)
+    db_pool_checkouts.set(pool_stats["checkouts"] - pool_stats["checkout_timeouts"], result="ok")
+    db_pool_checkouts.set(pool_stats["checkout_timeouts"], result="timeout")
+    for replica in pool_stats["replicas"]:
+        db_pool_connections.set(replica["in_use"], engine=replica["replica"], state="in_use")
+        db_replica_lag_seconds.set(replica["lag_seconds"], replica=replica["replica"])
+        db_replica_healthy.set(int(replica["healthy"]), replica=replica["replica"])
+
+    logging_stats: dict = get_logging_stats()
+    for outcome in ("queued", "dropped", "sampled_out"):
+        logging_records.set(logging_stats.get(outcome, 0), outcome=outcome)
+    logging_queue_size.set(logging_stats["queue_size"])
+
+
+def render_metrics() -> str:
+    collect_runtime_metrics()
+    return metrics_registry.render()
@@ -1,6 +1,12 @@
 __all__ = (
     "PostgresClient",
     "db_client",
+    "PoolCheckoutStats",
+    "InstrumentedAsyncQueuePool",
+    "Replica",
+    "ReplicaRouter",
 )
 
 from.app import PostgresClient, db_client
+from .pool import PoolCheckoutStats, InstrumentedAsyncQueuePool
+from .replicas import Replica, ReplicaRouter
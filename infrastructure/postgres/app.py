@@ -1,33 +1,129 @@
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine, async_scoped_session, AsyncSession
+from sqlalchemy.ext.asyncio import (
+    async_sessionmaker, create_async_engine, async_scoped_session, AsyncSession, AsyncEngine
+)
 from sqlalchemy.exc import SQLAlchemyError
-from typing_extensions import AsyncGenerator
+from typing_extensions import AsyncGenerator, AsyncIterator
 
 from asyncio import current_task
+from contextlib import asynccontextmanager
 from core.config import settings
+from infrastructure.metrics import instrument_engine
+from infrastructure.postgres.pool import InstrumentedAsyncQueuePool
+from infrastructure.postgres.replicas import Replica, ReplicaRouter, ReplicaSession
 
 
 class PostgresClient:
 
-    def __init__(self, url, echo: bool = False):
+    def __init__(self, url, echo: bool = False, replica_urls: list[str] | None = None):
+        self.engine = self._create_engine(url=url, echo=echo)
+        self.async_session = self._create_sessionmaker(self.engine)
+
+        replicas: list[Replica] = []
+        for replica_url in replica_urls or []:
+            replica_engine = self._create_engine(url=replica_url, echo=echo)
+            replicas.append(Replica(
+                engine=replica_engine,
+                async_session=self._create_sessionmaker(
+                    replica_engine, session_class=ReplicaSession
+                )
+            ))
+        self.replica_router = ReplicaRouter(
+            replicas=replicas,
+            max_lag_seconds=settings.DB_REPLICA_MAX_LAG_SECONDS,
+            check_interval_seconds=settings.DB_REPLICA_CHECK_INTERVAL_SECONDS
+        )
+
+    @staticmethod
+    def _create_engine(url, echo: bool) -> AsyncEngine:
         from logger import logger
         try:
-            self.engine = create_async_engine(url=url, echo=echo)
+            engine = create_async_engine(
+                url=url,
+                echo=echo,
+                poolclass=InstrumentedAsyncQueuePool,
+                pool_size=settings.DB_POOL_SIZE,
+                max_overflow=settings.DB_POOL_MAX_OVERFLOW,
+                pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+                pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+                pool_pre_ping=settings.DB_POOL_PRE_PING,
+                connect_args={
+                    # prepared statements cached by asyncpg per connection
+                    # (0 behind pgbouncer in transaction mode)
+                    "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+                    "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+                }
+            )
+            # statement count and time per request (see /metrics)
+            instrument_engine(engine.sync_engine)
             logger.info(f"Successful db connection via: {url}")
+            return engine
         except SQLAlchemyError:
             extra = {"url": url}
             logger.error("DB connection error: Error while connecting to db", extra=extra, exc_info=True)
 
-        self.async_session = async_sessionmaker(
-            bind=self.engine,
+    @staticmethod
+    def _create_sessionmaker(
+            engine: AsyncEngine,
+            session_class: type = AsyncSession
+    ) -> async_sessionmaker:
+        return async_sessionmaker(
+            bind=engine,
+            class_=session_class,
             autoflush=False,
             autocommit=False,
             expire_on_commit=False
         )
 
+    def pool_stats(self) -> dict:
+        """
+            connections in use / idle / over pool_size and time spent waiting for them.
+            Growing checkout wait means requests queue for connections rather than for queries
+        """
+        pool: InstrumentedAsyncQueuePool = self.engine.pool
+        return {
+            "pool_size": pool.size(),
+            "in_use": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": settings.DB_POOL_MAX_OVERFLOW,
+            **pool.checkout_stats.as_dict(),
+            "replicas": [replica.as_dict() for replica in self.replica_router.replicas],
+        }
+
+    async def dispose(self) -> None:
+        """closes connections of the primary and of every replica pool"""
+        for replica in self.replica_router.replicas:
+            if replica._check_task is not None:
+                replica._check_task.cancel()
+            await replica.engine.dispose()
+        await self.engine.dispose()
+
     async def get_async_session(self) -> AsyncSession:
         async with self.async_session() as session:
             yield session
 
+    @asynccontextmanager
+    async def read_session(self) -> AsyncIterator[AsyncSession]:
+        """
+            session for read-only work: the least loaded healthy replica,
+            the primary if no replica is configured, healthy or caught up.
+            Queries fail over to the primary if the replica fails (see ReplicaSession)
+        """
+        replica: Replica | None = self.replica_router.choose()
+        if replica is None:
+            async with self.async_session() as session:
+                yield session
+            return
+
+        async with replica.async_session() as session:
+            session.fall_back_to(replica=replica, primary=self.engine)
+            yield session
+
+    async def get_read_session_dependency(self) -> AsyncGenerator[AsyncSession, None]:
+        """session for read-only endpoints (see read_session)"""
+        async with self.read_session() as session:
+            yield session
+
     async def get_scoped_session_dependency(self) -> AsyncGenerator[AsyncSession, None]:
         scoped_factory = async_scoped_session(
             session_factory=self.async_session,
@@ -43,5 +139,6 @@ class PostgresClient:
 # client to access db
 db_client = PostgresClient(
     url=settings.get_db_url,
-    echo=False  # display queries performed
+    echo=False,  # display queries performed
+    replica_urls=settings.get_db_replica_urls
 )
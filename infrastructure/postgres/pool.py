@@ -0,0 +1,87 @@
+import time
+
+from greenlet import getcurrent, greenlet
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from infrastructure.metrics import record_pool_wait
+
+__all__ = (
+    "PoolCheckoutStats",
+    "InstrumentedAsyncQueuePool",
+)
+
+
+class PoolCheckoutStats:
+    """time requests spend waiting for a connection (not for queries)"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record(self, wait_seconds: float, timed_out: bool) -> None:
+        self.checkouts += 1
+        self.timeouts += int(timed_out)
+        self.wait_seconds_total += wait_seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+
+    def as_dict(self) -> dict:
+        wait_seconds_avg: float = 0.0
+        if self.checkouts:
+            wait_seconds_avg = self.wait_seconds_total / self.checkouts
+        return {
+            "checkouts": self.checkouts,
+            "checkout_timeouts": self.timeouts,
+            "checkout_wait_seconds_total": round(self.wait_seconds_total, 6),
+            "checkout_wait_seconds_max": round(self.wait_seconds_max, 6),
+            "checkout_wait_seconds_avg": round(wait_seconds_avg, 6),
+        }
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """
+        AsyncAdaptedQueuePool that measures how long checkouts wait for a free connection.
+        QueuePool._do_get calls itself on overflow retries and may open a new connection,
+        so a checkout is recorded once, without the time spent connecting
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_stats = PoolCheckoutStats()
+        # greenlet of a checkout in progress -> seconds spent opening connections.
+        # Every coroutine using the async engine runs in its own greenlet
+        self._connect_seconds: dict[greenlet, float] = {}
+
+    def _do_get(self):
+        current: greenlet = getcurrent()
+        if current in self._connect_seconds:
+            return super()._do_get()  # retry inside a checkout that is being measured
+
+        self._connect_seconds[current] = 0.0
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            timed_out = True
+            raise
+        finally:
+            wait_seconds = time.perf_counter() - start - self._connect_seconds.pop(current)
+            self.checkout_stats.record(wait_seconds, timed_out)
+            record_pool_wait(wait_seconds)
+
+    def _create_connection(self):
+        start = time.perf_counter()
+        try:
+            return super()._create_connection()
+        finally:
+            current: greenlet = getcurrent()
+            if current in self._connect_seconds:
+                self._connect_seconds[current] += time.perf_counter() - start
+
+    def recreate(self) -> "InstrumentedAsyncQueuePool":
+        pool = super().recreate()
+        pool.checkout_stats = self.checkout_stats  # stats survive engine.dispose()
+        return pool
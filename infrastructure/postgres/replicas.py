@@ -0,0 +1,157 @@
+import asyncio
+import itertools
+import time
+from typing import Union
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError, DBAPIError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+__all__ = (
+    "Replica",
+    "ReplicaRouter",
+    "ReplicaSession",
+)
+
+# seconds the replica is behind the primary, 0 if it has replayed everything it received
+REPLICATION_LAG_SQL = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """
+)
+
+
+class Replica:
+    def __init__(self, engine: AsyncEngine, async_session: async_sessionmaker):
+        self.engine = engine
+        self.async_session = async_session
+        self.healthy = False  # reads go to the primary until the first check passes
+        self.lag_seconds = 0.0
+        self.checked_at = 0.0
+        self._check_task: Union[asyncio.Task, None] = None
+
+    @property
+    def name(self) -> str:
+        return f"{self.engine.url.host}:{self.engine.url.port}"
+
+    @property
+    def in_use(self) -> int:
+        return self.engine.pool.checkedout()
+
+    async def check(self, max_lag_seconds: float) -> None:
+        from logger import logger
+        try:
+            async with self.engine.connect() as con:
+                self.lag_seconds = float((await con.execute(REPLICATION_LAG_SQL)).scalar() or 0)
+            healthy = self.lag_seconds <= max_lag_seconds
+        except (SQLAlchemyError, OSError):
+            healthy = False
+        if healthy != self.healthy:
+            extra = {"replica": self.name, "lag_seconds": self.lag_seconds}
+            logger.warning(
+                "Replica is available" if healthy
+                else "Replica is lagging or down, reads go to the primary",
+                extra=extra
+            )
+        self.healthy = healthy
+        self.checked_at = time.monotonic()
+
+    def mark_failed(self) -> None:
+        """called when a request on the replica failed, replica is skipped until the next check"""
+        self.healthy = False
+        self.checked_at = time.monotonic()
+
+    def as_dict(self) -> dict:
+        return {
+            "replica": self.name,
+            "healthy": self.healthy,
+            "lag_seconds": round(self.lag_seconds, 3),
+            "in_use": self.in_use,
+        }
+
+
+class ReplicaRouter:
+    """
+        Picks the least loaded healthy replica (round-robin among equally loaded ones).
+        Health (reachability and replication lag) is checked in the background,
+        so that a slow or dead replica doesn't delay requests
+    """
+
+    def __init__(
+            self,
+            replicas: list[Replica],
+            max_lag_seconds: float,
+            check_interval_seconds: float
+    ):
+        self.replicas = replicas
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval_seconds = check_interval_seconds
+        self._order = itertools.count()
+
+    def choose(self) -> Union[Replica, None]:
+        """None if there is no healthy replica (reads go to the primary)"""
+        self._schedule_checks()
+        healthy: list[Replica] = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        start: int = next(self._order) % len(healthy)
+        rotated: list[Replica] = healthy[start:] + healthy[:start]
+        return min(rotated, key=lambda replica: replica.in_use)
+
+    def _schedule_checks(self) -> None:
+        now: float = time.monotonic()
+        for replica in self.replicas:
+            check_in_progress = replica._check_task is not None and not replica._check_task.done()
+            if now - replica.checked_at >= self.check_interval_seconds and not check_in_progress:
+                replica._check_task = asyncio.create_task(replica.check(self.max_lag_seconds))
+
+
+def is_connection_error(error: Exception) -> bool:
+    """replica is unreachable, has dropped the connection or can't serve the query now"""
+    if isinstance(error, (OSError, OperationalError)):
+        return True
+    return isinstance(error, DBAPIError) and error.connection_invalidated
+
+
+class ReplicaSession(AsyncSession):
+    """
+        Session of a replica (read-only work). A statement that fails because the replica
+        is unreachable is retried once on the primary, which serves the rest of the session.
+        The replica is skipped by the next requests until its next check passes
+    """
+
+    replica: Union[Replica, None] = None
+    primary: Union[AsyncEngine, None] = None
+
+    def fall_back_to(self, replica: Replica, primary: AsyncEngine) -> None:
+        self.replica, self.primary = replica, primary
+
+    async def execute(self, *args, **kwargs):
+        return await self._with_fallback(super().execute, *args, **kwargs)
+
+    async def scalar(self, *args, **kwargs):
+        return await self._with_fallback(super().scalar, *args, **kwargs)
+
+    async def get(self, *args, **kwargs):
+        return await self._with_fallback(super().get, *args, **kwargs)
+
+    async def _with_fallback(self, method, *args, **kwargs):
+        try:
+            return await method(*args, **kwargs)
+        except (DBAPIError, OSError) as e:
+            if self.replica is None or self.primary is None or not is_connection_error(e):
+                raise
+            from logger import logger
+            logger.warning(
+                "Replica failed, the query is retried on the primary",
+                extra={"replica": self.replica.name}, exc_info=True
+            )
+            self.replica.mark_failed()
+            self.replica = None
+            await self.rollback()  # releases the failed connection
+            self.sync_session.bind = self.primary.sync_engine
+            return await method(*args, **kwargs)
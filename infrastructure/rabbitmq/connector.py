@@ -81,6 +81,8 @@ class RabbitConnector:
             return
         try:
             self.rabbit_chan: BlockingChannel = self.rabbit_con.channel()
+            # basic_publish raises if the broker doesn't accept a message
+            self.rabbit_chan.confirm_delivery()
             logger.info("Channel has been created, CHAN: ", extra={"channel": self.rabbit_chan})
         except Exception:
             logger.error(
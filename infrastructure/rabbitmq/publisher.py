@@ -1,4 +1,7 @@
 from dataclasses import dataclass
+
+from pika import BasicProperties
+
 from logger import logger
 from infrastructure.rabbitmq.connector import RabbitConnector, rabbit_connector
 
@@ -11,20 +14,28 @@ class RabbitPublisher:
     # sets up interaction with RabbitMQ
     rabbit_connector: RabbitConnector
 
-    def send_message_basic_publish(self, message: bytes, routing_key: str):
+    def send_message_basic_publish(
+            self,
+            message: bytes,
+            routing_key: str,
+            properties: BasicProperties | None = None
+    ) -> bool:
+        """returns True once the broker has confirmed the message"""
         try:
             self.rabbit_connector.rabbit_chan.basic_publish(
                 exchange="",
                 routing_key=routing_key,
                 body=message,
+                properties=properties,
                 mandatory=True
             )
+            return True
         except Exception:
             logger.error(
                 "Failed to publish a message",
                 extra=self.rabbit_connector.creds
             )
-            return
+            return False
 
 
 rabbit_publisher = RabbitPublisher(
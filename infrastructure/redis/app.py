@@ -4,6 +4,7 @@ import aioredis
 from aioredis import RedisError, Connection
 
 from core.config import settings
+from infrastructure.metrics import instrument_redis
 from logger import logger
 
 
@@ -37,10 +38,10 @@ class RedisConnector:
         if self.__connection:
             return self.__connection
 
-        redis_con = await aioredis.from_url(
+        redis_con = instrument_redis(await aioredis.from_url(
             f"redis://{self.host}:{self.port}",
             decode_responses=True
-            )
+            ))
         try:
             if self.reconnect_retrials == 0:
                 raise TypeError  # manually raise this error so that the
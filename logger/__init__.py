@@ -1,5 +1,7 @@
 __all__ = (
     "logger",
+    "get_logging_stats",
+    "stop_queue_listener",
 )
 
-from .logg import logger
+from .logg import logger, get_logging_stats, stop_queue_listener
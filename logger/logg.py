@@ -1,6 +1,17 @@
+import atexit
+import copy
 import logging
 import os
-from datetime import datetime
+import queue
+import random
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from logging.handlers import QueueHandler, QueueListener, WatchedFileHandler
+from typing import Any, Union
+from uuid import UUID
+
+import orjson
 from pythonjsonlogger import jsonlogger
 from dotenv import load_dotenv
 from core.config import settings
@@ -66,15 +77,108 @@ class CustomConsoleFormatter(logging.Formatter):
 LOG_LEVEL = settings.LOG_LEVEL
 LOGS_JOURNAL_PATH = settings.LOGS_JOURNAL_NAME
 
-logs_file_formatter = CustomJsonFormatter('%(timestamp)s %(level)s %(pathname)s: %(message)s')
-console_formatter = CustomJsonFormatter('\033[94m %(level)s %(pathname)s: %(message)s \033[0m')
 
+# converts what orjson can't serialize (bytes, exceptions, arbitrary objects in extra)
+json_encoder = jsonlogger.JsonEncoder()
 
-# init default logger
-logger = logging.getLogger(__file__)
 
-# define format for logs in the logs journal and where to write logs
-file_handler = logging.FileHandler(
+def orjson_dumps(obj, default=None, **kwargs) -> str:
+    """json serializer of the formatters (several times faster than json.dumps)"""
+    return orjson.dumps(
+        obj, default=default or json_encoder.default, option=orjson.OPT_NON_STR_KEYS
+    ).decode()
+
+
+# counters of the logging pipeline
+logging_stats: Counter = Counter()
+
+logs_file_formatter = CustomJsonFormatter(
+    '%(timestamp)s %(level)s %(pathname)s: %(message)s',
+    json_serializer=orjson_dumps
+)
+console_formatter = CustomJsonFormatter(
+    '\033[94m %(level)s %(pathname)s: %(message)s \033[0m',
+    json_serializer=orjson_dumps
+)
+
+
+class SamplingFilter(logging.Filter):
+    """
+        passes DEBUG / INFO records of a module (or logger) with the configured probability,
+        WARNING and above always pass.
+        rates: "module=rate,..." e.g. "orm_entity_repo=0.1,cart_service=0.5"
+    """
+
+    def __init__(self, rates: str, default_rate: float = 1.0):
+        super().__init__()
+        self.default_rate = default_rate
+        self.rates: dict[str, float] = {
+            name.strip(): float(rate)
+            for name, rate in (item.split("=") for item in rates.split(",") if item.strip())
+        }
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate: float = self.rates.get(record.module, self.rates.get(record.name, self.default_rate))
+        if rate >= 1.0 or random.random() < rate:
+            return True
+        logging_stats["sampled_out"] += 1
+        return False
+
+
+# attributes every record has, the rest are extras of the call
+RECORD_ATTRIBUTES = frozenset(logging.makeLogRecord({}).__dict__) | {"message", "asctime"}
+# immutable values, safe to format in the listener thread
+PLAIN_TYPES = (
+    str, int, float, bool, type(None), bytes, UUID, Decimal, datetime, date, time, timedelta
+)
+
+
+def detach(value: Any) -> Any:
+    """
+        snapshot of an extra taken in the caller: containers are copied, other objects
+        (ORM entities, repositories, ...) are replaced with their repr, so that the listener
+        thread never reads objects that belong to a session or change after the call
+    """
+    if isinstance(value, PLAIN_TYPES):
+        return value
+    if isinstance(value, dict):
+        return {str(key): detach(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [detach(item) for item in value]
+    return repr(value)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+        hands records to the listener thread, so that callers never wait for disk or console.
+        Records are dropped (and counted) when the bounded queue is full
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # only the message is rendered in the caller, extras and traceback stay separate fields
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg, record.args, record.exc_info = record.message, None, None
+        for name, value in record.__dict__.items():
+            if name not in RECORD_ATTRIBUTES:
+                record.__dict__[name] = detach(value)
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+            logging_stats["queued"] += 1
+        except queue.Full:
+            logging_stats["dropped"] += 1
+
+
+# define format for logs in the logs journal and where to write logs,
+# the journal is rotated by the log shipper and reopened here when its inode changes
+file_handler = WatchedFileHandler(
     filename=os.path.normpath(LOGS_JOURNAL_PATH),
     mode="a"
 )
@@ -85,8 +189,48 @@ file_handler.setFormatter(logs_file_formatter)
 # define format for logs in the console and where to stream logs
 logHandler = logging.StreamHandler()
 logHandler.setFormatter(console_formatter)
-logger.setLevel(LOG_LEVEL)
 
+queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+queue_handler.addFilter(
+    SamplingFilter(rates=settings.LOG_SAMPLING, default_rate=settings.LOG_SAMPLING_DEFAULT_RATE)
+)
+queue_listener: Union[QueueListener, None] = None
+
+
+def start_queue_listener() -> None:
+    """writes queued records in a background thread (a new queue and thread in forked processes)"""
+    global queue_listener
+    queue_handler.queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    queue_listener = QueueListener(
+        queue_handler.queue, file_handler, logHandler, respect_handler_level=True
+    )
+    queue_listener.start()
+
+
+def stop_queue_listener() -> None:
+    """flushes queued records"""
+    global queue_listener
+    if queue_listener is not None:
+        queue_listener.stop()
+        queue_listener = None
+
+
+def get_logging_stats() -> dict:
+    return {
+        **logging_stats,
+        "queue_size": queue_handler.queue.qsize(),
+        "queue_max_size": settings.LOG_QUEUE_SIZE,
+    }
+
+
+start_queue_listener()
+atexit.register(stop_queue_listener)
+# threads aren't inherited by celery workers
+os.register_at_fork(after_in_child=start_queue_listener)
+
+
+# init default logger
+logger = logging.getLogger(__file__)
+logger.setLevel(LOG_LEVEL)
 
-logger.addHandler(file_handler)
-logger.addHandler(logHandler)
+logger.addHandler(queue_handler)
@@ -239,3 +239,150 @@ async def test_update_book_partially(
     async with AsyncClient(app=app, base_url="http://test") as ac:
         response = await ac.patch(url=f"v1/books/{book_id}", json=update_data)
     assert response.status_code == status_code
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_books_listing_cache_is_invalidated_on_update(ac):
+    book_id = "ecd38a11-3bbd-4bba-b596-3e2d554796a7"
+    url = f"v1/books?id__eq={book_id}&limit=1"
+
+    first_response = await ac.get(url=url)
+    cached_response = await ac.get(url=f"v1/books?limit=1&id__eq={book_id}")
+    assert first_response.status_code == 200
+    assert cached_response.json() == first_response.json()
+
+    response = await ac.patch(url=f"v1/books/{book_id}", json={"name": "Book listing cache"})
+    assert response.status_code == 200
+
+    response = await ac.get(url=url)
+    assert response.json()[0]["name"] == "Book listing cache"
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_books_listing_cache_keeps_whitespace_of_filters(ac):
+    # "Example book 2 " is stored with the trailing space
+    response = await ac.get(url="v1/books", params={"name__eq": "Example book 2"})
+    assert response.json() == []
+
+    response = await ac.get(url="v1/books", params={"name__eq": "Example book 2 "})
+    assert [book["name"] for book in response.json()] == ["Example book 2 "]
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_get_all_books_cursor_pagination(ac):
+    first_page = await ac.get(url="v1/books?limit=2&order_by=-price_per_unit")
+    assert first_page.status_code == 200
+    cursor = first_page.headers["X-Next-Cursor"]
+
+    second_page = await ac.get(url=f"v1/books?limit=2&order_by=-price_per_unit&cursor={cursor}")
+    assert second_page.status_code == 200
+    first_ids = {book["id"] for book in first_page.json()}
+    assert not first_ids & {book["id"] for book in second_page.json()}
+    assert first_page.json()[-1]["price_per_unit"] >= second_page.json()[0]["price_per_unit"]
+
+    response = await ac.get(url=f"v1/books?limit=2&order_by=name&cursor={cursor}")
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_get_all_books_cursor_pagination_by_nullable_key(ac):
+    # books without rating are listed last and aren't lost between pages
+    await ac.post(url="v1/books/", json={
+        "isbn": "5550001", "name": "Book without rating", "description": None,
+        "price_per_unit": 10, "number_in_stock": 1, "rating": None
+    })
+    all_books = (await ac.get(url="v1/books", params={"order_by": "-rating", "limit": 1000})).json()
+
+    paged_books, params = [], {"order_by": "-rating", "limit": 2}
+    while True:
+        response = await ac.get(url="v1/books", params=params)
+        assert response.status_code == 200
+        paged_books.extend(response.json())
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["X-Next-Cursor"]
+
+    assert [book["id"] for book in paged_books] == [book["id"] for book in all_books]
+    assert all_books[-1]["rating"] is None
+
+
+@pytest.mark.asyncio(scope="session")
+@pytest.mark.parametrize(
+    "params,status_code",
+    [
+        ({"q": "example"}, 200),
+        ({"q": "example book", "price_per_unit__gt": 1}, 200),
+        ({"q": "example", "cursor": "abc"}, 400),
+        ({"q": ""}, 422),
+    ]
+)
+async def test_search_books(params: dict, status_code: int, ac):
+    response = await ac.get(url="v1/books/search", params=params)
+    assert response.status_code == status_code
+    if status_code == 200:
+        books: list[dict] = response.json()
+        assert books
+        assert all("<b>" in book["name_highlight"] for book in books)
+        ranks: list[float] = [book["rank"] for book in books]
+        assert ranks == sorted(ranks, reverse=True)
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_get_all_books_similar_name(ac):
+    response = await ac.get(url="v1/books", params={"name__similar": "Exampel bok"})
+    assert response.status_code == 200
+    assert response.json()[0]["name"] == "Example book"
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_get_all_books_similar_name_is_paginated_by_page(ac):
+    response = await ac.get(url="v1/books", params={"name__similar": "Exampel bok", "limit": 1})
+    assert response.status_code == 200
+    assert "X-Next-Cursor" not in response.headers
+
+    cursor = (await ac.get(url="v1/books", params={"limit": 1})).headers["X-Next-Cursor"]
+    response = await ac.get(
+        url="v1/books", params={"name__similar": "Exampel bok", "cursor": cursor}
+    )
+    assert response.status_code == 400
+
+    response = await ac.get(
+        url="v1/books", params={"name__similar": "Exampel bok", "order_by": "name", "limit": 1}
+    )
+    assert "X-Next-Cursor" in response.headers
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_search_authors_by_misspelled_name(ac):
+    response = await ac.get(url="v1/authors/search", params={"name": "Chekhov"})
+    assert response.status_code == 200
+    assert response.json()[0]["last_name"] == "Checkhov"
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_suggest_books_follows_changes_of_books(ac):
+    data = {
+        "isbn": "7777", "name": "Autocomplete Lighthouse", "description": "",
+        "price_per_unit": 10, "number_in_stock": 1, "rating": 5, "discount": 0,
+    }
+    book_id: str = (await ac.post(url="v1/books/", json=data)).json()["id"]
+
+    response = await ac.get(url="v1/books/suggest", params={"q": "lightho"})
+    assert response.status_code == 200
+    suggestion: dict = {"kind": "book", "text": "Autocomplete Lighthouse", "book_id": book_id}
+    assert suggestion in response.json()
+
+    await ac.delete(url=f"v1/books/{book_id}")
+    response = await ac.get(url="v1/books/suggest", params={"q": "lightho"})
+    assert all(suggestion["book_id"] != book_id for suggestion in response.json())
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_get_all_books_aggregates_authors_and_categories(ac):
+    response = await ac.get(
+        url="v1/books", params={"id__eq": "20aaefdc-ab3b-4074-af87-dc26a36bb6a0"}
+    )
+    assert response.status_code == 200
+    book: dict = response.json()[0]
+    assert book["genre_names"] == ["Category 1", "Category 2"]
+    assert book["authors"] == ["Michael, Jordan"]
@@ -0,0 +1,26 @@
+import pytest
+
+BOOK_ID = "fb39af9d-292e-4eb0-989c-9e5aa195a4a0"
+
+
+def sample(metrics: str, name: str) -> float:
+    values = (
+        float(line.rsplit(" ", 1)[1]) for line in metrics.splitlines() if line.startswith(name)
+    )
+    return next(values, 0)
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_requests_are_labelled_by_route_template(ac):
+    count = 'http_request_sql_statements_count{route="/v1/books/{book_id}",method="GET"}'
+    before: float = sample((await ac.get(url="metrics")).text, count)
+
+    assert (await ac.get(url=f"v1/books/{BOOK_ID}")).status_code == 200
+    assert (await ac.get(url="v1/no-such-path")).status_code == 404
+
+    response = await ac.get(url="metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert sample(response.text, count) == before + 1
+    assert BOOK_ID not in response.text  # ids don't create labels
+    assert 'http_requests_total{route="<unmatched>",method="GET",status="404"}' in response.text
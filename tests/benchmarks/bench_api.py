@@ -0,0 +1,298 @@
+"""
+Drives the app in-process (httpx.ASGITransport, no network / uvicorn) with concurrent
+virtual users and reports RPS, p50 / p95 / p99 latency and sql statements per request
+for every endpoint.
+
+scenarios (picked by every virtual user per iteration according to --mix):
+    browse - a page of the catalogue and a book
+    search - full text search by one or two words of book names
+    cart - anonymous cart: add a book, read the cart, remove the book
+    checkout - user cart with two books paid through FakePaymentProvider
+
+how to run (catalogue seeded by tests.benchmarks.seed_catalogue with the same --random-seed,
+MODE=TEST, so that requests aren't throttled, LOG_LEVEL=WARNING to keep logging out of the numbers):
+    python -m tests.benchmarks.bench_api --virtual-users 50 --duration 30 \
+        --mix browse=60,search=20,cart=15,checkout=5 --output results.json --baseline baseline.json
+
+with --baseline the run fails (exit code 1) if p95 or statements per request of an endpoint
+grew by more than --max-regression compared to the baseline results
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Annotated, Union
+from uuid import UUID, uuid4
+
+import httpx
+from fastapi import Depends
+from sqlalchemy import func, select
+
+from application.cmd import app
+from application.models import Book, User
+from application.schemas import CreatePaymentS, ReturnPaymentS
+from application.services.order_service.order_service import OrderService
+from auth.helpers import issue_token
+from auth.schemas import TokenPayload
+from core.config import settings
+from infrastructure.metrics.http import http_request_sql_statements
+from infrastructure.payment import YooKassaPaymentProvider
+from infrastructure.postgres import db_client
+from tests.benchmarks.seed_catalogue import WORDS, book_uuid, user_email
+
+
+class FakePaymentProvider:
+    """accepts every payment at once, so that checkout is measured without the payment api"""
+
+    def __init__(self, order_service: Annotated[OrderService, Depends(OrderService)]):
+        self._order_service = order_service
+
+    def create_payment(self, payment_data: CreatePaymentS) -> ReturnPaymentS:
+        payment_id = uuid4()
+        return ReturnPaymentS(
+            confirmation_url=f"https://payments.test/{payment_id}", payment_id=payment_id
+        )
+
+    def get_payment_status(self, payment_id: UUID) -> str:
+        return "succeeded"
+
+    async def check_payment_status(
+            self,
+            payment_id: UUID,
+            shopping_session_id: UUID,
+            amount: float
+    ) -> None:
+        await self._order_service.perform_order(
+            payment_id=payment_id,
+            shopping_session_id=shopping_session_id,
+            status="success"
+        )
+
+    def make_refund(self, payment_id: UUID, amount: float, description: str) -> None:
+        pass
+
+
+class Recorder:
+    """latencies and statuses per endpoint ("METHOD /route/template")"""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    def record(self, endpoint: str, seconds: float, status: int) -> None:
+        self.latencies[endpoint].append(seconds)
+        if status >= 400:
+            self.errors[endpoint] += 1
+
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, rng: random.Random):
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+
+    async def call(self, method: str, template: str, **kwargs) -> httpx.Response:
+        path_params = kwargs.pop("path_params", {})
+        start = time.perf_counter()
+        response: httpx.Response = await self.client.request(
+            method, template.format(**path_params), **kwargs
+        )
+        seconds: float = time.perf_counter() - start
+        self.recorder.record(f"{method} {template}", seconds, response.status_code)
+        return response
+
+
+class Scenarios:
+    def __init__(self, transport: httpx.ASGITransport, books: int, users: int):
+        self.transport = transport
+        self.books = books
+        self.users = itertools.cycle(range(1, users + 1))  # every checkout is made by the next user
+
+    def random_book(self, rng: random.Random) -> str:
+        return str(book_uuid(rng.randrange(self.books)))
+
+    async def browse(self, user: VirtualUser) -> None:
+        await user.call("GET", "/v1/books", params={"page": user.rng.randint(0, 50), "limit": 20})
+        await user.call(
+            "GET", "/v1/books/{book_id}", path_params={"book_id": self.random_book(user.rng)}
+        )
+
+    async def search(self, user: VirtualUser) -> None:
+        query = " ".join(user.rng.sample(WORDS, k=user.rng.randint(1, 2)))
+        await user.call("GET", "/v1/books/search", params={"q": query, "limit": 20})
+
+    async def cart(self, user: VirtualUser) -> None:
+        if settings.SHOPPING_SESSION_COOKIE_NAME not in user.client.cookies:
+            await user.call("POST", "/v1/cart/")
+        book_id = self.random_book(user.rng)
+        await user.call("POST", "/v1/cart/items", json={"book_id": book_id, "quantity": 1})
+        await user.call("GET", "/v1/cart/")
+        await user.call("DELETE", "/v1/cart/items", json={"book_id": book_id, "quantity": 1})
+
+    async def checkout(self, user: VirtualUser) -> None:
+        user_id: int = next(self.users)
+        payload = TokenPayload(user_id=user_id, email=user_email(user_id), role="user")
+        token = issue_token(payload, is_refresh=False)
+        headers = {"Authorization": f"Bearer {token.token}"}
+        async with httpx.AsyncClient(
+                transport=self.transport, base_url=user.client.base_url, headers=headers
+        ) as client:
+            buyer = VirtualUser(client, user.recorder, user.rng)
+            await buyer.call("POST", "/v1/cart/")
+            for _ in range(2):
+                book_id = self.random_book(user.rng)
+                await buyer.call("POST", "/v1/cart/items", json={"book_id": book_id, "quantity": 1})
+            await buyer.call("GET", "/v1/checkout")
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """nearest-rank percentile"""
+    return sorted_values[max(math.ceil(q / 100 * len(sorted_values)) - 1, 0)]
+
+
+def sql_statements(endpoint: str) -> tuple[float, int]:
+    """statements and requests of the endpoint counted by the metrics middleware so far"""
+    method, route = endpoint.split(" ", 1)
+    return (
+        http_request_sql_statements.sum(route=route, method=method),
+        http_request_sql_statements.count(route=route, method=method)
+    )
+
+
+def summarize(
+        recorder: Recorder,
+        elapsed: float,
+        sql_before: dict[str, tuple[float, int]]
+) -> dict[str, dict]:
+    results: dict[str, dict] = {}
+    for endpoint, latencies in sorted(recorder.latencies.items()):
+        latencies.sort()
+        statements, requests = sql_statements(endpoint)
+        statements_before, requests_before = sql_before.get(endpoint, (0.0, 0))
+        results[endpoint] = {
+            "requests": len(latencies),
+            "errors": recorder.errors[endpoint],
+            "rps": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "statements_per_request": (
+                round((statements - statements_before) / (requests - requests_before), 2)
+                if requests > requests_before else None
+            ),
+        }
+    return results
+
+
+def print_report(results: dict[str, dict], elapsed: float) -> None:
+    print(f"{'endpoint':<32} {'requests':>9} {'errors':>7} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'sql/req':>8}")
+    for endpoint, stats in results.items():
+        statements = stats["statements_per_request"]
+        print(
+            f"{endpoint:<32} {stats['requests']:>9} {stats['errors']:>7} {stats['rps']:>8} "
+            f"{stats['p50_ms']:>8} {stats['p95_ms']:>8} {stats['p99_ms']:>8} "
+            f"{'-' if statements is None else round(statements, 1):>8}"
+        )
+    total = sum(stats["requests"] for stats in results.values())
+    print(f"total: {total} requests in {elapsed:.1f}s ({total / elapsed:.0f} rps)")
+
+
+def regressions(
+        results: dict[str, dict],
+        baseline: dict[str, dict],
+        max_regression: float
+) -> list[str]:
+    found: list[str] = []
+    for endpoint, stats in results.items():
+        previous: Union[dict, None] = baseline.get(endpoint)
+        if previous is None:
+            continue
+        for measure in ("p95_ms", "statements_per_request"):
+            if not (previous[measure] and stats[measure]):
+                continue
+            if stats[measure] > previous[measure] * (1 + max_regression):
+                found.append(f"{endpoint}: {measure} {previous[measure]} -> {stats[measure]}")
+    return found
+
+
+def parse_mix(mix: str) -> dict[str, int]:
+    weights: dict[str, int] = {}
+    for part in mix.split(","):
+        scenario, weight = part.split("=")
+        weights[scenario.strip()] = int(weight)
+    return weights
+
+
+async def count_rows() -> tuple[int, int]:
+    async with db_client.async_session() as session:
+        books: int = await session.scalar(select(func.count()).select_from(Book))
+        users: int = await session.scalar(select(func.count()).select_from(User))
+    return books, users
+
+
+async def run(args: argparse.Namespace) -> dict[str, dict]:
+    app.dependency_overrides[YooKassaPaymentProvider] = FakePaymentProvider
+    books, users = await count_rows()
+    transport = httpx.ASGITransport(app=app)
+    scenarios = Scenarios(transport=transport, books=books, users=users)
+    mix: dict[str, int] = parse_mix(args.mix)
+
+    async def virtual_user(n: int, recorder: Recorder, deadline: float) -> None:
+        rng = random.Random(args.random_seed + n)
+        # secure cookies (shopping session) are sent over https only
+        async with httpx.AsyncClient(transport=transport, base_url="https://bench") as client:
+            user = VirtualUser(client, recorder, rng)
+            while time.perf_counter() < deadline:
+                scenario: str = rng.choices(list(mix), weights=list(mix.values()))[0]
+                await getattr(scenarios, scenario)(user)
+
+    async with app.router.lifespan_context(app):  # startup handlers (cache engine)
+        warmup = Recorder()  # fills caches and the db pool, isn't reported
+        deadline = time.perf_counter() + args.warmup
+        await asyncio.gather(
+            *[virtual_user(n, warmup, deadline) for n in range(args.virtual_users)]
+        )
+        sql_before = {endpoint: sql_statements(endpoint) for endpoint in warmup.latencies}
+
+        recorder = Recorder()
+        start = time.perf_counter()
+        await asyncio.gather(
+            *[virtual_user(n, recorder, start + args.duration) for n in range(args.virtual_users)]
+        )
+        elapsed = time.perf_counter() - start
+
+    results = summarize(recorder, elapsed, sql_before)
+    print_report(results, elapsed)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--virtual-users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds, not measured")
+    parser.add_argument("--mix", default="browse=60,search=20,cart=15,checkout=5")
+    parser.add_argument("--random-seed", type=int, default=42)
+    parser.add_argument("--output", help="writes results as json")
+    parser.add_argument("--baseline", help="results of a previous run to compare with")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    cli_args = parser.parse_args()
+
+    run_results: dict[str, dict] = asyncio.run(run(cli_args))
+    if cli_args.output:
+        with open(cli_args.output, "w") as f:
+            json.dump(run_results, f, indent=2)
+    if cli_args.baseline:
+        with open(cli_args.baseline) as f:
+            found_regressions: list[str] = regressions(
+                run_results, json.load(f), cli_args.max_regression
+            )
+        for regression in found_regressions:
+            print(f"REGRESSION {regression}")
+        sys.exit(1 if found_regressions else 0)
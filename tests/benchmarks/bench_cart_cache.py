@@ -0,0 +1,154 @@
+"""
+Compares redis round trips, latency and memory of cart cache formats.
+
+legacy - global book:{id} hashes, EXISTS + SMEMBERS + HKEYS/HVALS for every book
+scripted - the same hashes read by a single lua script
+snapshot - per-cart compact blob read with one GET (used by get_cart_from_cache)
+
+how to run (redis from core.config.settings must be up):
+    python -m tests.benchmarks.bench_cart_cache --books 30 --iterations 2000
+"""
+import argparse
+import asyncio
+import json
+import time
+from uuid import uuid4
+
+from aioredis import Redis
+
+from application.schemas import ReturnCartS
+from application.schemas.order_schemas import AssocBookS
+from application.services.cart_service.utils import (
+    serialize_cart,
+    deserialize_cart,
+    cart_snapshot_key
+)
+from infrastructure.redis import redis_client
+
+READ_CART_SCRIPT = """
+local book_ids = redis.call("SMEMBERS", KEYS[1])
+local books = {}
+for i, book_id in ipairs(book_ids) do
+    books[i] = redis.call("HGETALL", ARGV[1] .. book_id)
+end
+return books
+"""
+
+
+class RoundTripCounter:
+    """counts connections taken from the pool (1 checkout == 1 round trip)"""
+
+    def __init__(self, redis_con: Redis):
+        self.round_trips = 0
+        pool = redis_con.connection_pool
+        get_connection = pool.get_connection
+
+        async def counting_get_connection(*args, **kwargs):
+            self.round_trips += 1
+            return await get_connection(*args, **kwargs)
+
+        pool.get_connection = counting_get_connection
+
+
+def book_from_hash(book_metadata: dict) -> AssocBookS:
+    book_metadata["authors"] = json.loads(book_metadata["authors"])
+    book_metadata["categories"] = json.loads(book_metadata["categories"])
+    return AssocBookS(**book_metadata)
+
+
+async def legacy_read_cart(redis_con: Redis, cart: ReturnCartS) -> list[AssocBookS]:
+    cart_set_name = f"bench:cart:{cart.cart_id}"
+    if not await redis_con.exists(cart_set_name):
+        return []
+    books = []
+    for book_id in await redis_con.smembers(name=cart_set_name):
+        keys = await redis_con.hkeys(name=f"bench:book:{book_id}")
+        values = await redis_con.hvals(name=f"bench:book:{book_id}")
+        books.append(book_from_hash(dict(zip(keys, values))))
+    return books
+
+
+async def scripted_read_cart(redis_con: Redis, cart: ReturnCartS) -> list[AssocBookS]:
+    read_cart = redis_con.register_script(READ_CART_SCRIPT)
+    raw_books = await read_cart(keys=[f"bench:cart:{cart.cart_id}"], args=["bench:book:"])
+    return [book_from_hash(dict(zip(raw[::2], raw[1::2]))) for raw in raw_books]
+
+
+async def snapshot_read_cart(redis_con: Redis, cart: ReturnCartS) -> list[AssocBookS]:
+    return deserialize_cart(await redis_con.get(cart_snapshot_key(cart.cart_id))).books
+
+
+async def seed_cart(redis_con: Redis, books_count: int) -> tuple[ReturnCartS, dict[str, int]]:
+    cart = ReturnCartS(
+        cart_id=uuid4(),
+        books=[
+            AssocBookS(
+                book_id=uuid4(),
+                book_title=f"Benchmark book {i}",
+                authors=["Leo Tolstoy"],
+                categories=["Novel", "Classic"],
+                rating=5,
+                discount=10,
+                count_ordered=1,
+                price_per_unit=100.0
+            ) for i in range(books_count)
+        ]
+    )
+
+    hashes_memory = 0
+    for book in cart.books:
+        book_hash_name = f"bench:book:{book.book_id}"
+        for key, value in book.model_dump().items():
+            if isinstance(value, list):
+                value = json.dumps(value)
+            await redis_con.hset(name=book_hash_name, key=key, value=str(value))
+        await redis_con.sadd(f"bench:cart:{cart.cart_id}", str(book.book_id))
+        hashes_memory += await redis_con.memory_usage(book_hash_name) or 0
+    hashes_memory += await redis_con.memory_usage(f"bench:cart:{cart.cart_id}") or 0
+
+    await redis_con.set(name=cart_snapshot_key(cart.cart_id), value=serialize_cart(cart), ex=600)
+    snapshot_memory = await redis_con.memory_usage(cart_snapshot_key(cart.cart_id)) or 0
+
+    return cart, {"hashes": hashes_memory, "snapshot": snapshot_memory}
+
+
+def percentile(samples: list[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+async def run(books_count: int, iterations: int) -> None:
+    redis_con: Redis = await redis_client.connect()
+    if redis_con is None:
+        raise SystemExit("redis is not available")
+
+    counter = RoundTripCounter(redis_con)
+    cart, memory = await seed_cart(redis_con, books_count)
+    print(f"memory: hashes={memory['hashes']}B snapshot={memory['snapshot']}B")
+
+    readers = (
+        ("legacy", legacy_read_cart),
+        ("scripted", scripted_read_cart),
+        ("snapshot", snapshot_read_cart),
+    )
+    for name, read_cart in readers:
+        latencies = []
+        counter.round_trips = 0
+        for _ in range(iterations):
+            start = time.perf_counter()
+            books = await read_cart(redis_con, cart)
+            latencies.append((time.perf_counter() - start) * 1000)
+            assert len(books) == books_count
+        print(
+            f"{name:>9}: round trips/read={counter.round_trips / iterations:.1f} "
+            f"p50={percentile(latencies, 0.50):.3f}ms "
+            f"p99={percentile(latencies, 0.99):.3f}ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--books", type=int, default=30)
+    parser.add_argument("--iterations", type=int, default=1000)
+    cli_args = parser.parse_args()
+    asyncio.run(run(books_count=cli_args.books, iterations=cli_args.iterations))
@@ -0,0 +1,89 @@
+"""
+Fires concurrent stock reservations at a single book and checks that it is never oversold.
+
+every reservation runs in its own session / transaction (as concurrent requests do),
+so the conditional UPDATE (InventoryRepository.reserve_stock) is the only guard
+
+how to run (postgres from core.config.settings must be up and migrated):
+    python -m tests.benchmarks.bench_inventory --stock 100 --reservations 1000 --quantity 1
+"""
+import argparse
+import asyncio
+import time
+from uuid import uuid4
+
+from sqlalchemy import delete, select
+
+from application.models import Book
+from application.repositories.inventory_repo import InventoryRepository
+from infrastructure.postgres import db_client
+
+
+async def seed_book(stock: int) -> Book:
+    book = Book(
+        isbn=f"bench-{uuid4()}",
+        name="Benchmark book",
+        price_per_unit=100.0,
+        number_in_stock=stock,
+        discount=0
+    )
+    async with db_client.async_session() as session:
+        session.add(book)
+        await session.commit()
+    return book
+
+
+async def reserve(repo: InventoryRepository, book: Book, quantity: int) -> bool:
+    async with db_client.async_session() as session:
+        number_in_stock = await repo.reserve_stock(
+            session=session, book_id=book.id, quantity=quantity
+        )
+        await session.commit()
+    return number_in_stock is not None
+
+
+async def run(stock: int, reservations: int, quantity: int, parallelism: int) -> None:
+    repo = InventoryRepository()
+    book: Book = await seed_book(stock)
+    semaphore = asyncio.Semaphore(parallelism)  # the db pool is the real limit
+
+    async def limited_reserve() -> bool:
+        async with semaphore:
+            return await reserve(repo, book, quantity)
+
+    start = time.perf_counter()
+    results: list[bool] = await asyncio.gather(*[limited_reserve() for _ in range(reservations)])
+    elapsed = time.perf_counter() - start
+
+    async with db_client.async_session() as session:
+        number_in_stock: int = await session.scalar(
+            select(Book.number_in_stock).where(Book.id == book.id)
+        )
+        await session.execute(delete(Book).where(Book.id == book.id))
+        await session.commit()
+
+    reserved: int = sum(results) * quantity
+    print(
+        f"reservations={reservations} succeeded={sum(results)} reserved={reserved} "
+        f"left={number_in_stock} time={elapsed:.3f}s ({reservations / elapsed:.0f} reservations/s)"
+    )
+    assert reserved <= stock, f"oversold by {reserved - stock}"
+    assert number_in_stock == stock - reserved >= 0, "stock doesn't match reservations"
+    print("no oversell")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stock", type=int, default=100)
+    parser.add_argument("--reservations", type=int, default=1000)
+    parser.add_argument("--quantity", type=int, default=1)
+    parser.add_argument("--parallelism", type=int, default=50)
+    cli_args = parser.parse_args()
+    asyncio.run(
+        run(
+            stock=cli_args.stock,
+            reservations=cli_args.reservations,
+            quantity=cli_args.quantity,
+            parallelism=cli_args.parallelism
+        )
+    )
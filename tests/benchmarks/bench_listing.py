@@ -0,0 +1,107 @@
+"""
+Compares a page of the catalogue loaded as entities (BookRepository.get_all_books, books with
+selectinload of categories and authors, mapped to validated ReturnBookS) with the projection
+used by BookService.get_all_books (BookRepository.get_books_listing, names aggregated by postgres,
+rows mapped without validation). Reports wall and cpu time and sql statements per page.
+
+how to run (catalogue seeded by tests.benchmarks.seed_catalogue):
+    python -m tests.benchmarks.bench_listing --pages 200 --limit 100
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from application.repositories.book_repo import BookRepository
+from application.repositories.image_repo import ImageRepository
+from application.schemas import ReturnBookS
+from application.services import BookService
+from application.services.utils.filters import BookFilter, Pagination
+from infrastructure.metrics import request_metrics_scope
+from infrastructure.postgres import db_client
+
+ORDERINGS = (None, "price_per_unit", "-created_at", "name")
+
+
+async def entity_page(
+        repo: BookRepository,
+        session: AsyncSession,
+        filters: BookFilter,
+        pagination: Pagination
+):
+    """the listing as it was loaded before get_books_listing"""
+    books = await repo.get_all_books(session=session, filters=filters, pagination=pagination)
+    return [
+        ReturnBookS(
+            id=book.id,
+            isbn=book.isbn,
+            name=book.name,
+            genre_names=[category.name for category in book.categories],
+            authors=[", ".join([author.first_name, author.last_name]) for author in book.authors],
+            description=book.description,
+            price_per_unit=book.price_per_unit,
+            number_in_stock=book.number_in_stock,
+            rating=book.rating,
+            discount=book.discount
+        )
+        for book in books
+    ]
+
+
+async def projection_page(
+        service: BookService,
+        session: AsyncSession,
+        filters: BookFilter,
+        pagination: Pagination
+):
+    listing = await service.get_all_books(session=session, filters=filters, pagination=pagination)
+    return listing.items
+
+
+async def measure(name: str, load_page, requests: list[tuple[BookFilter, Pagination]]) -> None:
+    wall, cpu, statements, rows = 0.0, 0.0, 0, 0
+    for filters, pagination in requests:
+        async with db_client.async_session() as session:
+            with request_metrics_scope(name) as request_metrics:
+                wall_start, cpu_start = time.perf_counter(), time.process_time()
+                rows += len(await load_page(session, filters, pagination))
+                wall += time.perf_counter() - wall_start
+                cpu += time.process_time() - cpu_start
+            statements += request_metrics.sql_statements
+    pages = len(requests)
+    print(
+        f"{name:<12} pages={pages} rows/page={rows / pages:.0f} wall={wall / pages * 1000:.2f}ms "
+        f"cpu={cpu / pages * 1000:.2f}ms cpu/row={cpu / max(rows, 1) * 1e6:.1f}us "
+        f"sql/page={statements / pages:.1f}"
+    )
+
+
+async def run(pages: int, limit: int, random_seed: int) -> None:
+    rng = random.Random(random_seed)
+    repo = BookRepository()
+    service = BookService(storage=None, book_repo=repo, image_repo=ImageRepository())
+    requests: list[tuple[BookFilter, Pagination]] = [
+        (
+            BookFilter(order_by=rng.choice(ORDERINGS)),
+            Pagination(limit=limit, page=rng.randint(0, 50))
+        )
+        for _ in range(pages)
+    ]
+
+    def load_projection(session: AsyncSession, f: BookFilter, p: Pagination):
+        return projection_page(service, session, f, p)
+
+    await measure("warmup", load_projection, requests[:10])
+    await measure("entities", lambda session, f, p: entity_page(repo, session, f, p), requests)
+    await measure("projection", load_projection, requests)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--random-seed", type=int, default=42)
+    cli_args = parser.parse_args()
+    asyncio.run(run(pages=cli_args.pages, limit=cli_args.limit, random_seed=cli_args.random_seed))
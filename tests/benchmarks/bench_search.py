@@ -0,0 +1,156 @@
+"""
+Compares latency of the prefix filter (BookFilter.name__ilike), of full text search
+(BookRepository.search_books over the GIN index on books.search_vector) and of trigram
+matching of misspelled titles and author names (BookFilter.name__similar,
+AuthorRepository.find_by_name) and prints plans, so that a sequential scan is easy to spot.
+Autocomplete (book_suggestions) is measured per keystroke of the same queries, after its index
+is built from the catalogue.
+
+how to run (catalogue seeded by tests.benchmarks.seed_catalogue, for example with --books 1000000):
+    python -m tests.benchmarks.bench_search --queries 200 --limit 20
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from sqlalchemy import text
+
+from application.repositories.author_repo import AuthorRepository
+from application.repositories.book_repo import BookRepository
+from application.services.autocomplete import book_suggestions
+from application.services.utils.filters import BookFilter, Pagination
+from infrastructure.postgres import db_client
+from tests.benchmarks.seed_catalogue import FIRST_NAMES, LAST_NAMES, WORDS
+
+
+def misspell(rng: random.Random, word: str) -> str:
+    """drops or swaps a letter"""
+    i = rng.randrange(len(word) - 1)
+    if rng.random() < 0.5:
+        return word[:i] + word[i + 1:]
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    return sorted_values[min(int(q / 100 * len(sorted_values)), len(sorted_values) - 1)]
+
+
+async def explain(sql: str, params: dict) -> str:
+    async with db_client.async_session() as session:
+        result = await session.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"), params)
+        rows = result.scalars().all()
+    return "\n".join(rows)
+
+
+def report(name: str, latencies: list[float], found: int) -> None:
+    latencies.sort()
+    print(
+        f"{name:<12} queries={len(latencies)} rows/query={found / len(latencies):.1f} "
+        f"p50={percentile(latencies, 50) * 1000:.3f}ms "
+        f"p95={percentile(latencies, 95) * 1000:.3f}ms "
+        f"p99={percentile(latencies, 99) * 1000:.3f}ms"
+    )
+
+
+async def measure(name: str, queries: list[str], run_query) -> None:
+    latencies: list[float] = []
+    found = 0
+    async with db_client.async_session() as session:
+        for query in queries:
+            start = time.perf_counter()
+            found += len(await run_query(session, query))
+            latencies.append(time.perf_counter() - start)
+    report(name, latencies, found)
+
+
+async def measure_suggestions(queries: list[str], limit: int) -> None:
+    start = time.perf_counter()
+    await book_suggestions.rebuild()
+    seconds: float = time.perf_counter() - start
+    print(f"suggest index: {len(book_suggestions.index)} suggestions built in {seconds:.1f}s")
+
+    latencies: list[float] = []
+    found = 0
+    for query in queries:
+        for typed in range(1, len(query) + 1):  # a request per keystroke
+            start = time.perf_counter()
+            found += len(book_suggestions.suggest(query[:typed], limit))
+            latencies.append(time.perf_counter() - start)
+    report("suggest", latencies, found)
+
+
+async def run(queries_count: int, limit: int, random_seed: int) -> None:
+    rng = random.Random(random_seed)
+    repo = BookRepository()
+    queries: list[str] = [
+        " ".join(rng.sample(WORDS, k=rng.randint(1, 2))) for _ in range(queries_count)
+    ]
+    pagination = Pagination(limit=limit)
+
+    async def ilike(session, query: str) -> list:
+        # prefix of the title, the way the catalogue filter matches
+        return await repo.get_all_books(
+            session=session,
+            filters=BookFilter(name__ilike=query.capitalize()),
+            pagination=pagination
+        )
+
+    async def full_text(session, query: str) -> list:
+        return await repo.search_books(
+            session=session, query=query, filters=BookFilter(), pagination=pagination
+        )
+
+    async def similar(session, query: str) -> list:
+        return await repo.get_all_books(
+            session=session, filters=BookFilter(name__similar=query), pagination=pagination
+        )
+
+    author_repo = AuthorRepository()
+
+    async def author(session, query: str) -> list:
+        return await author_repo.find_by_name(session=session, name=query, limit=limit)
+
+    misspelled: list[str] = [
+        " ".join(misspell(rng, word) for word in query.split()) for query in queries
+    ]
+    author_names: list[str] = [
+        f"{misspell(rng, rng.choice(FIRST_NAMES))} {misspell(rng, rng.choice(LAST_NAMES))}"
+        for _ in queries
+    ]
+
+    await measure("ilike", queries, ilike)
+    await measure("full text", queries, full_text)
+    await measure("similar", misspelled, similar)
+    await measure("author", author_names, author)
+    await measure_suggestions(queries, limit=min(limit, book_suggestions.index.limit))
+
+    print("\nilike plan:")
+    print(await explain(
+        "SELECT id FROM books WHERE name ILIKE :pattern ORDER BY id LIMIT :limit",
+        {"pattern": f"{queries[0].capitalize()}%", "limit": limit}
+    ))
+    print("\nfull text plan:")
+    print(await explain(
+        "SELECT id, ts_rank_cd(search_vector, q) AS rank "
+        "FROM books, websearch_to_tsquery('english'::regconfig, :query) q "
+        "WHERE search_vector @@ q ORDER BY rank DESC, id LIMIT :limit",
+        {"query": queries[0], "limit": limit}
+    ))
+    print("\nsimilar plan:")
+    print(await explain(
+        "SELECT id FROM books WHERE name % :query "
+        "ORDER BY similarity(name, :query) DESC, id LIMIT :limit",
+        {"query": misspelled[0], "limit": limit}
+    ))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--random-seed", type=int, default=42)
+    cli_args = parser.parse_args()
+    asyncio.run(run(
+        queries_count=cli_args.queries, limit=cli_args.limit, random_seed=cli_args.random_seed
+    ))
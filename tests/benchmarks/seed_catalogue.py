@@ -0,0 +1,203 @@
+"""
+Generates a synthetic catalogue (books, categories, authors, publishers, users, orders)
+and bulk-loads it with COPY, so that benchmarks run against realistic table sizes.
+
+data is deterministic for a given --random-seed: book i always has id book_uuid(i),
+user i always has email user_email(i), so benchmarks address rows without reading them.
+Every user has the same password (BENCH_PASSWORD) hashed once
+
+how to run (postgres from core.config.settings must be up, tables are recreated with --reset):
+    python -m tests.benchmarks.seed_catalogue --reset \
+        --books 1000000 --users 100000 --orders 1000000
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterator
+from uuid import UUID
+
+import asyncpg
+
+from application.models import Base
+from auth.helpers import hash_password
+from core.config import settings
+from infrastructure.postgres import db_client
+
+BENCH_PASSWORD = "benchmark"
+# ids of seeded books are BOOK_ID_BASE + i
+BOOK_ID_BASE = 0xBE7C_0000_0000_4000_8000_0000_0000_0000
+WORDS = (
+    "shadow", "river", "empire", "garden", "winter", "silent", "broken", "golden",
+    "secret", "ocean", "night", "stone", "fire", "glass", "storm", "iron",
+    "forest", "memory", "city", "light", "machine", "kingdom", "mirror", "journey",
+    "letters", "summer", "dragon", "harbor", "atlas", "echo",
+)
+FIRST_NAMES = (
+    "Anna", "Boris", "Clara", "Dmitry", "Elena", "Fedor", "Galina", "Igor", "Kira", "Leon"
+)
+LAST_NAMES = ("Ivanov", "Petrova", "Smirnov", "Orlova", "Volkov", "Sokolova", "Morozov", "Lebedeva")
+CATALOGUE_START = datetime(2023, 1, 1, tzinfo=timezone.utc)
+SEARCH_NAMES_TRIGGER_TABLES = ("authors", "book_category_assoc")
+
+
+def book_uuid(n: int) -> UUID:
+    return UUID(int=BOOK_ID_BASE + n)
+
+
+def user_email(user_id: int) -> str:
+    return f"bench{user_id}@example.com"
+
+
+def book_name(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 4))).capitalize()
+
+
+def timestamp(rng: random.Random) -> datetime:
+    return CATALOGUE_START + timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+
+
+def iter_books(rng: random.Random, books: int) -> Iterator[tuple]:
+    for n in range(books):
+        created_at = timestamp(rng)
+        name = book_name(rng)
+        yield (
+            book_uuid(n), f"978{n:010d}", name, f"{name}. " + " ".join(rng.choices(WORDS, k=20)),
+            round(rng.uniform(100, 5000), 2), rng.randint(1_000, 10_000),
+            round(rng.uniform(1, 5), 1), rng.choice((0, 0, 0, 5, 10, 15, 25)),
+            created_at, created_at,
+        )
+
+
+def iter_categories(categories: int) -> Iterator[tuple]:
+    for category_id in range(1, categories + 1):
+        yield category_id, f"category {category_id}", CATALOGUE_START, CATALOGUE_START
+
+
+def iter_book_categories(rng: random.Random, books: int, categories: int) -> Iterator[tuple]:
+    for n in range(books):
+        k: int = min(rng.randint(1, 3), categories)
+        for category_id in rng.sample(range(1, categories + 1), k=k):
+            yield book_uuid(n), category_id
+
+
+def iter_people(rng: random.Random, books: int) -> Iterator[tuple]:
+    """authors / publishers, one per book"""
+    for n in range(books):
+        yield n + 1, rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), book_uuid(n)
+
+
+def iter_users(rng: random.Random, users: int, hashed_password: str) -> Iterator[tuple]:
+    for user_id in range(1, users + 1):
+        created_at = timestamp(rng)
+        yield (
+            user_id, rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES),
+            rng.choice(("male", "female")), user_email(user_id), hashed_password, "user",
+            date(1960, 1, 1) + timedelta(days=rng.randint(0, 365 * 45)), created_at, created_at,
+        )
+
+
+def iter_orders(rng: random.Random, orders: int, users: int) -> Iterator[tuple]:
+    for order_id in range(1, orders + 1):
+        yield (
+            order_id, rng.randint(1, users), "success", timestamp(rng),
+            round(rng.uniform(100, 20_000), 2)
+        )
+
+
+def iter_order_items(rng: random.Random, orders: int, books: int) -> Iterator[tuple]:
+    for order_id in range(1, orders + 1):
+        for n in rng.sample(range(books), k=min(rng.randint(1, 3), books)):
+            yield order_id, book_uuid(n), rng.randint(1, 3), CATALOGUE_START, CATALOGUE_START
+
+
+# table -> (columns, rows), tables are loaded in this order because of foreign keys
+def catalogue_tables(
+        args: argparse.Namespace,
+        hashed_password: str
+) -> dict[str, tuple[list[str], Iterator]]:
+    rng = random.Random(args.random_seed)
+    return {
+        "books": (
+            ["id", "isbn", "name", "description", "price_per_unit", "number_in_stock",
+             "rating", "discount", "created_at", "updated_at"],
+            iter_books(rng, args.books)
+        ),
+        "categories": (
+            ["id", "name", "created_at", "updated_at"], iter_categories(args.categories)
+        ),
+        "book_category_assoc": (
+            ["book_id", "category_id"], iter_book_categories(rng, args.books, args.categories)
+        ),
+        "authors": (["id", "first_name", "last_name", "book_id"], iter_people(rng, args.books)),
+        "publishers": (["id", "first_name", "last_name", "book_id"], iter_people(rng, args.books)),
+        "users": (
+            ["id", "first_name", "last_name", "gender", "email", "hashed_password",
+             "role_name", "date_of_birth", "created_at", "updated_at"],
+            iter_users(rng, args.users, hashed_password)
+        ),
+        "orders": (
+            ["id", "user_id", "order_status", "order_date", "total_sum"],
+            iter_orders(rng, args.orders, args.users)
+        ),
+        "book_order_assoc": (
+            ["order_id", "book_id", "count_ordered", "created_at", "updated_at"],
+            iter_order_items(rng, args.orders, args.books)
+        ),
+    }
+
+
+async def reset_schema() -> None:
+    async with db_client.engine.begin() as con:
+        await con.run_sync(Base.metadata.drop_all)
+        await con.run_sync(Base.metadata.create_all)
+
+
+async def load(args: argparse.Namespace) -> None:
+    if args.reset:
+        await reset_schema()
+
+    tables = catalogue_tables(args, hash_password(BENCH_PASSWORD))
+    con: asyncpg.Connection = await asyncpg.connect(settings.get_db_url.replace("+asyncpg", ""))
+    try:
+        # triggers would update a book per author / category link,
+        # search names are filled in bulk below
+        for table in SEARCH_NAMES_TRIGGER_TABLES:
+            await con.execute(f"ALTER TABLE {table} DISABLE TRIGGER USER")
+        try:
+            for table, (columns, rows) in tables.items():
+                start = time.perf_counter()
+                status: str = await con.copy_records_to_table(table, records=rows, columns=columns)
+                print(f"{table}: {status.split()[-1]} rows in {time.perf_counter() - start:.1f}s")
+        finally:
+            for table in SEARCH_NAMES_TRIGGER_TABLES:
+                await con.execute(f"ALTER TABLE {table} ENABLE TRIGGER USER")
+
+        start = time.perf_counter()
+        await con.execute("SELECT refresh_book_search_names(ARRAY(SELECT id FROM books))")
+        print(f"books search names: {time.perf_counter() - start:.1f}s")
+
+        # rows are copied with explicit ids, so sequences continue after them
+        for table in ("categories", "authors", "publishers", "users", "orders"):
+            await con.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), GREATEST(MAX(id), 1)) "
+                f"FROM {table}"
+            )
+        await con.execute("ANALYZE")
+    finally:
+        await con.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--books", type=int, default=100_000)
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--random-seed", type=int, default=42)
+    parser.add_argument(
+        "--reset", action="store_true", help="drop and create all tables before loading"
+    )
+    cli_args = parser.parse_args()
+    asyncio.run(load(cli_args))
@@ -0,0 +1,120 @@
+import asyncio
+import threading
+import time
+from uuid import uuid4
+
+import aioredis
+import pytest
+
+from infrastructure.celery.async_runner import AsyncTaskRunner
+from infrastructure.postgres import db_client
+from infrastructure.redis import redis_client
+
+
+@pytest.fixture
+def runner(monkeypatch):
+    async def dispose() -> None:
+        return None  # connections of the test session are opened on another loop
+
+    monkeypatch.setattr(db_client, "dispose", dispose)
+    async_runner = AsyncTaskRunner()
+    yield async_runner
+    async_runner.shutdown()
+
+
+@pytest.fixture
+def runner_redis(monkeypatch):
+    """redis connection created on the loop of the runner, as in a worker process"""
+    redis_con = aioredis.from_url(
+        f"redis://{redis_client.host}:{redis_client.port}", decode_responses=True
+    )
+
+    async def connect() -> aioredis.Redis:
+        return redis_con
+
+    monkeypatch.setattr(redis_client, "connect", connect)
+    return redis_con
+
+
+def test_runs_share_one_loop_and_run_concurrently(runner: AsyncTaskRunner):
+    async def current_loop() -> asyncio.AbstractEventLoop:
+        return asyncio.get_running_loop()
+
+    loop: asyncio.AbstractEventLoop = runner.run(current_loop)
+    assert runner.run(current_loop) is loop  # pools bound to the loop are reused
+    assert loop.is_running()
+
+    async def job() -> None:
+        await asyncio.sleep(0.2)
+
+    started = time.perf_counter()
+    tasks = [threading.Thread(target=runner.run, args=(job, )) for _ in range(3)]  # --pool=threads
+    for task in tasks:
+        task.start()
+    for task in tasks:
+        task.join()
+    assert time.perf_counter() - started < 0.4
+
+    with pytest.raises(asyncio.TimeoutError):
+        runner.run(job, timeout_seconds=0.01)
+    assert runner.run(current_loop) is loop  # the loop survives failed runs
+
+
+def test_exclusive_job_runs_once_until_its_lock_expires(
+        runner: AsyncTaskRunner,
+        runner_redis: aioredis.Redis
+):
+    job_name: str = f"test_{uuid4()}"
+    runs: list[int] = []
+
+    async def job() -> str:
+        runs.append(1)
+        return "done"
+
+    async def failing_job() -> None:
+        raise ValueError("db is down")
+
+    with pytest.raises(ValueError):
+        runner.run_exclusive(job_name, failing_job, lock_timeout_seconds=60)
+    # the failed run released the lock
+    assert runner.run_exclusive(job_name, job, lock_timeout_seconds=60) == "done"
+    # scheduled by another beat
+    assert runner.run_exclusive(job_name, job, lock_timeout_seconds=60) is None
+    assert len(runs) == 1
+
+
+def test_exclusive_job_runs_without_lock_when_redis_is_down(runner: AsyncTaskRunner, monkeypatch):
+    async def connect() -> None:
+        return None
+
+    async def job() -> str:
+        return "done"
+
+    monkeypatch.setattr(redis_client, "connect", connect)
+    assert runner.run_exclusive(f"test_{uuid4()}", job, lock_timeout_seconds=60) == "done"
+
+
+def test_shutdown_disposes_pools_and_stops_the_loop(monkeypatch):
+    runner = AsyncTaskRunner()
+    disposed_on: list[asyncio.AbstractEventLoop] = []
+
+    async def dispose() -> None:
+        disposed_on.append(asyncio.get_running_loop())
+
+    monkeypatch.setattr(db_client, "dispose", dispose)
+    runner.shutdown()  # nothing has been run
+    assert disposed_on == []
+
+    async def current_loop() -> asyncio.AbstractEventLoop:
+        return asyncio.get_running_loop()
+
+    loop: asyncio.AbstractEventLoop = runner.run(current_loop)
+    runner.shutdown()
+
+    assert disposed_on == [loop]  # connections are closed on the loop they were opened on
+    deadline = time.monotonic() + 1
+    while loop.is_running() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not loop.is_running()
+    assert runner.run(current_loop) is not loop  # the next run starts a new loop
+    runner.shutdown()
@@ -0,0 +1,171 @@
+import asyncio
+import time
+from uuid import uuid4
+
+import pytest
+
+from core.utils.cache import CacheEngine, LocalCache, cache_engine
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_value_loaded_before_invalidation_is_not_stored():
+    key, tag = f"cache:test:{uuid4()}", f"books:{uuid4()}"
+    row_read = asyncio.Event()
+
+    async def loader() -> bytes:
+        await row_read.wait()
+        return b"old"  # read before the write was committed
+
+    load = asyncio.create_task(cache_engine.get_or_load(key=key, loader=loader, ttl=60, tags=[tag]))
+    await asyncio.sleep(0.05)
+    await cache_engine.invalidate_tags(tag)  # write is committed
+    row_read.set()
+
+    assert await load == b"old"
+    assert await cache_engine.get(key) is None
+
+    async def fresh_loader() -> bytes:
+        return b"new"
+
+    value: bytes = await cache_engine.get_or_load(key=key, loader=fresh_loader, ttl=60, tags=[tag])
+    assert value == b"new"
+    assert await cache_engine.get(key) == b"new"
+    await cache_engine.invalidate_tags(tag)
+    assert await cache_engine.get(key) is None
+
+
+class NoRedis:
+    """cache engine works with the in-process tier only"""
+
+    async def connect(self) -> None:
+        return None
+
+
+def in_process_cache_engine(local_cache: LocalCache = None) -> CacheEngine:
+    return CacheEngine(
+        redis_connector=NoRedis(),
+        local_cache=local_cache or LocalCache(max_entries=100, max_bytes=10 ** 6),
+        local_ttl_seconds=60,
+        invalidation_channel="cache:test:invalidation",
+        tag_ttl_seconds=60,
+        lock_timeout_seconds=1
+    )
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_concurrent_misses_call_loader_once():
+    engine: CacheEngine = in_process_cache_engine()
+    calls: list[int] = []
+
+    async def loader() -> bytes:
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return b"value"
+
+    values = await asyncio.gather(
+        *(engine.get_or_load(key="key", loader=loader, ttl=60) for _ in range(10))
+    )
+
+    assert values == [b"value"] * 10
+    assert len(calls) == 1
+    assert engine.stats["coalesced"] == 9
+    # served from the cache
+    assert await engine.get_or_load(key="key", loader=loader, ttl=60) == b"value"
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_loader_error_reaches_every_waiter():
+    engine: CacheEngine = in_process_cache_engine()
+    calls: list[int] = []
+
+    async def loader() -> bytes:
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        raise ValueError("db is down")
+
+    results = await asyncio.gather(
+        *(engine.get_or_load(key="key", loader=loader, ttl=60) for _ in range(5)),
+        return_exceptions=True
+    )
+
+    assert len(calls) == 1
+    assert all(isinstance(result, ValueError) for result in results)
+    assert await engine.get("key") is None
+
+    async def fixed_loader() -> bytes:
+        return b"value"
+
+    # failed load isn't remembered, the next miss loads again
+    assert await engine.get_or_load(key="key", loader=fixed_loader, ttl=60) == b"value"
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_coalesced_load_isnt_stored_after_invalidation():
+    engine: CacheEngine = in_process_cache_engine()
+    row_read = asyncio.Event()
+
+    async def loader() -> bytes:
+        await row_read.wait()
+        return b"old"
+
+    loads = asyncio.gather(
+        *(engine.get_or_load(key="key", loader=loader, ttl=60, tags=["books:1"]) for _ in range(3))
+    )
+    await asyncio.sleep(0.05)
+    await engine.invalidate_tags("books:1")
+    row_read.set()
+
+    assert await loads == [b"old"] * 3
+    assert await engine.get("key") is None
+    assert engine.stats["stale_loads"] == 1
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_entry_close_to_expiry_is_refreshed_early(monkeypatch):
+    key, load_group = f"cache:test:{uuid4()}", f"test_early_refresh_{uuid4()}"
+
+    async def old_loader() -> bytes:
+        return b"old"
+
+    async def new_loader() -> bytes:
+        return b"new"
+
+    async def read() -> bytes:
+        return await cache_engine.get_or_load(
+            key=key, loader=new_loader, ttl=30, load_group=load_group
+        )
+
+    await cache_engine.get_or_load(key=key, loader=old_loader, ttl=30, load_group=load_group)
+    cache_engine._local.delete(key)  # ttl left is known for values read from redis
+    monkeypatch.setattr("core.utils.cache.engine.random.random", lambda: 0.5)
+
+    cache_engine._load_seconds[load_group] = 0.001  # far from expiry compared to the load time
+    assert await read() == b"old"
+
+    cache_engine._local.delete(key)
+    cache_engine._load_seconds[load_group] = 100.0  # loading takes longer than the entry has left
+    assert await read() == b"new"
+    assert await cache_engine.get(key) == b"new"
+
+
+def test_local_cache_evicts_least_recently_used_entries():
+    local_cache = LocalCache(max_entries=3, max_bytes=100)
+    for key in ("a", "b", "c"):
+        local_cache.set(key, b"12345", ttl=60)
+    assert local_cache.get("a") == b"12345"  # "b" is the least recently used now
+
+    local_cache.set("d", b"12345", ttl=60)
+    assert len(local_cache) == 3
+    assert local_cache.get("b") is None
+    assert all(local_cache.get(key) for key in ("a", "c", "d"))
+
+    local_cache.set("big", b"x" * 80, ttl=60)  # bytes are bounded as well
+    assert local_cache.size_bytes <= 100
+    assert local_cache.get("big") is not None
+    local_cache.set("too big", b"x" * 200, ttl=60)
+    assert local_cache.get("too big") is None
+
+    local_cache.set("expired", b"1", ttl=0.01)
+    time.sleep(0.02)
+    assert local_cache.get("expired") is None
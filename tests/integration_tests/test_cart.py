@@ -1,8 +1,11 @@
-from uuid import UUID
+from datetime import datetime, timedelta, timezone
+from uuid import UUID, uuid4
 
 import pytest
+from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from application.models import Book, CartItem, Order, PaymentDetail, ShoppingSession, User
 from application.repositories.image_repo import ImageRepository
 from application.repositories.cart_repo import CartRepository
 from application.repositories.shopping_session_repo import ShoppingSessionRepository
@@ -13,10 +16,14 @@ from application.repositories.cart_repo import CombinedCartRepositoryInterface
 from application.schemas import AddBookToCartS, ReturnCartS, ReturnBookS, DeleteBookFromCartS
 from application.schemas.order_schemas import AssocBookS
 from application.services import CartService, BookService, ShoppingSessionService, UserService
+from application.services.cart_service import (
+    cart_assembler, cart_snapshot_key, deserialize_cart, serialize_cart
+)
 from application.services.storage.internal_storage.image_manager import ImageManager
 from core.base_repos.unit_of_work import SqlAlchemyUnitOfWork
 from core.exceptions import BadRequest, EntityDoesNotExist
 from infrastructure.postgres.app import db_client
+from infrastructure.redis import redis_client
 from application.services.storage.internal_storage.internal_storage_service import InternalStorageService
 
 
@@ -342,14 +349,83 @@ async def test_delete_book_that_not_in_cart(
         assert "Book (in a cart) does not exist" in str(excinfo.value)
 
 
+@pytest.mark.asyncio(scope="session")
+async def test_delete_cart_returns_books_to_stock(
+        cart_service: CartService,
+        session: AsyncSession,
+):
+    book_id = UUID("d2bafd10-4192-4930-aa40-9bcf4b39a848")
+    number_in_stock = select(Book.number_in_stock).where(Book.id == book_id)
+    shopping_session_id: UUID = uuid4()
+    session.add(ShoppingSession(
+        id=shopping_session_id,
+        expiration_time=datetime.now(timezone.utc) + timedelta(days=1)
+    ))
+    await session.commit()
+    in_stock: int = await session.scalar(number_in_stock)
+
+    await cart_service.add_book_to_cart(
+        session=session,
+        shopping_session_id=shopping_session_id,
+        dto=AddBookToCartS(book_id=book_id, quantity=2)
+    )
+    assert await session.scalar(number_in_stock) == in_stock - 2
+
+    await cart_service.delete_cart(session=session, cart_session_id=shopping_session_id)
+
+    assert await session.scalar(number_in_stock) == in_stock
+    assert await session.scalar(
+        select(ShoppingSession.id).where(ShoppingSession.id == shopping_session_id)
+    ) is None
+    with pytest.raises(EntityDoesNotExist):
+        await cart_service.delete_cart(session=session, cart_session_id=shopping_session_id)
+
+
 @pytest.mark.asyncio(scope="session")
 async def test_delete_expired_carts(
         cart_service: CartService,
         session: AsyncSession,
 ):
     cart_repo: CombinedCartRepositoryInterface = cart_service._cart_repo
-
-    await cart_repo.delete_expired_carts()
+    book_id = UUID("20aaefdc-ab3b-4074-af87-dc26a36bb6a0")  # 1 in the expired cart fcc5b6ea
+    number_in_stock = select(Book.number_in_stock).where(Book.id == book_id)
+    now: datetime = datetime.now(timezone.utc)
+
+    empty_session_id, abandoned_session_id, payment_id = uuid4(), uuid4(), uuid4()
+    session.add_all([
+        ShoppingSession(id=empty_session_id, expiration_time=now - timedelta(hours=1)),
+        # the user has paid for another order after the cart was created,
+        # the cart is still abandoned
+        User(
+            id=1000, first_name="Paid", last_name="Before", gender="male",
+            email="paid_before@gmail.com", hashed_password="-"
+        ),
+        ShoppingSession(
+            id=abandoned_session_id, user_id=1000,
+            created_at=now - timedelta(days=2), expiration_time=now - timedelta(hours=1)
+        ),
+        PaymentDetail(
+            id=payment_id, status="success", amount=300, created_at=now - timedelta(days=1)
+        ),
+    ])
+    await session.flush()
+    session.add_all([
+        CartItem(session_id=abandoned_session_id, book_id=book_id, quantity=3),
+        Order(user_id=1000, order_status="success", payment_id=payment_id, total_sum=300),
+    ])
+    await session.commit()
+    in_stock: int = await session.scalar(number_in_stock)
+
+    report: dict = await cart_repo.delete_expired_carts()
+
+    assert report["deleted_sessions"] == 3
+    assert report["released_books"] == 1  # both carts hold the same book
+    assert await session.scalar(number_in_stock) == in_stock + 1 + 3
+    assert await session.scalar(
+        select(func.count()).select_from(ShoppingSession).where(
+            ShoppingSession.id.in_([empty_session_id, abandoned_session_id])
+        )
+    ) == 0
 
     with pytest.raises(EntityDoesNotExist) as excinfo:
         await cart_service.get_cart_by_session_id(
@@ -357,3 +433,118 @@ async def test_delete_expired_carts(
             shopping_session_id=UUID("fcc5b6ea-dd92-4b89-9ad6-1d9700b970bc")
         )
     assert "Cart does not exist" in str(excinfo.value)
+
+
+async def create_shopping_session(session: AsyncSession) -> UUID:
+    shopping_session_id: UUID = uuid4()
+    session.add(ShoppingSession(
+        id=shopping_session_id,
+        expiration_time=datetime.now(timezone.utc) + timedelta(days=1)
+    ))
+    await session.commit()
+    return shopping_session_id
+
+
+async def cached_cart(shopping_session_id: UUID) -> ReturnCartS | None:
+    redis_con = await redis_client.connect()
+    snapshot: str | None = await redis_con.get(cart_snapshot_key(shopping_session_id))
+    return deserialize_cart(snapshot) if snapshot else None
+
+
+async def cart_in_db(
+        cart_service: CartService,
+        session: AsyncSession,
+        shopping_session_id: UUID
+) -> ReturnCartS:
+    session.expire_all()
+    cart_items: list[CartItem] = await cart_service._cart_repo.get_cart_by_session_id(
+        session=session,
+        cart_session_id=shopping_session_id
+    )  # bypasses the cache
+    return cart_assembler(cart_items)
+
+
+def books_of(cart: ReturnCartS) -> list[AssocBookS]:
+    return sorted(cart.books, key=lambda book: book.book_id)
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_cached_cart_follows_changes_of_cart_items(
+        cart_service: CartService,
+        session: AsyncSession,
+):
+    first_book = UUID("20aaefdc-ab3b-4074-af87-dc26a36bb6a0")
+    second_book = UUID("fb39af9d-292e-4eb0-989c-9e5aa195a4a0")
+    shopping_session_id: UUID = await create_shopping_session(session)
+
+    def add(book_id: UUID, quantity: int):
+        return cart_service.add_book_to_cart(
+            session=session,
+            shopping_session_id=shopping_session_id,
+            dto=AddBookToCartS(book_id=book_id, quantity=quantity)
+        )
+
+    changes = [
+        add(first_book, 1),  # the cart isn't cached yet, it is loaded from the db
+        add(second_book, 2),  # new item
+        add(first_book, 2),  # updated item
+        cart_service.delete_book_from_cart(
+            session=session,
+            shopping_session_id=shopping_session_id,
+            deletion_data=DeleteBookFromCartS(book_id=second_book, quantity=2)
+        ),  # deleted item
+    ]
+    for change in changes:
+        returned_cart: ReturnCartS = await change
+        cart: ReturnCartS = await cart_in_db(cart_service, session, shopping_session_id)
+
+        assert books_of(await cached_cart(shopping_session_id)) == books_of(cart)
+        assert books_of(returned_cart) == books_of(cart)
+
+    assert [(book.book_id, book.count_ordered) for book in cart.books] == [(first_book, 3)]
+    await cart_service.delete_cart(session=session, cart_session_id=shopping_session_id)
+    assert await cached_cart(shopping_session_id) is None
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_cached_cart_changed_concurrently_is_reloaded_from_db(
+        cart_service: CartService,
+        session: AsyncSession,
+        monkeypatch
+):
+    book_id = UUID("20aaefdc-ab3b-4074-af87-dc26a36bb6a0")
+    shopping_session_id: UUID = await create_shopping_session(session)
+    dto = AddBookToCartS(book_id=book_id, quantity=1)
+    await cart_service.add_book_to_cart(
+        session=session, shopping_session_id=shopping_session_id, dto=dto
+    )
+    redis_con = await redis_client.connect()
+    stale_cart: ReturnCartS = await cached_cart(shopping_session_id)
+    stale_cart.books[0].count_ordered = 100
+    pipeline = redis_con.pipeline
+
+    def pipeline_with_concurrent_change(*args, **kwargs):
+        pipe = pipeline(*args, **kwargs)
+        get = pipe.get
+
+        async def get_then_change(name: str):
+            snapshot = await get(name)
+            # another request writes the cart after the GET
+            await redis_con.set(name, serialize_cart(stale_cart))
+            return snapshot
+
+        pipe.get = get_then_change
+        return pipe
+
+    monkeypatch.setattr(redis_con, "pipeline", pipeline_with_concurrent_change)
+    returned_cart: ReturnCartS = await cart_service.add_book_to_cart(
+        session=session, shopping_session_id=shopping_session_id, dto=dto
+    )
+    monkeypatch.undo()
+
+    cart: ReturnCartS = await cart_in_db(cart_service, session, shopping_session_id)
+    assert cart.books[0].count_ordered == 2
+    assert returned_cart == cart  # neither change is merged into the other, the cart is reloaded
+    assert await cached_cart(shopping_session_id) == cart
+
+    await cart_service.delete_cart(session=session, cart_session_id=shopping_session_id)
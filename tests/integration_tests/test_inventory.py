@@ -0,0 +1,61 @@
+from uuid import UUID, uuid4
+
+import pytest
+from sqlalchemy import select
+
+from application.models import Book
+from application.repositories.book_repo import BookRepository
+from infrastructure.postgres.app import db_client
+
+BOOK_ID = UUID("fb39af9d-292e-4eb0-989c-9e5aa195a4a0")
+
+
+async def get_number_in_stock(book_id: UUID) -> int:
+    async with db_client.async_session() as session:
+        return await session.scalar(select(Book.number_in_stock).where(Book.id == book_id))
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_failed_reservation_does_not_change_stock():
+    in_stock: int = await get_number_in_stock(BOOK_ID)
+
+    async with db_client.async_session() as session:
+        number_in_stock = await BookRepository().reserve_stock(
+            session=session, book_id=BOOK_ID, quantity=in_stock + 1
+        )
+        await session.commit()
+
+    assert number_in_stock is None
+    assert await get_number_in_stock(BOOK_ID) == in_stock
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_reserve_and_release_stock():
+    repo = BookRepository()
+    in_stock: int = await get_number_in_stock(BOOK_ID)
+
+    async with db_client.async_session() as session:
+        book: Book = (await session.scalars(select(Book).where(Book.id == BOOK_ID))).one()
+
+        assert await repo.reserve_stock(session=session, book_id=BOOK_ID, quantity=in_stock) == 0
+        assert book.number_in_stock == 0  # loaded book follows the update
+        assert await repo.reserve_stock(session=session, book_id=BOOK_ID, quantity=1) is None
+        await session.commit()
+    assert await get_number_in_stock(BOOK_ID) == 0
+
+    async with db_client.async_session() as session:
+        number_in_stock = await repo.release_stock(
+            session=session, book_id=BOOK_ID, quantity=in_stock
+        )
+        assert number_in_stock == in_stock
+        await session.commit()
+    assert await get_number_in_stock(BOOK_ID) == in_stock
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_release_stock_of_missing_book():
+    async with db_client.async_session() as session:
+        number_in_stock = await BookRepository().release_stock(
+            session=session, book_id=uuid4(), quantity=1
+        )
+        assert number_in_stock is None
@@ -0,0 +1,95 @@
+import json
+import logging
+import queue
+import sys
+
+from logger.logg import NonBlockingQueueHandler, SamplingFilter, logging_stats, logs_file_formatter
+
+
+def make_record(
+        level: int = logging.INFO, module: str = "cart_service", name: str = "app", **extra
+) -> logging.LogRecord:
+    record = logging.LogRecord(
+        name=name, level=level, pathname=f"/app/{module}.py", lineno=1,
+        msg="%s items", args=(3,), exc_info=None
+    )
+    record.__dict__.update(extra)
+    return record
+
+
+def test_sampling_filter_passes_records_at_the_configured_rate(monkeypatch):
+    sampling = SamplingFilter(rates="cart_service=0.5,orm_entity_repo=0", default_rate=1.0)
+    sampled_out: int = logging_stats["sampled_out"]
+
+    monkeypatch.setattr("logger.logg.random.random", lambda: 0.4)
+    assert sampling.filter(make_record())
+    monkeypatch.setattr("logger.logg.random.random", lambda: 0.6)
+    assert not sampling.filter(make_record())
+    assert not sampling.filter(make_record(module="orm_entity_repo"))
+    assert logging_stats["sampled_out"] == sampled_out + 2
+
+    # warnings are never sampled, modules without a rate use the default one
+    assert sampling.filter(make_record(level=logging.WARNING, module="orm_entity_repo"))
+    assert sampling.filter(make_record(module="book_service"))
+    assert logging_stats["sampled_out"] == sampled_out + 2
+
+
+def test_sampling_rate_can_be_set_by_logger_name(monkeypatch):
+    monkeypatch.setattr("logger.logg.random.random", lambda: 0.5)
+    sampling = SamplingFilter(rates="sqlalchemy.engine=0.1")
+    assert not sampling.filter(make_record(module="base", name="sqlalchemy.engine"))
+    assert sampling.filter(make_record(module="base", name="uvicorn"))
+
+
+def test_records_are_dropped_and_counted_when_the_queue_is_full():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=2))
+    queued, dropped = logging_stats["queued"], logging_stats["dropped"]
+
+    for _ in range(3):
+        handler.handle(make_record())  # never blocks
+
+    assert handler.queue.qsize() == 2
+    assert logging_stats["queued"] == queued + 2
+    assert logging_stats["dropped"] == dropped + 1
+
+
+def test_queued_record_keeps_message_extras_and_traceback():
+    handler = NonBlockingQueueHandler(queue.Queue())
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = make_record(level=logging.ERROR, line=b"not json")
+        record.exc_info = sys.exc_info()
+    handler.handle(record)
+
+    queued: logging.LogRecord = handler.queue.get_nowait()
+    assert queued.getMessage() == "3 items"
+    assert queued.exc_info is None and "ValueError: boom" in queued.exc_text
+
+    formatted: dict = json.loads(logs_file_formatter.format(queued))
+    assert formatted["message"] == "3 items"
+    assert formatted["line"]  # bytes in extra are serialized too
+    assert "ValueError: boom" in formatted["exc_info"]
+
+
+def test_extras_are_detached_before_the_record_is_queued():
+    class Entity:
+        def __init__(self):
+            self.name = "before"
+
+        def __repr__(self) -> str:
+            return f"<Entity {self.name}>"
+
+    handler = NonBlockingQueueHandler(queue.Queue())
+    entity, ids = Entity(), [1, 2]
+    handler.handle(make_record(books=[entity], book=entity, ids=ids, count=2, query={"limit": 10}))
+    # changed (or expired by its session) before the listener formats the record
+    entity.name = "after"
+    ids.append(3)
+
+    queued: logging.LogRecord = handler.queue.get_nowait()
+    assert queued.books == ["<Entity before>"] and queued.book == "<Entity before>"
+    assert queued.ids == [1, 2]
+    assert queued.count == 2 and queued.query == {"limit": 10}
+    # attributes of the record stay
+    assert queued.module == "cart_service" and queued.levelno == logging.INFO
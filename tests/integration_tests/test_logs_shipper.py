@@ -0,0 +1,109 @@
+import json
+import os
+
+from application.tasks.task_helpers.logs_shipper import (
+    LogsBatch, JournalCheckpoint, checkpoint_path, iter_batches, read_checkpoint, ship_logs_journal
+)
+
+
+def log_line(message: str) -> bytes:
+    record: dict = {"timestamp": "2024-05-01T10:00:00.000Z", "message": message}
+    return json.dumps(record).encode() + b"\n"
+
+
+def write_journal(path: str, *lines: bytes) -> None:
+    with open(path, "ab") as f:
+        f.writelines(lines)
+
+
+class Broker:
+    def __init__(self, confirms: bool = True):
+        self.confirms = confirms
+        self.batches: list[LogsBatch] = []
+
+    def publish(self, batch: LogsBatch) -> bool:
+        self.batches.append(batch)
+        return self.confirms
+
+    @property
+    def messages(self) -> list[str]:
+        return [record["message"] for batch in self.batches for record in batch.records]
+
+
+def ship(journal: str, broker: Broker, max_bytes: int = 10 ** 6) -> int:
+    return ship_logs_journal(
+        broker.publish, journal_path=journal, max_bytes=max_bytes, backup_count=2
+    )
+
+
+def test_only_new_complete_lines_are_shipped(tmp_path):
+    journal = str(tmp_path / "logs.json")
+    broker = Broker()
+    write_journal(journal, log_line("first"), log_line("second"))
+    assert ship(journal, broker) == 2
+
+    # the last line is being written
+    write_journal(journal, log_line("third"), log_line("fourth")[:10])
+    assert ship(journal, broker) == 1
+    shipped_bytes = len(log_line("first") + log_line("second") + log_line("third"))
+    assert read_checkpoint(checkpoint_path(journal)).offset == shipped_bytes
+
+    write_journal(journal, log_line("fourth")[10:])
+    assert ship(journal, broker) == 1
+    assert ship(journal, broker) == 0
+    assert broker.messages == ["first", "second", "third", "fourth"]
+
+
+def test_unconfirmed_batch_is_resent_with_the_same_id(tmp_path):
+    journal = str(tmp_path / "logs.json")
+    write_journal(journal, log_line("first"))
+
+    failing_broker = Broker(confirms=False)
+    assert ship(journal, failing_broker) == 0
+    assert read_checkpoint(checkpoint_path(journal)) is None
+
+    broker = Broker()
+    assert ship(journal, broker) == 1
+    assert broker.messages == ["first"]
+    assert broker.batches[0].message_id == failing_broker.batches[0].message_id
+
+
+def test_rest_of_rotated_journal_is_shipped_before_the_new_one(tmp_path):
+    journal = str(tmp_path / "logs.json")
+    broker = Broker()
+    write_journal(journal, log_line("first"))
+    assert ship(journal, broker, max_bytes=1) == 1
+    assert not os.path.exists(journal) and os.path.exists(f"{journal}.1")
+
+    # written before the writer reopened the journal
+    write_journal(f"{journal}.1", log_line("late"))
+    write_journal(journal, log_line("second"))
+    assert ship(journal, broker) == 2
+    assert broker.messages == ["first", "late", "second"]
+    assert read_checkpoint(checkpoint_path(journal)).inode == os.stat(journal).st_ino
+
+
+def test_truncated_journal_is_shipped_from_the_start(tmp_path):
+    journal = str(tmp_path / "logs.json")
+    broker = Broker()
+    write_journal(journal, log_line("first"), log_line("second"))
+    assert ship(journal, broker) == 2
+
+    with open(journal, "wb") as f:
+        f.write(log_line("new"))
+    assert ship(journal, broker) == 1
+    assert broker.messages[-1] == "new"
+
+
+def test_batches_are_bounded_and_skip_malformed_lines(tmp_path):
+    journal = str(tmp_path / "logs.json")
+    write_journal(journal, log_line("first"), b"not json\n", log_line("second"), log_line("third"))
+
+    batches: list[LogsBatch] = list(iter_batches(journal, checkpoint=None, max_lines=2))
+    messages: list[list[str]] = [
+        [record["message"] for record in batch.records] for batch in batches
+    ]
+    assert messages == [["first", "second"], ["third"]]
+    assert all("unix_time" in record for batch in batches for record in batch.records)
+    assert batches[0].end == batches[1].start
+    assert batches[1].end == JournalCheckpoint(os.stat(journal).st_ino, os.path.getsize(journal))
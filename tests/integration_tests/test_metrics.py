@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+
+from infrastructure.metrics import (
+    Counter, Histogram, MetricsRegistry, instrument_redis, request_metrics_scope
+)
+from infrastructure.metrics.instrumentation import (
+    BACKGROUND_ROUTE, record_sql, sql_statement_seconds
+)
+from infrastructure.postgres.app import db_client
+
+
+class FakeRedis:
+    def __init__(self):
+        self.commands: list[tuple] = []
+
+    async def execute_command(self, *args, **options):
+        self.commands.append(args)
+        return "OK"
+
+    def pipeline(self, transaction: bool = True):
+        redis = self
+
+        class Pipeline:
+            async def execute(self):
+                redis.commands.append(("MULTI",))
+                return []
+
+        return Pipeline()
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_sql_statements_are_counted_per_request():
+    background: int = sql_statement_seconds.count(route=BACKGROUND_ROUTE)
+
+    with request_metrics_scope("/v1/test") as request_metrics:
+        async with db_client.async_session() as session:
+            await session.execute(text("SELECT 1"))
+            await session.execute(text("SELECT 2"))
+
+    assert request_metrics.sql_statements == 2
+    assert request_metrics.sql_seconds > 0
+    assert sql_statement_seconds.count(route="/v1/test") == 2
+
+    async with db_client.async_session() as session:
+        await session.execute(text("SELECT 1"))  # outside of requests
+    assert request_metrics.sql_statements == 2
+    assert sql_statement_seconds.count(route=BACKGROUND_ROUTE) == background + 1
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_redis_pipeline_is_counted_as_one_round_trip():
+    redis_con = instrument_redis(FakeRedis())
+
+    with request_metrics_scope("/v1/test") as request_metrics:
+        await redis_con.execute_command("GET", "key")
+        pipe = redis_con.pipeline()
+        await pipe.execute()
+
+    assert request_metrics.redis_commands == 2
+    assert redis_con.commands == [("GET", "key"), ("MULTI",)]
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_tasks_spawned_by_request_share_its_metrics():
+    async def query() -> None:
+        record_sql(0.01)
+
+    with request_metrics_scope("/v1/test") as request_metrics:
+        await asyncio.gather(query(), query(), query())
+
+    assert request_metrics.sql_statements == 3
+    assert request_metrics.sql_seconds == pytest.approx(0.03)
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    requests: Counter = registry.counter("requests_total", "Requests", ("route",))
+    duration: Histogram = registry.histogram("duration_seconds", "Duration", buckets=(0.1, 1.0))
+    requests.inc(route='/v1/"books"')
+    duration.observe(0.05)
+    duration.observe(2)
+
+    assert registry.render().splitlines() == [
+        "# HELP requests_total Requests",
+        "# TYPE requests_total counter",
+        'requests_total{route="/v1/\\"books\\""} 1',
+        "# HELP duration_seconds Duration",
+        "# TYPE duration_seconds histogram",
+        'duration_seconds_bucket{le="0.1"} 1',
+        'duration_seconds_bucket{le="1"} 1',
+        'duration_seconds_bucket{le="+Inf"} 2',
+        "duration_seconds_sum 2.05",
+        "duration_seconds_count 2",
+    ]
+    with pytest.raises(ValueError):
+        registry.counter("requests_total", "Requests")
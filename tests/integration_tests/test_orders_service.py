@@ -2,8 +2,11 @@ import uuid
 from uuid import UUID
 
 import pytest
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from application.models import Book, BookOrderAssoc
+
 from application.repositories.book_repo import BookRepository
 from application.repositories.image_repo import ImageRepository
 from application.repositories.cart_repo import CartRepository
@@ -12,13 +15,13 @@ from application.repositories.user_repo import UserRepository
 from application.repositories.order_repo import OrderRepository
 from application.repositories.payment_detail_repo import PaymentDetailRepository
 from application.repositories.book_order_assoc_repo import BookOrderAssocRepository
-from application.schemas import ReturnOrderS
+from application.schemas import ReturnOrderS, AddBookToOrderS
 from application.schemas.domain_model_schemas import PaymentDetailS, OrderS
 from application.services import BookService, ShoppingSessionService, UserService, OrderService, CartService, \
     PaymentService
 from application.services.storage.internal_storage.image_manager import ImageManager
 from core.base_repos.unit_of_work import SqlAlchemyUnitOfWork
-from core.exceptions import PaymentFailedError
+from core.exceptions import PaymentFailedError, EntityDoesNotExist
 from infrastructure.payment.yookassa.app import YooKassaPaymentProvider
 from infrastructure.postgres.app import db_client
 from application.services.storage.internal_storage.internal_storage_service import InternalStorageService
@@ -170,6 +173,12 @@ async def test_perform_order(
 
     assert len(book_ids) == 1 and UUID("20aaefdc-ab3b-4074-af87-dc26a36bb6a0") in book_ids
 
+    with pytest.raises(EntityDoesNotExist):  # the cart is deleted together with filling the order
+        await order_service._cart_service.get_cart_by_session_id(
+            session=session,
+            shopping_session_id=UUID("01e1ca73-5dea-46f2-a19b-56b5a7804efc")
+        )
+
 
 @pytest.mark.asyncio
 async def test_perform_order_with_failed_payment(
@@ -208,3 +217,44 @@ async def test_perform_order_with_failed_payment(
     )
 
     assert payment.status == "failed"
+
+
+@pytest.mark.asyncio
+async def test_delete_book_from_order_returns_books_to_stock(order_service: OrderService):
+    book_id, order_id = UUID("ecd38a11-3bbd-4bba-b596-3e2d554796a7"), 2
+    number_in_stock = select(Book.number_in_stock).where(Book.id == book_id)
+
+    async with db_client.async_session() as session:
+        count_ordered: int = await session.scalar(
+            select(BookOrderAssoc.count_ordered).where(
+                BookOrderAssoc.order_id == order_id, BookOrderAssoc.book_id == book_id
+            )
+        )
+        in_stock: int = await session.scalar(number_in_stock)
+
+        order: ReturnOrderS = await order_service.delete_book_from_order(
+            session=session, book_id=book_id, order_id=order_id
+        )
+
+    assert all(book.book_id != book_id for book in order.books)
+    async with db_client.async_session() as session:
+        assert await session.scalar(number_in_stock) == in_stock + count_ordered
+
+
+@pytest.mark.asyncio
+async def test_add_book_that_is_not_in_order_yet(order_service: OrderService):
+    book_id, order_id = UUID("d2bafd10-4192-4930-aa40-9bcf4b39a848"), 2
+    number_in_stock = select(Book.number_in_stock).where(Book.id == book_id)
+
+    async with db_client.async_session() as session:
+        in_stock: int = await session.scalar(number_in_stock)
+
+        order: ReturnOrderS = await order_service.add_book_to_order(
+            order_id=order_id,
+            session=session,
+            dto=AddBookToOrderS(book_id=book_id, count_ordered=3)
+        )
+
+    assert [book.count_ordered for book in order.books if book.book_id == book_id] == [3]
+    async with db_client.async_session() as session:
+        assert await session.scalar(number_in_stock) == in_stock - 3
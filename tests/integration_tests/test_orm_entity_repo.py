@@ -0,0 +1,114 @@
+from uuid import UUID
+
+import pytest
+from sqlalchemy import event, select, func
+
+from application.models import Author, Category
+from application.models.models import book_category_assoc
+from application.repositories.author_repo import AuthorRepository
+from application.repositories.category_repo import CategoryRepository
+from application.schemas.domain_model_schemas import CategoryS
+from core.exceptions import NotFoundError
+from infrastructure.postgres.app import db_client
+
+BOOK_ID = UUID("20aaefdc-ab3b-4074-af87-dc26a36bb6a0")
+MISSING_ID = 10 ** 6
+
+
+class StatementsCapture:
+    def __init__(self):
+        self.statements: list[str] = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        self.statements.append(statement.lstrip().split()[0].upper())
+
+    def __enter__(self) -> "StatementsCapture":
+        event.listen(db_client.engine.sync_engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        event.remove(db_client.engine.sync_engine, "before_cursor_execute", self)
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_update_returns_updated_row_in_one_statement():
+    category_repo = CategoryRepository()
+    async with db_client.async_session() as session:
+        category_id = await category_repo.create(
+            session=session, domain_model=CategoryS(id=None, name="Returning")
+        )
+
+        with StatementsCapture() as capture:
+            category: Category = await category_repo.update(
+                domain_model=CategoryS(id=None, name="Returning updated"),
+                instance_id=category_id,
+                session=session
+            )
+
+        assert capture.statements == ["UPDATE"]  # no SELECT before or after the UPDATE
+        assert category.id == category_id and category.name == "Returning updated"
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_update_of_missing_entity_raises_not_found():
+    async with db_client.async_session() as session:
+        with pytest.raises(NotFoundError) as excinfo:
+            await CategoryRepository().update(
+                domain_model=CategoryS(id=None, name="Never stored"),
+                instance_id=MISSING_ID,
+                session=session
+            )
+        assert excinfo.value.entity == "Category"
+
+        with pytest.raises(NotFoundError):  # nothing to update
+            await CategoryRepository().update(
+                domain_model=CategoryS.model_construct(), instance_id=MISSING_ID, session=session
+            )
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_entity_without_orm_cascades_is_deleted_in_one_statement():
+    author_repo = AuthorRepository()
+    assert not author_repo._has_orm_cascades()
+    async with db_client.async_session() as session:
+        author = Author(first_name="Bulk", last_name="Deleted", book_id=str(BOOK_ID))
+        session.add(author)
+        await session.commit()
+        author_id: int = author.id
+
+        with StatementsCapture() as capture:
+            await author_repo.delete(session=session, instance_id=author_id)
+        await author_repo.commit(session)
+
+        assert capture.statements == ["DELETE"]  # the author isn't loaded first
+        assert await session.scalar(select(Author.id).where(Author.id == author_id)) is None
+
+        with pytest.raises(NotFoundError):
+            await author_repo.delete(session=session, instance_id=author_id)
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_entity_with_orm_cascades_is_deleted_by_the_orm():
+    category_repo = CategoryRepository()
+    assert category_repo._has_orm_cascades()  # books are linked through the secondary table
+    async with db_client.async_session() as session:
+        category_id = await category_repo.create(
+            session=session, domain_model=CategoryS(id=None, name="Cascaded")
+        )
+        await session.execute(
+            book_category_assoc.insert().values(book_id=BOOK_ID, category_id=category_id)
+        )
+        await session.commit()
+
+        await category_repo.delete(session=session, instance_id=category_id)
+        await category_repo.commit(session)
+
+        assert await session.scalar(select(Category.id).where(Category.id == category_id)) is None
+        assert await session.scalar(
+            select(func.count()).select_from(book_category_assoc).where(
+                book_category_assoc.c.category_id == category_id
+            )
+        ) == 0  # rows of the secondary table are removed as well
+
+        with pytest.raises(NotFoundError):
+            await category_repo.delete(session=session, instance_id=category_id)
@@ -0,0 +1,74 @@
+import asyncio
+import time
+
+import pytest
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.util import greenlet_spawn
+
+from infrastructure.postgres.app import db_client
+from infrastructure.postgres.pool import InstrumentedAsyncQueuePool
+
+CONNECT_SECONDS = 0.2
+
+
+class StubConnection:
+    """dbapi connection, the pool only rolls it back and closes it"""
+
+    def rollback(self) -> None:
+        return None
+
+    def close(self) -> None:
+        return None
+
+
+def slow_connect() -> StubConnection:
+    time.sleep(CONNECT_SECONDS)
+    return StubConnection()
+
+
+def single_connection_pool() -> InstrumentedAsyncQueuePool:
+    return InstrumentedAsyncQueuePool(slow_connect, pool_size=1, max_overflow=0, timeout=0.3)
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_checkout_wait_doesnt_include_connect_time():
+    pool = single_connection_pool()
+
+    connection = await greenlet_spawn(pool.connect)  # opens a new connection
+    await greenlet_spawn(connection.close)
+    connection = await greenlet_spawn(pool.connect)  # reuses it
+    await greenlet_spawn(connection.close)
+
+    assert pool.checkout_stats.checkouts == 2
+    assert pool.checkout_stats.timeouts == 0
+    assert pool.checkout_stats.wait_seconds_max < CONNECT_SECONDS / 2
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_checkout_of_busy_pool_waits_and_times_out():
+    pool = single_connection_pool()
+    held = await greenlet_spawn(pool.connect)
+
+    async def release_later() -> None:
+        await asyncio.sleep(0.1)
+        await greenlet_spawn(held.close)
+
+    connection, _ = await asyncio.gather(greenlet_spawn(pool.connect), release_later())
+    assert pool.checkout_stats.checkouts == 2
+    assert pool.checkout_stats.wait_seconds_max >= 0.1
+
+    with pytest.raises(PoolTimeoutError):
+        await greenlet_spawn(pool.connect)  # the connection is still held
+    await greenlet_spawn(connection.close)
+
+    stats: dict = pool.checkout_stats.as_dict()
+    assert stats["checkouts"] == 3 and stats["checkout_timeouts"] == 1
+    assert stats["checkout_wait_seconds_max"] >= 0.3
+    assert pool.recreate().checkout_stats is pool.checkout_stats  # stats survive engine.dispose()
+
+
+def test_pool_stats_report_checkouts():
+    stats: dict = db_client.pool_stats()
+    assert {
+        "in_use", "idle", "checkouts", "checkout_timeouts", "checkout_wait_seconds_avg"
+    } <= stats.keys()
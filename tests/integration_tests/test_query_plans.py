@@ -0,0 +1,123 @@
+"""
+Plans of the hot repository queries: every listed table has to be reached through an index
+condition, not read whole. Sequential scans are disabled, so that tiny test tables don't make
+a scan the cheapest plan, a table without a usable index is still scanned
+"""
+from contextlib import suppress
+from typing import Awaitable, Callable
+from uuid import UUID, uuid4
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from application.repositories.book_repo import BookRepository
+from application.repositories.cart_repo import CartRepository
+from application.repositories.order_repo import OrderRepository
+from application.services.utils.filters import BookFilter, CategoryFilter, Pagination
+from core.exceptions import NotFoundError
+from infrastructure.postgres import db_client
+
+
+async def explain_repo_call(call: Callable[[AsyncSession], Awaitable]) -> list[dict]:
+    """json plans of every select the repository call executes"""
+    statements: list[tuple[str, tuple]] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany) -> None:
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    async with db_client.async_session() as session:
+        await session.execute(text("SET LOCAL enable_seqscan = off"))  # until rollback
+        event.listen(db_client.engine.sync_engine, "before_cursor_execute", capture)
+        try:
+            with suppress(NotFoundError):
+                await call(session)
+        finally:
+            event.remove(db_client.engine.sync_engine, "before_cursor_execute", capture)
+
+        connection = await session.connection()
+        plans: list[dict] = []
+        for statement, parameters in statements:
+            result = await connection.exec_driver_sql(
+                f"EXPLAIN (FORMAT JSON) {statement}", parameters
+            )
+            plans.append(result.scalar()[0]["Plan"])
+        await session.rollback()
+    return plans
+
+
+def table_scans(plan: dict) -> list[dict]:
+    scans: list[dict] = [plan] if "Relation Name" in plan else []
+    for child in plan.get("Plans", []):
+        scans.extend(table_scans(child))
+    return scans
+
+
+def uses_index(scan: dict) -> bool:
+    # bitmap heap scans get rows from a bitmap index scan below them
+    return "Index Cond" in scan or scan["Node Type"] == "Bitmap Heap Scan"
+
+
+@pytest.mark.asyncio(scope="session")
+@pytest.mark.parametrize(
+    "call,tables",
+    [
+        (
+            lambda session: OrderRepository().get_orders_by_user_id(session=session, user_id=3),
+            ("orders", "book_order_assoc", "authors")
+        ),
+        (
+            lambda session: OrderRepository().get_order_by_payment_id(
+                session=session, payment_id=uuid4()
+            ),
+            ("orders",)
+        ),
+        (
+            lambda session: BookRepository().get_all_books(
+                session=session,
+                filters=BookFilter(category=CategoryFilter(category_name__eq="Category 1")),
+                pagination=Pagination()
+            ),
+            ("categories", "book_category_assoc")
+        ),
+        (
+            lambda session: BookRepository().get_all_books(
+                session=session,
+                filters=BookFilter(number_in_stock__gte=5, order_by="number_in_stock"),
+                pagination=Pagination()
+            ),
+            ("books",)
+        ),
+        (
+            lambda session: BookRepository().get_all_books(
+                session=session,
+                filters=BookFilter(price_per_unit__lt=100, order_by="price_per_unit"),
+                pagination=Pagination()
+            ),
+            ("books",)
+        ),
+        (
+            lambda session: CartRepository().get_cart_by_session_id(
+                session=session, cart_session_id=UUID("01e1ca73-5dea-46f2-a19b-56b5a7804efc")
+            ),
+            ("cart_items",)
+        ),
+    ],
+    ids=[
+        "orders_by_user", "order_by_payment", "books_by_category",
+        "books_by_stock", "books_by_price", "cart"
+    ]
+)
+async def test_hot_queries_use_indexes(
+        call: Callable[[AsyncSession], Awaitable],
+        tables: tuple[str, ...]
+):
+    plans: list[dict] = await explain_repo_call(call)
+    scans: list[dict] = [scan for plan in plans for scan in table_scans(plan)]
+
+    for table in tables:
+        table_scans_of_table = [scan for scan in scans if scan["Relation Name"] == table]
+        assert table_scans_of_table, f"{table} isn't queried"
+        for scan in table_scans_of_table:
+            assert uses_index(scan), f"{scan['Node Type']} on {table} without an index condition"
@@ -0,0 +1,122 @@
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from application.models import Category
+from application.schemas.domain_model_schemas import CategoryS
+from core.base_repos.unit_of_work import SqlAlchemyUnitOfWork, UOW_DEPTH_KEY
+from core.exceptions import BadRequest, ConcurrentUpdateError
+from infrastructure.postgres.app import db_client
+
+
+async def get_category_names(prefix: str) -> list[str]:
+    async with db_client.async_session() as session:
+        names = await session.scalars(
+            select(Category.name).where(Category.name.startswith(prefix)).order_by(Category.name)
+        )
+        return list(names)
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_nested_unit_of_work_rolls_back_only_its_savepoint():
+    uow = SqlAlchemyUnitOfWork()
+    async with db_client.async_session() as session:
+        async with uow.bind(session) as outer:
+            outer.add(obj=CategoryS(id=None, name="Savepoint outer"), orm_model=Category)
+
+            with pytest.raises(BadRequest):
+                async with uow.bind(session) as inner:
+                    assert inner.session is session  # no second connection
+                    inner.add(obj=CategoryS(id=None, name="Savepoint inner"), orm_model=Category)
+                    await inner.session.flush()
+                    raise BadRequest(detail="business rule is violated")
+
+            await outer.commit()
+
+    assert await get_category_names("Savepoint") == ["Savepoint outer"]
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_committed_savepoint_is_rolled_back_with_outer_unit_of_work():
+    uow = SqlAlchemyUnitOfWork()
+    async with db_client.async_session() as session:
+        with pytest.raises(BadRequest):
+            async with uow.bind(session) as outer:
+                outer.add(obj=CategoryS(id=None, name="Rolled back outer"), orm_model=Category)
+                async with uow.bind(session) as inner:
+                    inner.add(obj=CategoryS(id=None, name="Rolled back inner"), orm_model=Category)
+                    await inner.commit()  # released savepoint, committed by the outer one
+                raise BadRequest(detail="business rule is violated")
+
+    assert await get_category_names("Rolled back") == []
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_unbound_unit_of_work_runs_on_its_own_session():
+    async with SqlAlchemyUnitOfWork() as uow:
+        session: AsyncSession = uow.session
+        uow.add(obj=CategoryS(id=None, name="Own session"), orm_model=Category)
+        await uow.commit()
+
+    assert uow.session is None
+    assert session.info[UOW_DEPTH_KEY] == 0
+    assert await get_category_names("Own session") == ["Own session"]
+
+
+async def create_categories(*names: str) -> list[int]:
+    async with SqlAlchemyUnitOfWork() as uow:
+        for name in names:
+            uow.add(obj=CategoryS(id=None, name=name), orm_model=Category)
+        await uow.commit()
+        return list(await uow.session.scalars(
+            select(Category.id).where(Category.name.in_(names)).order_by(Category.name)
+        ))
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_updates_of_a_table_are_sent_in_one_executemany():
+    ids: list[int] = await create_categories("Batch 1", "Batch 2", "Batch 3")
+    updated_names: list[str] = [f"Batch {category_id} updated" for category_id in ids]
+    updates: list[tuple[str, bool]] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany) -> None:
+        if statement.lstrip().upper().startswith("UPDATE"):
+            updates.append((statement, executemany))
+
+    async with db_client.async_session() as session:
+        loaded: list[Category] = list(
+            await session.scalars(select(Category).where(Category.id.in_(ids)))
+        )
+        event.listen(db_client.engine.sync_engine, "before_cursor_execute", capture)
+        try:
+            async with SqlAlchemyUnitOfWork().bind(session) as uow:
+                for category_id in ids:
+                    await uow.update(
+                        obj=CategoryS(id=category_id, name=f"Batch {category_id} updated"),
+                        orm_model=Category
+                    )
+                await uow.commit()
+        finally:
+            event.remove(db_client.engine.sync_engine, "before_cursor_execute", capture)
+
+        assert len(updates) == 1 and updates[0][1]  # one UPDATE ... WHERE id for every row
+        assert {category.name for category in loaded} == set(updated_names)
+
+    assert sorted(await get_category_names("Batch")) == sorted(updated_names)
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_update_of_changed_row_raises_concurrent_update_error():
+    category_id, = await create_categories("Optimistic")
+
+    async with db_client.async_session() as session:
+        with pytest.raises(ConcurrentUpdateError):
+            async with SqlAlchemyUnitOfWork().bind(session) as uow:
+                await uow.update(
+                    obj=CategoryS(id=category_id, name="Optimistic updated"),
+                    orm_model=Category,
+                    expected={"name": "Changed by another request"}
+                )
+                await uow.commit()
+
+    assert await get_category_names("Optimistic") == ["Optimistic"]